@@ -1,4 +1,4 @@
-from .device import Device, connected_devices
+from .device import Device, DeviceEvent, DeviceRegistry, connected_devices
 from .ean import EAN
 from .exceptions import CanlibException, DllException
 from .frame import Frame, LINFrame
@@ -10,9 +10,14 @@ Hardware tool, it is connected and you can communicate with it through CANlib.
 """
 
 from ._channel import canChannel
+from .acceptance import AcceptanceFilter, CodeMask, code_mask_cover
+from .autobitrate import (BitrateDetection, BitrateScore, detect_bitrate,
+                          detect_bitrates)
 from .channel import Channel, ScriptText, openChannel
 from .channeldata import ChannelData, HandleData
 from .constants import *
+from .dispatcher import (Dispatcher, DispatcherStats, SubscriberStats,
+                         Subscription)
 from .enums import (AcceptFilterFlag, Bitrate, BitrateFD, BusTypeGroup,
                     ChannelCap, ChannelCapEx, ChannelDataItem, ChannelFlags,
                     DeviceMode, Driver, DriverCap, EnvVarType, Error,
@@ -22,12 +27,19 @@ from .enums import (AcceptFilterFlag, Bitrate, BitrateFD, BusTypeGroup,
                     TransceiverType, TxeDataItem)
 from .envvar import EnvVar  # for backwards-compatibility
 from .envvar import EnvVar as envvar
+from .envvar import (MAILBOX_MAX_MESSAGE, MAILBOX_SLOT_SIZE, DataMirror,
+                     EnvVarMirror, Mailbox, MailboxStats, read_envvars,
+                     write_envvars)
 from .exceptions import (CanError, CanNoMsg, CanNotFound, CanScriptFail,
                          CanTimeout, CanOutOfMemory, CanInvalidHandle,
                          EnvvarException, EnvvarNameError, EnvvarValueError,
+                         MailboxProtocolError,
                          IoNoValidConfiguration,
                          IoPinConfigurationNotConfirmed, TxeFileIsEncrypted)
 from .iocontrol import IOControl
+from .scripttext import ScriptLine, ScriptTextStats, ScriptTextStream
+from .scheduler import (PeriodicMessage, PeriodicStats, SchedulerStats,
+                        TxScheduler)
 from .txe import SourceElement, Txe
 from .wrapper import CANLib  # for backwards-compatibility
 from .wrapper import CANLib as canlib
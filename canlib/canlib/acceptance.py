@@ -0,0 +1,232 @@
+"""Acceptance filters for sets of CAN identifiers
+
+The hardware acceptance filter set using `Channel.canSetAcceptanceFilter`
+holds one code and mask for standard identifiers and one for extended
+identifiers, so it can only pass exactly a set of identifiers sharing all
+but a few bits. `AcceptanceFilter` takes any sets and ranges of
+identifiers, computes the tightest code and mask passing all of them, to
+keep as much traffic as possible out of the driver, and then filters the
+frames read exactly, using a bitmap for standard identifiers and a set (and
+sorted ranges) for extended identifiers:
+
+    >>> from canlib import canlib
+    >>> accept = canlib.AcceptanceFilter(
+    ...     standard=[0x100, 0x101, range(0x200, 0x210)],
+    ...     extended=[0x18FEF100, (0x18FF0000, 0x18FF00FF)],
+    ... )
+    >>> accept.apply(ch)
+    >>> frames = accept.filter(frames)
+
+.. versionadded:: 1.32
+
+"""
+
+import bisect
+from collections import namedtuple
+
+from .enums import MessageFlag
+
+STD_ID_MASK = 0x7FF
+EXT_ID_MASK = 0x1FFFFFFF
+
+_EXT = int(MessageFlag.EXT)
+_ERROR_FRAME = int(MessageFlag.ERROR_FRAME)
+
+# Extended ranges with at most this many ids are put in the set of ids,
+# longer ranges are searched using bisect
+_EXPAND_LIMIT = 4096
+
+CodeMask = namedtuple('CodeMask', 'code mask passed')
+CodeMask.__doc__ = """A hardware acceptance filter
+
+    An identifier passes the filter when ``(id ^ code) & mask == 0``.
+
+    Attributes:
+        code (`int`): The code
+        mask (`int`): The mask
+        passed (`int`): Number of identifiers the filter passes
+
+    .. versionadded:: 1.32
+
+"""
+
+
+def _parse(items, limit):
+    """Split ids and ranges into a set of ids and sorted, merged ranges"""
+    ids = set()
+    ranges = []
+    for item in items:
+        if isinstance(item, int):
+            first = last = item
+        elif isinstance(item, range):
+            if not item:
+                continue
+            if item.step != 1:
+                for id_ in item:
+                    _check(id_, id_, limit)
+                ids.update(item)
+                continue
+            first, last = item[0], item[-1]
+        else:
+            first, last = item
+        _check(first, last, limit)
+        if last - first < _EXPAND_LIMIT:
+            ids.update(range(first, last + 1))
+        else:
+            ranges.append((first, last))
+    ranges.sort()
+    merged = []
+    for first, last in ranges:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+        else:
+            merged.append((first, last))
+    return ids, merged
+
+
+def _check(first, last, limit):
+    if not 0 <= first <= last <= limit:
+        raise ValueError(f"Invalid identifier range: 0x{first:x}-0x{last:x}")
+
+
+def code_mask_cover(ids, ranges=(), id_mask=STD_ID_MASK):
+    """Return the tightest code and mask passing all the given identifiers
+
+    The mask has a bit set for each bit that is the same in all identifiers,
+    and these bits are the code.
+
+    Args:
+        ids: Identifiers (`int`)
+        ranges: Inclusive ranges of identifiers, as (first, last) tuples
+        id_mask (`int`): `STD_ID_MASK` or `EXT_ID_MASK`
+
+    Returns:
+        `CodeMask`: With no identifiers, a filter passing only identifier 0
+
+    .. versionadded:: 1.32
+
+    """
+    ref = None
+    diff = 0
+    for id_ in ids:
+        if ref is None:
+            ref = id_
+        diff |= id_ ^ ref
+    for first, last in ranges:
+        if ref is None:
+            ref = first
+        # All bits below the highest bit that differs between first and last
+        # take both values within the range
+        diff |= (first ^ ref) | ((1 << (first ^ last).bit_length()) - 1)
+    if ref is None:
+        return CodeMask(0, id_mask, 1)
+    mask = id_mask & ~diff
+    passed = 1 << (bin(id_mask).count('1') - bin(mask).count('1'))
+    return CodeMask(ref & mask, mask, passed)
+
+
+class AcceptanceFilter:
+    """Exact acceptance filter for sets and ranges of identifiers
+
+    Identifiers are given as `int`, `range` or (first, last) tuples of
+    inclusive ranges.
+
+    Error frames are always accepted.
+
+    Args:
+        standard: Standard (11-bit) identifiers to accept
+        extended: Extended (29-bit) identifiers to accept
+
+    Attributes:
+        standard_cover (`CodeMask`): Hardware filter for standard identifiers
+        extended_cover (`CodeMask`): Hardware filter for extended identifiers
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, standard=(), extended=()):
+        std_ids, std_ranges = _parse(standard, STD_ID_MASK)
+        for first, last in std_ranges:
+            std_ids.update(range(first, last + 1))
+        self._std = bytearray(STD_ID_MASK + 1)
+        for id_ in std_ids:
+            self._std[id_] = 1
+        ext_ids, ext_ranges = _parse(extended, EXT_ID_MASK)
+        self._ext_starts = [first for first, _ in ext_ranges]
+        self._ext_ends = [last for _, last in ext_ranges]
+        self._ext = frozenset(id_ for id_ in ext_ids if not self._in_ranges(id_))
+        self._counts = (
+            len(std_ids),
+            len(self._ext) + sum(last - first + 1 for first, last in ext_ranges),
+        )
+        self.standard_cover = code_mask_cover(std_ids, (), STD_ID_MASK)
+        self.extended_cover = code_mask_cover(self._ext, ext_ranges, EXT_ID_MASK)
+
+    def __call__(self, frame):
+        """Return whether a `~canlib.Frame` is accepted"""
+        flags = frame.flags
+        if flags & _ERROR_FRAME:
+            return True
+        return self.accepts(frame.id, flags & _EXT)
+
+    @property
+    def exact(self):
+        """`bool`: Whether the hardware filters pass exactly the accepted identifiers
+
+        When they do, frames read after `apply` need no further filtering.
+
+        """
+        return (
+            self.standard_cover.passed == self._counts[0]
+            and self.extended_cover.passed == self._counts[1]
+        )
+
+    def accepts(self, id_, extended=False):
+        """Return whether an identifier is accepted"""
+        if not extended:
+            return id_ <= STD_ID_MASK and self._std[id_] == 1
+        return id_ in self._ext or self._in_ranges(id_)
+
+    def filter(self, frames):
+        """Return a list of the accepted frames of a batch
+
+        Args:
+            frames: Iterable of `~canlib.Frame`
+
+        """
+        std = self._std
+        if self._ext_starts:
+            ext = self.accepts
+            return [
+                f for f in frames
+                if f.flags & _ERROR_FRAME
+                or (ext(f.id, True) if f.flags & _EXT else f.id <= STD_ID_MASK and std[f.id])
+            ]
+        ext = self._ext
+        return [
+            f for f in frames
+            if f.flags & _ERROR_FRAME
+            or (f.id in ext if f.flags & _EXT else f.id <= STD_ID_MASK and std[f.id])
+        ]
+
+    def apply(self, channel):
+        """Set the hardware acceptance filters of a channel
+
+        Sets `standard_cover` and `extended_cover` using
+        `Channel.canSetAcceptanceFilter`. Unless `exact` is true, the hardware
+        passes some identifiers that are not accepted, so frames read should
+        still be passed to `filter`.
+
+        Args:
+            channel (`Channel`): The channel, before going on bus
+
+        """
+        std = self.standard_cover
+        ext = self.extended_cover
+        channel.canSetAcceptanceFilter(std.code, std.mask, is_extended=False)
+        channel.canSetAcceptanceFilter(ext.code, ext.mask, is_extended=True)
+
+    def _in_ranges(self, id_):
+        i = bisect.bisect_right(self._ext_starts, id_)
+        return i > 0 and id_ <= self._ext_ends[i - 1]
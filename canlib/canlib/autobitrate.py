@@ -0,0 +1,246 @@
+"""Detect the bitrate of an unknown CAN bus
+
+The channels are put in silent mode before going bus on, so nothing is ever
+transmitted on the bus while detecting, not even acknowledge bits or error
+frames.
+
+.. versionadded:: 1.32
+
+"""
+
+import concurrent.futures
+import time
+from collections import namedtuple
+
+from .busparams import BusParamsTq
+from .channel import openChannel
+from .enums import Bitrate, BitrateFD, Driver, MessageFlag, Open
+from .exceptions import CanNoMsg
+
+#: Classic CAN bitrates tried by `detect_bitrate`, most common first.
+DEFAULT_BITRATES = (
+    Bitrate.BITRATE_500K,
+    Bitrate.BITRATE_250K,
+    Bitrate.BITRATE_125K,
+    Bitrate.BITRATE_1M,
+    Bitrate.BITRATE_100K,
+    Bitrate.BITRATE_83K,
+    Bitrate.BITRATE_62K,
+    Bitrate.BITRATE_50K,
+    Bitrate.BITRATE_10K,
+)
+
+#: CAN FD ``(bitrate, data_bitrate)`` pairs tried by `detect_bitrate`, most
+#: common first.
+DEFAULT_BITRATES_FD = (
+    (BitrateFD.BITRATE_500K_80P, BitrateFD.BITRATE_2M_80P),
+    (BitrateFD.BITRATE_500K_80P, BitrateFD.BITRATE_4M_80P),
+    (BitrateFD.BITRATE_500K_80P, BitrateFD.BITRATE_1M_80P),
+    (BitrateFD.BITRATE_1M_80P, BitrateFD.BITRATE_4M_80P),
+    (BitrateFD.BITRATE_1M_80P, BitrateFD.BITRATE_2M_80P),
+    (BitrateFD.BITRATE_1M_80P, BitrateFD.BITRATE_8M_80P),
+    (BitrateFD.BITRATE_500K_80P, BitrateFD.BITRATE_8M_80P),
+)
+
+BitrateScore = namedtuple(
+    'BitrateScore', 'bitrate data_bitrate frames brs_frames error_frames rx_errors seconds'
+)
+BitrateScore.__doc__ = """The outcome of listening to the bus with one bitrate
+
+    Attributes:
+        bitrate: The tried bitrate
+        data_bitrate: The tried CAN FD data bitrate, or `None`
+        frames (`int`): Number of correctly received frames
+        brs_frames (`int`): Number of received CAN FD frames using bitrate
+            switch, i.e. frames where the data bitrate was used
+        error_frames (`int`): Number of received error frames
+        rx_errors (`int`): Increase of the receive error counter while
+            listening
+        seconds (`float`): Time spent listening
+
+    .. versionadded:: 1.32
+
+"""
+
+BitrateDetection = namedtuple('BitrateDetection', 'channel bitrate data_bitrate scores')
+BitrateDetection.__doc__ = """The result of `detect_bitrate`
+
+    Attributes:
+        channel (`int`): CANlib channel number
+        bitrate: The detected bitrate, or `None` if no bitrate matched
+        data_bitrate: The detected CAN FD data bitrate, or `None`
+        scores (`list` of `BitrateScore`): The bitrates tried, in order
+
+    .. versionadded:: 1.32
+
+"""
+
+
+def detect_bitrate(
+    channel, candidates=None, flags=0, dwell=0.1, min_frames=5, max_errors=3
+):
+    """Detect the bitrate of the bus connected to a channel
+
+    The channel is opened in silent mode (`Driver.SILENT`) and each
+    candidate bitrate is tried in turn. Listening to a candidate stops after
+    `min_frames` frames or `max_errors` error frames, or at the latest after
+    `dwell` seconds. As soon as a candidate receives `min_frames` frames
+    without any errors, no more candidates are tried. Otherwise the
+    candidate with the most frames and fewest errors is chosen.
+
+    On an active bus, this means that detecting a common bitrate normally
+    takes a few tens of milliseconds, while trying all `DEFAULT_BITRATES` on
+    a quiet bus takes ``len(DEFAULT_BITRATES) * dwell`` seconds.
+
+        >>> result = canlib.detect_bitrate(0)
+        >>> result.bitrate
+        <Bitrate.BITRATE_500K: -2>
+        >>> ch = canlib.openChannel(0, bitrate=result.bitrate)
+
+    Args:
+        channel (`int`): CANlib channel number
+        candidates: Bitrates to try, in order. For classic CAN these are
+            `Bitrate` or `~busparams.BusParamsTq` values, default is
+            `DEFAULT_BITRATES`. For CAN FD they are ``(bitrate,
+            data_bitrate)`` pairs of `BitrateFD` or
+            `~busparams.BusParamsTq` values, default is
+            `DEFAULT_BITRATES_FD`.
+        flags (`int`): `Open` flags used when opening the channel, include
+            `Open.CAN_FD` to detect CAN FD bitrates.
+        dwell (`float`): Maximum time in seconds to listen to each candidate
+        min_frames (`int`): Number of frames needed to accept a candidate
+            without trying the rest. For CAN FD at least one of the frames
+            must use bitrate switch, since the data bitrate is otherwise not
+            tested.
+        max_errors (`int`): Number of error frames that rejects a candidate
+
+    Returns:
+        `BitrateDetection`
+
+    .. versionadded:: 1.32
+
+    """
+    is_can_fd = bool(flags & Open.CAN_FD)
+    if candidates is None:
+        candidates = DEFAULT_BITRATES_FD if is_can_fd else DEFAULT_BITRATES
+    scores = []
+    with openChannel(channel, flags=flags) as ch:
+        # Must be set before going bus on, so that nothing is ever sent
+        ch.setBusOutputControl(Driver.SILENT)
+        for candidate in candidates:
+            if is_can_fd:
+                bitrate, data_bitrate = candidate
+            else:
+                bitrate, data_bitrate = candidate, None
+            score = _listen(ch, bitrate, data_bitrate, dwell, min_frames, max_errors)
+            scores.append(score)
+            if _is_clear(score, is_can_fd, min_frames):
+                break
+    best = _best_score(scores)
+    if best is None:
+        return BitrateDetection(channel=channel, bitrate=None, data_bitrate=None, scores=scores)
+    return BitrateDetection(
+        channel=channel, bitrate=best.bitrate, data_bitrate=best.data_bitrate, scores=scores
+    )
+
+
+def detect_bitrates(channels, candidates=None, flags=0, **kwargs):
+    """Detect the bitrates of several channels at the same time
+
+    Runs `detect_bitrate` on each channel in a thread of its own, so e.g.
+    all channels of a device take no longer than the slowest channel:
+
+        >>> for result in canlib.detect_bitrates(range(4)):
+        ...     print(result.channel, result.bitrate)
+
+    Args:
+        channels: Iterable of CANlib channel numbers
+        candidates, flags: See `detect_bitrate`
+
+    Any other keyword arguments are passed to `detect_bitrate`.
+
+    Returns:
+        `list` of `BitrateDetection`, in the same order as `channels`.
+
+    .. versionadded:: 1.32
+
+    """
+    channels = list(channels)
+    if not channels:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(len(channels)) as pool:
+        futures = [
+            pool.submit(detect_bitrate, channel, candidates, flags, **kwargs)
+            for channel in channels
+        ]
+        return [future.result() for future in futures]
+
+
+def _set_bitrate(ch, bitrate, data_bitrate):
+    if isinstance(bitrate, BusParamsTq):
+        ch.set_bus_params_tq(bitrate, data_bitrate)
+    else:
+        ch.setBusParams(bitrate)
+        if data_bitrate is not None:
+            ch.setBusParamsFd(data_bitrate)
+
+
+def _listen(ch, bitrate, data_bitrate, dwell, min_frames, max_errors):
+    _set_bitrate(ch, bitrate, data_bitrate)
+    ch.iocontrol.flush_rx_buffer()
+    frames = brs_frames = error_frames = 0
+    start = time.perf_counter()
+    deadline = start + dwell
+    ch.busOn()
+    try:
+        # Clearing the error counters is not supported everywhere, so only
+        # the increase while listening is counted
+        rx_errors = ch.read_error_counters().rx
+        while frames < min_frames and error_frames < max_errors:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                frame = ch.read(timeout=max(1, int(remaining * 1000)))
+            except CanNoMsg:
+                continue
+            if frame.flags & MessageFlag.ERROR_FRAME:
+                error_frames += 1
+            else:
+                frames += 1
+                if frame.flags & MessageFlag.BRS:
+                    brs_frames += 1
+        rx_errors = max(0, ch.read_error_counters().rx - rx_errors)
+    finally:
+        ch.busOff()
+    return BitrateScore(
+        bitrate=bitrate,
+        data_bitrate=data_bitrate,
+        frames=frames,
+        brs_frames=brs_frames,
+        error_frames=error_frames,
+        rx_errors=rx_errors,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def _is_clear(score, is_can_fd, min_frames):
+    if score.error_frames or score.rx_errors or score.frames < min_frames:
+        return False
+    return not is_can_fd or score.brs_frames > 0
+
+
+def _best_score(scores):
+    """Return the score with most frames and fewest errors, if any frames"""
+    best = None
+    for score in scores:
+        if not score.frames:
+            continue
+        key = (
+            score.frames - score.error_frames,
+            score.brs_frames,
+            -score.rx_errors,
+        )
+        if best is None or key > best[0]:
+            best = (key, score)
+    return None if best is None else best[1]
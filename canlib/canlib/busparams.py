@@ -5,6 +5,9 @@
 """
 
 import collections
+import functools
+import heapq
+import math
 
 SI_PREFIXES = {
     24: 'Y',
@@ -89,7 +92,8 @@ def calc_busparamstq(
     `Error.NOT_IMPLEMENTED <canlib.canlib.Error.NOT_IMPLEMENTED>` is encountered
     when trying to set the bitrate with the returned BusParamsTq, provide a
     prescaler argument higher than one and retry. This will lower the total number
-    of time quanta in the bit and thus make the BusParamsTq valid.
+    of time quanta in the bit and thus make the BusParamsTq valid, or use
+    `search_busparamstq` which takes the device limits into account.
 
     Example:
 
@@ -695,3 +699,309 @@ def calc_tolerance(nominal, data=None):
 
     Tolerance = collections.namedtuple('Tolerance', 'df1 df2 df3 df4 df5')
     return Tolerance(df1=df1, df2=df2, df3=df3, df4=df4, df5=df5)
+
+
+BitTiming = collections.namedtuple(
+    'BitTiming', 'nominal data bitrate_error sample_point_error tolerance margin'
+)
+BitTiming.__doc__ = """A ranked candidate returned by `search_busparamstq`
+
+    Attributes:
+        nominal (`BusParamsTq`): Bus parameters for the arbitration phase
+        data (`BusParamsTq`): Bus parameters for the data phase, or `None`
+        bitrate_error (`float`): Largest relative bitrate error of the phases
+        sample_point_error (`float`): Largest sample point error of the phases
+            (percentage points)
+        tolerance (`namedtuple`): Tolerance as returned by `calc_tolerance`
+        margin (`int`): Smallest of the tolerance values (ppm), i.e. the
+            oscillator tolerance that the bit timing allows
+
+    .. versionadded:: 1.32
+
+"""
+
+# Immutable bus parameters, used in the memoized tables and accepted by
+# calc_tolerance in place of BusParamsTq.
+_Timing = collections.namedtuple('_Timing', 'prescaler tq prop phase1 phase2 sjw')
+
+_SEARCH_CACHE_SIZE = 256
+
+
+def iter_busparamstq(clk_freq, limits, target_bitrate, max_bitrate_error=0.005, data=False):
+    """Generate all valid bus parameters close to a bitrate
+
+    Every combination of prescaler, number of time quanta, propagation
+    segment, phase segments and sync jump width that is within `limits` and
+    gives a bitrate within `max_bitrate_error` of `target_bitrate` is
+    generated. Use `search_busparamstq` to get the best candidates.
+
+    Args:
+        clk_freq (`float`): Device clock frequency (Hz)
+        limits (`BusParamTqLimits`): Device limits, see
+            `.ChannelData.bus_param_limits`
+        target_bitrate (`float`): Wanted bitrate (bit/s)
+        max_bitrate_error (`float`): Largest allowed relative bitrate error
+        data (`bool`): Use the limits of the CAN FD data phase
+
+    Yields:
+        `BusParamsTq`
+
+    .. versionadded:: 1.32
+
+    """
+    lo, hi = _phase_limits(limits, data)
+    for prescaler, tq in _prescaler_tq(clk_freq, lo, hi, target_bitrate, max_bitrate_error):
+        for phase2 in range(lo.phase2, min(hi.phase2, tq - 1 - _min_tseg1(lo)) + 1):
+            tseg1 = tq - 1 - phase2
+            for prop, phase1 in _splits(lo, hi, tseg1):
+                sjw_max = min(phase1, phase2, hi.sjw)
+                for sjw in range(max(1, lo.sjw), sjw_max + 1):
+                    yield BusParamsTq(
+                        tq=tq, phase1=phase1, phase2=phase2, sjw=sjw, prescaler=prescaler, prop=prop
+                    )
+
+
+def search_busparamstq(
+    clk_freq,
+    limits,
+    target_bitrate,
+    target_sample_point,
+    target_sync_jump_width=None,
+    data_bitrate=None,
+    data_sample_point=None,
+    data_sync_jump_width=None,
+    max_bitrate_error=0.005,
+    max_results=10,
+):
+    """Search for the best bus parameters within the device limits
+
+    Unlike `calc_busparamstq`, all prescalers and segment sizes allowed by
+    `limits` are considered, so the returned parameters are always accepted
+    by `BusParamTqLimits.validate`:
+
+        >>> chd = canlib.ChannelData(channel_number=0)
+        >>> best = canlib.busparams.search_busparamstq(
+        ... clk_freq=chd.clock_info.frequency(),
+        ... limits=chd.bus_param_limits,
+        ... target_bitrate=500_000,
+        ... target_sample_point=80,
+        ... data_bitrate=2_000_000,
+        ... data_sample_point=80)[0]
+        >>> ch.set_bus_params_tq(best.nominal, best.data)
+
+    The candidates are ranked by bitrate error, then by sample point error
+    and last by tolerance margin (the smallest value from `calc_tolerance`).
+    Among segment splits giving the same sample point, only the one with the
+    largest tolerance is kept, preferring a longer propagation segment. The
+    sync jump width is the largest allowed unless `target_sync_jump_width`
+    is given.
+
+    When `data_bitrate` is given, the arbitration and data phases are ranked
+    together, using the tolerance of the combination.
+
+    Results are memoized per clock frequency, limits and targets, so planning
+    the bus parameters of many channels of the same kind is fast.
+
+    Args:
+        clk_freq (`float`): Device clock frequency (Hz)
+        limits (`BusParamTqLimits`): Device limits, see
+            `.ChannelData.bus_param_limits`
+        target_bitrate (`float`): Wanted arbitration bitrate (bit/s)
+        target_sample_point (`float`): Wanted sample point in percentage (0-100)
+        target_sync_jump_width (`float`, optional): Wanted sync jump width in
+            percentage (0-100)
+        data_bitrate (`float`, optional): Wanted CAN FD data bitrate (bit/s)
+        data_sample_point (`float`, optional): Wanted data phase sample point,
+            defaults to `target_sample_point`
+        data_sync_jump_width (`float`, optional): Wanted data phase sync
+            jump width
+        max_bitrate_error (`float`): Largest allowed relative bitrate error
+        max_results (`int`): Maximum number of candidates to return
+
+    Returns:
+        `list` of `BitTiming`, best candidate first. The list is empty if no
+        bus parameters within the limits are close enough to the bitrate.
+
+    .. versionadded:: 1.32
+
+    """
+    if data_sample_point is None:
+        data_sample_point = target_sample_point
+    ranked = _search(
+        clk_freq,
+        _limits_key(limits),
+        (target_bitrate, target_sample_point, target_sync_jump_width),
+        None if data_bitrate is None else (data_bitrate, data_sample_point, data_sync_jump_width),
+        max_bitrate_error,
+        max_results,
+    )
+    return [
+        BitTiming(
+            nominal=_to_busparamstq(nominal),
+            data=None if data is None else _to_busparamstq(data),
+            bitrate_error=bitrate_error,
+            sample_point_error=sample_point_error,
+            tolerance=tolerance,
+            margin=margin,
+        )
+        for nominal, data, bitrate_error, sample_point_error, tolerance, margin in ranked
+    ]
+
+
+_LIMIT_FIELDS = ('phase1', 'phase2', 'sjw', 'prescaler', 'prop')
+_Limit = collections.namedtuple('_Limit', _LIMIT_FIELDS)
+
+
+def _limits_key(limits):
+    return tuple(
+        _Limit(*(getattr(limit, field) for field in _LIMIT_FIELDS))
+        for limit in (limits.arbitration_min, limits.arbitration_max, limits.data_min, limits.data_max)
+    )
+
+
+def _phase_limits(limits, data):
+    limits = _limits_key(limits)
+    return limits[2:] if data else limits[:2]
+
+
+def _min_tseg1(lo):
+    return lo.phase1 + lo.prop
+
+
+def _prescaler_tq(clk_freq, lo, hi, target_bitrate, max_bitrate_error):
+    """Yield (prescaler, tq) giving a bitrate close to target_bitrate"""
+    quanta = clk_freq / target_bitrate
+    tq_min = 1 + _min_tseg1(lo) + lo.phase2
+    if lo.prop == hi.prop == 0:
+        tq_max = 1 + hi.phase1 + hi.phase2
+    else:
+        tq_max = 1 + hi.phase1 + hi.prop + hi.phase2
+    for prescaler in range(max(1, lo.prescaler), hi.prescaler + 1):
+        if quanta / prescaler < tq_min - 1:
+            break
+        exact = quanta / prescaler
+        for tq in {math.floor(exact), math.ceil(exact)}:
+            if tq_min <= tq <= tq_max:
+                error = abs(clk_freq / (tq * prescaler) - target_bitrate) / target_bitrate
+                if error <= max_bitrate_error:
+                    yield prescaler, tq
+
+
+def _splits(lo, hi, tseg1):
+    """Yield all valid (prop, phase1) with prop + phase1 == tseg1"""
+    if lo.prop == hi.prop == 0:
+        # The phase1 limits apply to phase1 + prop
+        if lo.phase1 <= tseg1 <= hi.phase1:
+            yield 0, tseg1
+        return
+    for phase1 in range(max(lo.phase1, tseg1 - hi.prop), min(hi.phase1, tseg1 - lo.prop) + 1):
+        yield tseg1 - phase1, phase1
+
+
+def _best_split(lo, hi, tseg1, phase2):
+    """Return the (prop, phase1) with the largest min(phase1, phase2)
+
+    Ties are broken by the longest propagation segment.
+
+    """
+    if lo.prop == hi.prop == 0:
+        if lo.phase1 <= tseg1 <= hi.phase1:
+            return 0, tseg1
+        return None
+    low = max(lo.phase1, tseg1 - hi.prop)
+    high = min(hi.phase1, tseg1 - lo.prop)
+    if low > high:
+        return None
+    phase1 = min(max(phase2, low), high)
+    return tseg1 - phase1, phase1
+
+
+def _phase_candidates(clk_freq, lo, hi, targets, max_bitrate_error):
+    """Yield (rank, timing) for the non-dominated timings of one phase"""
+    target_bitrate, target_sample_point, target_sjw = targets
+    for prescaler, tq in _prescaler_tq(clk_freq, lo, hi, target_bitrate, max_bitrate_error):
+        bitrate_error = abs(clk_freq / (tq * prescaler) - target_bitrate) / target_bitrate
+        for phase2 in range(lo.phase2, min(hi.phase2, tq - 1 - _min_tseg1(lo)) + 1):
+            split = _best_split(lo, hi, tq - 1 - phase2, phase2)
+            if split is None:
+                continue
+            prop, phase1 = split
+            sjw_max = min(phase1, phase2, hi.sjw)
+            sjw_min = max(1, lo.sjw)
+            if sjw_max < sjw_min:
+                continue
+            if target_sjw is None:
+                sjw = sjw_max
+            else:
+                sjw = min(max(round(target_sjw / 100 * tq), sjw_min), sjw_max)
+            sample_point_error = abs(100 * (tq - phase2) / tq - target_sample_point)
+            yield (
+                bitrate_error,
+                sample_point_error,
+                _Timing(prescaler, tq, prop, phase1, phase2, sjw),
+            )
+
+
+def _rank(bitrate_error, sample_point_error, margin):
+    # Rounded so that float noise does not hide equally good candidates
+    return (round(bitrate_error, 12), round(sample_point_error, 9), -margin)
+
+
+def _nominal_rank(candidate):
+    bitrate_error, sample_point_error, timing = candidate
+    # df1 and df2 of calc_tolerance, without creating the namedtuple
+    df1 = round(timing.sjw / (10 * timing.tq) * 1000000)
+    df2 = round(
+        min(timing.phase1, timing.phase2) / (13 * timing.tq - timing.phase2) * 1000000
+    )
+    return _rank(bitrate_error, sample_point_error, min(df1, df2))
+
+
+@functools.lru_cache(maxsize=_SEARCH_CACHE_SIZE)
+def _search(clk_freq, limits, nominal_targets, data_targets, max_bitrate_error, max_results):
+    lo, hi = limits[:2]
+    nominal = _phase_candidates(clk_freq, lo, hi, nominal_targets, max_bitrate_error)
+
+    if data_targets is None:
+        best = heapq.nsmallest(max_results, nominal, key=_nominal_rank)
+        result = []
+        for bitrate_error, sample_point_error, timing in best:
+            tolerance = calc_tolerance(timing)
+            margin = min(tolerance.df1, tolerance.df2)
+            result.append((timing, None, bitrate_error, sample_point_error, tolerance, margin))
+        return tuple(result)
+
+    # Only the best of each phase are combined, ranked by the margin that
+    # does not depend on the other phase.
+    pool = max(4 * max_results, 16)
+    nominal = heapq.nsmallest(pool, nominal, key=_nominal_rank)
+    lo, hi = limits[2:]
+    data = heapq.nsmallest(
+        pool,
+        _phase_candidates(clk_freq, lo, hi, data_targets, max_bitrate_error),
+        key=lambda c: _rank(*c[0:2], c[2].sjw / c[2].tq),
+    )
+    combined = []
+    for n_bitrate_error, n_sample_point_error, n_timing in nominal:
+        for d_bitrate_error, d_sample_point_error, d_timing in data:
+            tolerance = calc_tolerance(n_timing, d_timing)
+            combined.append((
+                n_timing,
+                d_timing,
+                max(n_bitrate_error, d_bitrate_error),
+                max(n_sample_point_error, d_sample_point_error),
+                tolerance,
+                min(tolerance),
+            ))
+    return tuple(heapq.nsmallest(max_results, combined, key=lambda c: _rank(*c[2:4], c[5])))
+
+
+def _to_busparamstq(timing):
+    return BusParamsTq(
+        tq=timing.tq,
+        phase1=timing.phase1,
+        phase2=timing.phase2,
+        sjw=timing.sjw,
+        prescaler=timing.prescaler,
+        prop=timing.prop,
+    )
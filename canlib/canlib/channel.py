@@ -159,6 +159,7 @@ class Channel:
 
     _iocontrol_ref = lambda self: None  # noqa
     _handledata_ref = lambda self: None  # noqa
+    _is_can_fd = None
     _MAX_MSG_SIZE = 64
     _bus_params_tq_err_msg = (
         "set_bus_params_tq() and get_bus_params_tq() are not "
@@ -307,6 +308,23 @@ class Channel:
         """
         return objbuf.Response(self, filter, frame, rtr_only)
 
+    def objbuf_pool(self, scheduler=None, capacity=None):
+        """Create a manager of the object buffers of the channel.
+
+        Args:
+            scheduler (`.TxScheduler`): Scheduler sending the periodic messages
+                that do not get an object buffer.
+            capacity (`.objbuf.Capacity`): The number of object buffers,
+                default is to find out by allocating buffers.
+
+        Returns:
+            `.objbuf.Pool`: The manager.
+
+        .. versionadded:: 1.32
+
+        """
+        return objbuf.Pool(self, scheduler, capacity)
+
     def close(self):
         """Close CANlib channel
 
@@ -1692,5 +1710,8 @@ class Channel:
         .. versionadded: 1.17
 
         """
-        flags = self.channel_data.channel_flags
-        return ChannelFlags.IS_CANFD in flags
+        # Decided when the channel is opened, so only read once per handle
+        if self._is_can_fd is None:
+            flags = self.channel_data.channel_flags
+            self._is_can_fd = ChannelFlags.IS_CANFD in flags
+        return self._is_can_fd
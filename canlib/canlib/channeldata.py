@@ -2,6 +2,7 @@ import ctypes as ct
 
 from .. import VersionNumber, deprecation
 from ..ean import EAN
+from . import wrapper
 from .busparams import ClockInfo, BusParamTqLimits
 from .enums import (BusTypeGroup, ChannelCap, ChannelCapEx, ChannelDataItem,
                     ChannelFlags, DriverCap, Error, HardwareType, LoggerType,
@@ -10,17 +11,22 @@ from .exceptions import CanError, CanNotFound, CanNotImplementedError
 from .structures import CanBusParamLimits
 from .wrapper import dll, getNumberOfChannels
 
+# Attributes marked with static=True never change while a device is
+# connected, and are cached per channel number until the library is
+# reinitialized or the hardware is enumerated again.
 ATTRIBUTES = {
     'channel_cap': dict(
         item=ChannelDataItem.CHANNEL_CAP,
         ctype=ct.c_uint32,
         ptype=ChannelCap,
+        static=True,
         __doc__="A `ChannelCap` object with the capabilities of the channel as flags. Also see `ChannelData.channel_cap_mask`.",
     ),
     'trans_cap': dict(
         item=ChannelDataItem.TRANS_CAP,
         ctype=ct.c_uint32,
         ptype=DriverCap,
+        static=True,
         __doc__="A `DriverCap` object with the capabilities of the transceiver as flags. Not implemented in Linux.",
     ),
     'channel_flags': dict(
@@ -33,30 +39,35 @@ ATTRIBUTES = {
         item=ChannelDataItem.CARD_TYPE,
         ctype=ct.c_uint32,
         ptype=HardwareType,
+        static=True,
         __doc__="A member of the `HardwareType` enum representing the hardware type of the card.",
     ),
     'card_number': dict(
         item=ChannelDataItem.CARD_NUMBER,
         ctype=ct.c_uint32,
         ptype=int,
+        static=True,
         __doc__="An `int` with the card's number in the computer. Each card type is numbered separately.",
     ),
     'chan_no_on_card': dict(
         item=ChannelDataItem.CHAN_NO_ON_CARD,
         ctype=ct.c_uint32,
         ptype=int,
+        static=True,
         __doc__="An `int` of the channel number on the card.",
     ),
     'card_serial_no': dict(
         item=ChannelDataItem.CARD_SERIAL_NO,
         ctype=ct.c_uint64,
         ptype=int,
+        static=True,
         __doc__="An `int` with the serial number of the card, or 0 if it doesn't have a serial number.",
     ),
     'trans_serial_no': dict(
         item=ChannelDataItem.TRANS_SERIAL_NO,
         ctype=ct.c_uint32,
         ptype=int,
+        static=True,
         __doc__="An `int` with the serial number of the transceiver, or 0 if it doesn't have a serial number. Not implemented in Linux.",
     ),
     'card_firmware_rev': dict(
@@ -64,30 +75,35 @@ ATTRIBUTES = {
         ctype=ct.c_uint16 * 4,
         # little byteorder assumed:
         ptype=lambda t: VersionNumber(t[3], t[2], release=t[1], build=t[0]),
+        static=True,
         __doc__="A `canlib.VersionNumber` object with the version of the card's firmware.",
     ),
     'card_hardware_rev': dict(
         item=ChannelDataItem.CARD_HARDWARE_REV,
         ctype=ct.c_uint16 * 4,
         ptype=lambda t: VersionNumber(t[1], t[0]),  # little byteorder assumed
+        static=True,
         __doc__="A `canlib.VersionNumber` object with the version of the card's hardware.",
     ),
     'card_upc_no': dict(
         item=ChannelDataItem.CARD_UPC_NO,
         ctype=ct.c_ubyte * 8,
         ptype=EAN.from_bcd,
+        static=True,
         __doc__="An `canlib.EAN` object with the EAN of the card, or `None` if it doesn't one.",
     ),
     'clock_info': dict(
         item=ChannelDataItem.CLOCK_INFO,
         ctype=ct.c_uint * 5,
         ptype=ClockInfo.from_list,
+        static=True,
         __doc__="A `~canlib.canlib.busparams.ClockInfo` object with clock characteristics for the device (added in v1.16).",
     ),
     'trans_upc_no': dict(
         item=ChannelDataItem.TRANS_UPC_NO,
         ctype=ct.c_ubyte * 8,
         ptype=EAN.from_bcd,
+        static=True,
         __doc__="An `canlib.EAN` object with the EAN of the transceiver, or `None` if it doesn't have one. Not implemented in Linux.",
     ),
     # 'channel_name': dict(  # ~deprecated
@@ -97,24 +113,28 @@ ATTRIBUTES = {
         item=ChannelDataItem.DLL_FILE_VERSION,
         ctype=ct.c_uint16 * 4,
         ptype=lambda t: VersionNumber(t[3], t[2], t[1]),  # little byteorder assumed,
+        static=True,
         __doc__="A `canlib.VersionNumber` with the version of the dll file.",
     ),
     'dll_product_version': dict(
         item=ChannelDataItem.DLL_PRODUCT_VERSION,
         ctype=ct.c_uint16 * 4,
         ptype=lambda t: VersionNumber(t[3], t[2]),  # little byteorder assumed,
+        static=True,
         __doc__="A `canlib.VersionNumber` with the product version of the dll.",
     ),
     'dll_filetype': dict(
         item=ChannelDataItem.DLL_FILETYPE,
         ctype=ct.c_uint32,
         ptype=int,
+        static=True,
         __doc__="1 if \"kvalapw.dll\" is used, 2 if \"kvalapw2.dll\"",
     ),
     'trans_type': dict(
         item=ChannelDataItem.TRANS_TYPE,
         ctype=ct.c_uint32,
         ptype=TransceiverType,
+        static=True,
         __doc__="A member of the `TransceiverType` enum.",
     ),
     'device_physical_position': dict(
@@ -139,42 +159,49 @@ ATTRIBUTES = {
         item=ChannelDataItem.DRIVER_FILE_VERSION,
         ctype=ct.c_uint16 * 4,
         ptype=lambda t: VersionNumber(t[3], t[2], t[1]),  # little byteorder assumed,
+        static=True,
         __doc__="A `canlib.VersionNumber` with the version of the kernel-mode driver. Not implemented in Linux.",
     ),
     'driver_product_version': dict(
         item=ChannelDataItem.DRIVER_PRODUCT_VERSION,
         ctype=ct.c_uint16 * 4,
         ptype=lambda t: VersionNumber(t[3], t[2]),  # little byteorder assumed,
+        static=True,
         __doc__="A `canlib.VersionNumber` with the product version of the kernel-mode driver. Not implemented in Linux.",
     ),
     'mfgname_unicode': dict(
         item=ChannelDataItem.MFGNAME_UNICODE,
         ctype=ct.c_wchar * 80,
         ptype=str,
+        static=True,
         __doc__="A `str` with the manufacturer's name. Not implemented in Linux.",
     ),
     'mfgname_ascii': dict(
         item=ChannelDataItem.MFGNAME_ASCII,
         ctype=ct.c_char * 80,
         ptype=str,
+        static=True,
         __doc__="A `str` with the manufacturer's name.",
     ),
     'devdescr_unicode': dict(
         item=ChannelDataItem.DEVDESCR_UNICODE,
         ctype=ct.c_wchar * 80,
         ptype=str,
+        static=True,
         __doc__="A `str` with the product name of the device. Not implemented in Linux.",
     ),
     'devdescr_ascii': dict(
         item=ChannelDataItem.DEVDESCR_ASCII,
         ctype=ct.c_char * 80,
         ptype=str,
+        static=True,
         __doc__="A `str` with the product name of the device.",
     ),
     'driver_name': dict(
         item=ChannelDataItem.DRIVER_NAME,
         ctype=ct.c_char * 80,
         ptype=str,
+        static=True,
         __doc__="A `str` with the name of the device driver.",
     ),
     'channel_quality': dict(
@@ -235,12 +262,14 @@ ATTRIBUTES = {
         item=ChannelDataItem.MAX_BITRATE,
         ctype=ct.c_uint32,
         ptype=int,
+        static=True,
         __doc__="An `int` with the maximum bitrate of the device. Zero means no limit on the bitrate.",
     ),
     'channel_cap_mask': dict(
         item=ChannelDataItem.CHANNEL_CAP_MASK,
         ctype=ct.c_uint32,
         ptype=ChannelCap,
+        static=True,
         __doc__="A `ChannelCap` with which flags this device knows about.",
     ),
     'is_remote': dict(
@@ -259,6 +288,7 @@ ATTRIBUTES = {
         item=ChannelDataItem.LOGGER_TYPE,
         ctype=ct.c_uint32,
         ptype=LoggerType,
+        static=True,
         __doc__="A member of the `LoggerType` enum. Not implemented in Linux.",
     ),
     'hw_status': dict(
@@ -271,17 +301,33 @@ ATTRIBUTES = {
         item=ChannelDataItem.FEATURE_EAN,
         ctype=ct.c_ubyte * 8,
         ptype=EAN.from_bcd,
+        static=True,
         __doc__="An `canlib.EAN` object with an internal EAN. This is only intended for internal use.",
     ),
     'channel_cap_ex': dict(
         item=ChannelDataItem.CHANNEL_CAP_EX,
         ctype=ct.c_uint64 * 2,
         ptype=lambda x: (ChannelCapEx(x[0]), ChannelCapEx(x[1])),
+        static=True,
         __doc__="A tuple of `ChannelCapEx` with the extended capabilities of the channel (added in v1.17).",
     ),
 }
 
 
+# Cached static attribute values, {(channel_number, name): value}
+_static_cache = {}
+_static_cache_generation = None
+
+
+def _static_values():
+    """Return the cache of static attributes, emptied if it is out of date"""
+    global _static_cache_generation
+    if _static_cache_generation != wrapper._library_generation:
+        _static_cache.clear()
+        _static_cache_generation = wrapper._library_generation
+    return _static_cache
+
+
 class ChannelData:
     __doc__ = """Object for querying various information about a channel
 
@@ -290,6 +336,13 @@ class ChannelData:
     the C constant used to retrieve the information and are found in the list
     below.
 
+    Attributes that never change while a device is connected, such as the EAN,
+    serial number and firmware version, are only read from the driver the
+    first time they are used for a channel number. The cached values are
+    dropped when the library is reinitialized or `enumerate_hardware` is
+    called. Pass ``cache=False`` to always read from the driver, e.g. to
+    check whether a device is still connected (added in v1.32).
+
     Other information does not follow the C implementation completely, and are
     documented as separate properties further down.
 
@@ -304,8 +357,11 @@ class ChannelData:
         )
     )
 
-    def __init__(self, channel_number):
+    _cache = True
+
+    def __init__(self, channel_number, cache=True):
         self.channel_number = channel_number
+        self._cache = cache
 
     def __dir__(self):
         # Support autocompletion in IDE by adding our attributes
@@ -320,6 +376,21 @@ class ChannelData:
                 f"{self.__class__.__name__} object has no attribute {name}"
             )
 
+        if attr.get('static') and self._cache:
+            key = self._cache_key()
+            if key is not None:
+                cache = _static_values()
+                try:
+                    return cache[key, name]
+                except KeyError:
+                    ret = cache[key, name] = self._read_attribute(attr)
+                    return ret
+        return self._read_attribute(attr)
+
+    def _cache_key(self):
+        return self.channel_number
+
+    def _read_attribute(self, attr):
         item = attr['item']
         ctype = attr['ctype']
         ptype = attr['ptype']
@@ -369,6 +440,36 @@ class ChannelData:
             else:
                 return tuple(buf)
 
+    def snapshot(self):
+        """Read all attributes in one pass
+
+        Attributes that are not supported by the device or platform are left
+        out. Static attributes are taken from the cache if they have been read
+        before, and are cached otherwise.
+
+        Returns:
+            `dict` with the attributes listed above, and `channel_name` and
+            `custom_name`, as ``{name: value}``.
+
+        .. versionadded:: 1.32
+
+        """
+        values = {}
+        for name in sorted(ATTRIBUTES):
+            try:
+                values[name] = getattr(self, name)
+            except CanNotFound:
+                raise
+            except CanError:
+                # Not implemented for this device or on this platform
+                continue
+        if 'devdescr_ascii' in values and 'chan_no_on_card' in values:
+            values['channel_name'] = (
+                f"{values['devdescr_ascii']} (channel {values['chan_no_on_card']})"
+            )
+        values['custom_name'] = self.custom_name
+        return values
+
     @property
     def bus_param_limits(self):
         """Get device's bus parameter limits
@@ -459,6 +560,10 @@ class HandleData(ChannelData):
     def __init__(self, channel):
         self.channel = channel
 
+    def _cache_key(self):
+        # Channels created from a bare handle have no channel number
+        return self.channel.index
+
     def raw(self, item, ctype=ct.c_uint32):
         """A raw call to `canGetHandleData`
 
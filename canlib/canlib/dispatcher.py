@@ -0,0 +1,427 @@
+"""Routing of received frames to subscribers by identifier
+
+Frames read from a channel are usually switched on by identifier in the
+reading loop, and opening one handle per consumer makes every handle receive
+every frame. A `Dispatcher` owns a single `Channel`, reads frames in bursts
+from a background thread and routes each frame to the subscribers of its
+identifier:
+
+    >>> from canlib import canlib
+    >>> dispatcher = canlib.Dispatcher(ch)
+    >>> dispatcher.subscribe(0x123, callback=on_speed)
+    >>> engine = dispatcher.subscribe(range(0x200, 0x210))
+    >>> slow = dispatcher.subscribe((0x18FF0000, 0x18FFFFFF), extended=True,
+    ...                             callback=store, threaded=True)
+    >>> with dispatcher:
+    ...     frame = engine.get(timeout=100)
+
+The subscribers of each identifier are looked up once and kept in a table,
+so routing a frame costs one dictionary lookup however many subscriptions
+there are.
+
+.. versionadded:: 1.32
+
+"""
+
+import collections
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .acceptance import EXT_ID_MASK, STD_ID_MASK, _parse
+from .enums import MessageFlag
+from .exceptions import CanNoMsg
+
+_EXT = int(MessageFlag.EXT)
+_ERROR_FRAME = int(MessageFlag.ERROR_FRAME)
+# Added to extended identifiers in the routing table, to keep them apart
+# from standard identifiers with the same value
+_EXT_KEY = 1 << 29
+
+SubscriberStats = namedtuple('SubscriberStats', 'frames delivered dropped pending max_lag')
+SubscriberStats.__doc__ = """Counters of a `Subscription`
+
+    Attributes:
+        frames (`int`): Frames routed to the subscriber
+        delivered (`int`): Frames passed to the callback or taken using
+            `Subscription.get`
+        dropped (`int`): Frames dropped because the queue was full
+        pending (`int`): Frames waiting in the queue
+        max_lag (`float`): The longest time in seconds from a frame being read
+            until it was delivered, always 0.0 for synchronous callbacks
+
+    .. versionadded:: 1.32
+
+"""
+
+DispatcherStats = namedtuple('DispatcherStats', 'frames bursts max_burst')
+DispatcherStats.__doc__ = """Counters of a `Dispatcher`
+
+    Attributes:
+        frames (`int`): Frames dispatched
+        bursts (`int`): Number of bursts of frames dispatched
+        max_burst (`int`): Frames in the largest burst
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class Subscription:
+    """A subscriber to frames routed by a `Dispatcher`
+
+    Created by `Dispatcher.subscribe`. Without a callback, frames are queued
+    and taken using `get`.
+
+    Attributes:
+        callback: The function called with each frame, or `None`
+        predicate: The function selecting frames, or `None`
+        extended (`bool`): Whether the identifiers are extended identifiers
+        threaded (`bool`): Whether `callback` is called from the worker pool
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, dispatcher, ids, extended, predicate, callback, threaded, maxlen):
+        self.dispatcher = dispatcher
+        self.extended = extended
+        self.predicate = predicate
+        self.callback = callback
+        self.threaded = threaded
+        if ids is None:
+            self._ids = self._ranges = None
+        else:
+            if isinstance(ids, (int, range, tuple)):
+                ids = [ids]
+            self._ids, self._ranges = _parse(ids, EXT_ID_MASK if extended else STD_ID_MASK)
+        self._queue = collections.deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._scheduled = False
+        self._counts = dict.fromkeys(SubscriberStats._fields, 0)
+        self._counts['max_lag'] = 0.0
+
+    @property
+    def stats(self):
+        """`SubscriberStats`: Counters since the subscription was created"""
+        with self._cond:
+            self._counts['pending'] = len(self._queue)
+            return SubscriberStats(**self._counts)
+
+    def matches(self, id_, extended=False):
+        """Return whether an identifier is subscribed to
+
+        The predicate is not considered. A subscription without identifiers
+        matches all identifiers.
+
+        """
+        if self._ids is None:
+            return True
+        if bool(extended) != self.extended:
+            return False
+        return id_ in self._ids or any(first <= id_ <= last for first, last in self._ranges)
+
+    def get(self, timeout=0):
+        """Take the next queued frame
+
+        Args:
+            timeout (`int`): Maximum time in milliseconds to wait for a frame,
+                `None` waits until the subscription is closed
+
+        Raises:
+            `CanNoMsg`: No frame was available in time
+
+        """
+        with self._cond:
+            seconds = None if timeout is None else timeout / 1000
+            self._cond.wait_for(lambda: self._queue or self._closed, seconds)
+            if not self._queue:
+                raise CanNoMsg()
+            read_time, frame = self._queue.popleft()
+            self._delivered(read_time)
+        return frame
+
+    def close(self):
+        """Stop receiving frames, same as `Dispatcher.unsubscribe`"""
+        self.dispatcher.unsubscribe(self)
+
+    def _put(self, frame, read_time):
+        if self.callback is not None and not self.threaded:
+            self._counts['frames'] += 1
+            self._counts['delivered'] += 1
+            self.callback(frame)
+            return
+        with self._cond:
+            counts = self._counts
+            counts['frames'] += 1
+            queue = self._queue
+            if len(queue) == queue.maxlen:
+                counts['dropped'] += 1
+            queue.append((read_time, frame))
+            if self.callback is None:
+                self._cond.notify()
+                return
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.dispatcher._submit(self._drain)
+
+    def _drain(self):
+        callback = self.callback
+        while True:
+            with self._cond:
+                if not self._queue:
+                    self._scheduled = False
+                    return
+                read_time, frame = self._queue.popleft()
+                self._delivered(read_time)
+            try:
+                callback(frame)
+            except Exception as e:
+                with self._cond:
+                    self._scheduled = False
+                self.dispatcher._fail(e)
+                return
+
+    def _delivered(self, read_time):
+        counts = self._counts
+        counts['delivered'] += 1
+        lag = time.perf_counter() - read_time
+        if lag > counts['max_lag']:
+            counts['max_lag'] = lag
+
+    def _close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class Dispatcher:
+    """Reads frames from a channel and routes them to subscribers
+
+    Subscriptions are made by identifier, by range of identifiers, by
+    predicate, or by a combination of identifiers and a predicate, see
+    `subscribe`. Each subscription receives frames in one of three ways:
+
+    - synchronous: `callback` is called from the reader thread, so it must
+      return quickly or the reading falls behind,
+    - queued: frames are queued in the `Subscription`, and taken using
+      `Subscription.get`,
+    - threaded: frames are queued and passed to `callback` from a pool of
+      `workers` threads, one frame at a time and in order per subscription.
+
+    Queued frames are dropped, oldest first, when a queue is full, and
+    counted in `Subscription.stats`.
+
+    Error frames are only routed to subscriptions without identifiers.
+
+    Frames are read from `channel` in a background thread, started by
+    `start` or by using the dispatcher as a context manager. Frames can also
+    be passed to `dispatch`.
+
+    Args:
+        channel (`Channel`): The channel to read from
+        burst (`int`): Maximum number of frames read and dispatched in one go
+        read_timeout (`int`): Timeout in milliseconds of each read in the
+            reader thread, which limits how long `stop` takes
+        workers (`int`): Number of threads calling threaded callbacks
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, channel=None, burst=256, read_timeout=10, workers=4):
+        self.channel = channel
+        self.burst = burst
+        self.read_timeout = read_timeout
+        self.workers = workers
+        self._subscriptions = []
+        # Subscriptions without identifiers, checked for every frame
+        self._unrouted = ()
+        # Routing key -> subscriptions
+        self._table = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+        self._counts = dict.fromkeys(DispatcherStats._fields, 0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def stats(self):
+        """`DispatcherStats`: Counters since the dispatcher was created"""
+        return DispatcherStats(**self._counts)
+
+    @property
+    def subscriptions(self):
+        """`list` of `Subscription`: The current subscriptions"""
+        with self._lock:
+            return list(self._subscriptions)
+
+    def subscribe(
+        self,
+        ids=None,
+        callback=None,
+        predicate=None,
+        extended=False,
+        threaded=False,
+        maxlen=10000,
+    ):
+        """Add a subscription
+
+        Args:
+            ids: The identifiers, as an `int`, a `range`, a (first, last)
+                tuple of an inclusive range, or a list of these. `None`
+                subscribes to all frames, including error frames.
+            callback: Function called with each `~canlib.Frame`, or `None` to
+                queue the frames
+            predicate: Function called with each frame with a subscribed
+                identifier, only frames for which it returns true are routed
+            extended (`bool`): Whether `ids` are extended identifiers
+            threaded (`bool`): Call `callback` from the worker pool
+            maxlen (`int`): Maximum number of queued frames
+
+        Returns:
+            `Subscription`
+
+        """
+        if threaded and callback is None:
+            raise ValueError("A threaded subscription needs a callback")
+        subscription = Subscription(
+            self, ids, bool(extended), predicate, callback, threaded, maxlen
+        )
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._rebuild()
+            if threaded and self._thread is not None and self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription
+
+        Frames already queued can still be taken from it.
+
+        """
+        with self._lock:
+            self._subscriptions.remove(subscription)
+            self._rebuild()
+        subscription._close()
+
+    def dispatch(self, frames):
+        """Route a batch of frames to the subscribers
+
+        Args:
+            frames: List of `~canlib.Frame`
+
+        """
+        read_time = time.perf_counter()
+        table = self._table
+        unrouted = self._unrouted
+        for frame in frames:
+            flags = frame.flags
+            if not flags & _ERROR_FRAME:
+                key = frame.id | _EXT_KEY if flags & _EXT else frame.id
+                subscriptions = table.get(key)
+                if subscriptions is None:
+                    subscriptions = self._add_route(key)
+                for subscription in subscriptions:
+                    predicate = subscription.predicate
+                    if predicate is None or predicate(frame):
+                        subscription._put(frame, read_time)
+            for subscription in unrouted:
+                predicate = subscription.predicate
+                if predicate is None or predicate(frame):
+                    subscription._put(frame, read_time)
+        counts = self._counts
+        counts['frames'] += len(frames)
+        counts['bursts'] += 1
+        if len(frames) > counts['max_burst']:
+            counts['max_burst'] = len(frames)
+
+    def start(self):
+        """Start reading frames from the channel"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if any(s.threaded for s in self._subscriptions):
+                self._pool = ThreadPoolExecutor(self.workers)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reading frames
+
+        Waits for the frames queued for threaded callbacks to be handled. Any
+        error raised in the reader thread or by a callback is raised again
+        here.
+
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        read = self.channel.read
+        dispatch = self.dispatch
+        try:
+            while not self._stopping.is_set():
+                try:
+                    frames = [read(timeout=self.read_timeout)]
+                except CanNoMsg:
+                    continue
+                try:
+                    for _ in range(self.burst - 1):
+                        frames.append(read())
+                except CanNoMsg:
+                    pass
+                dispatch(frames)
+        except Exception as e:
+            self._fail(e)
+
+    def _submit(self, function):
+        pool = self._pool
+        if pool is None:
+            # Not started, e.g. frames passed to dispatch directly
+            function()
+        else:
+            pool.submit(function)
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stopping.set()
+
+    def _add_route(self, key):
+        extended = bool(key & _EXT_KEY)
+        id_ = key & ~_EXT_KEY if extended else key
+        with self._lock:
+            subscriptions = tuple(
+                s for s in self._subscriptions
+                if s._ids is not None and s.matches(id_, extended)
+            )
+            return self._table.setdefault(key, subscriptions)
+
+    def _rebuild(self):
+        self._unrouted = tuple(s for s in self._subscriptions if s._ids is None)
+        # Routes are added again as identifiers are seen
+        self._table = {}
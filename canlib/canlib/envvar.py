@@ -1,5 +1,44 @@
+import functools
+import struct
+import time
+from collections import deque, namedtuple
+
+from . import constants as const
 from .enums import EnvVarType
-from .exceptions import EnvvarNameError
+from .exceptions import (CanNoMsg, CanTimeout, EnvvarNameError,
+                         MailboxProtocolError)
+
+#: Default size in bytes of each slot in a `Mailbox` data envvar, including
+#: the chunk header.
+MAILBOX_SLOT_SIZE = 512
+
+#: Default maximum length in bytes of a message sent by a `Mailbox`, the size
+#: of the message buffer of the t program.
+MAILBOX_MAX_MESSAGE = 8192
+
+# Chunk header: sequence number, payload length, flags and one reserved byte
+_CHUNK_HEADER = struct.Struct('<IHBB')
+_CHUNK_FIRST = 0x01
+_CHUNK_LAST = 0x02
+
+MailboxStats = namedtuple(
+    'MailboxStats',
+    'messages_sent messages_received chunks_sent chunks_received transfers credit_waits',
+)
+MailboxStats.__doc__ = """Counters of a `Mailbox`
+
+    Attributes:
+        messages_sent (`int`): Messages passed to `Mailbox.send`
+        messages_received (`int`): Messages returned by `Mailbox.recv`
+        chunks_sent (`int`): Chunks written to the t program
+        chunks_received (`int`): Chunks read from the t program
+        transfers (`int`): Number of data envvar reads and writes
+        credit_waits (`int`): Number of times sending had to wait for the t
+            program to consume chunks
+
+    .. versionadded:: 1.32
+
+"""
 
 
 class DataEnvVar:
@@ -133,43 +172,593 @@ class EnvVar:
     def __init__(self, channel):
         self.__dict__['_channel'] = channel
         self.__dict__['_attrib'] = {}
+        # Accessor functions of opened envvars, so that the type of an envvar
+        # is only looked at the first time it is used
+        self.__dict__['_getters'] = {}
+        self.__dict__['_setters'] = {}
 
     def _ensure_open(self, name):
         if name.startswith('_'):
             raise EnvvarNameError(name)
         # We just check the handle here
         if name not in self.__dict__['_attrib']:
-            self._attrib[name] = EnvVar.Attrib(*self._channel.scriptEnvvarOpen(name))
+            attrib = EnvVar.Attrib(*self._channel.scriptEnvvarOpen(name))
+            self._attrib[name] = attrib
+            self._getters[name], self._setters[name] = _accessors(self._channel, name, attrib)
+        return self._attrib[name]
 
-    def __getattr__(self, name):
+    def _accessors_of(self, name):
         self._ensure_open(name)
-        handle = self._attrib[name].handle
-        if self._attrib[name].type_ == EnvVarType.INT:
-            value = self._channel.scriptEnvvarGetInt(handle)
-        elif self._attrib[name].type_ == EnvVarType.FLOAT:
-            value = self._channel.scriptEnvvarGetFloat(handle)
-        elif self._attrib[name].type_ == EnvVarType.STRING:
-            size = self._attrib[name].size
-            value = DataEnvVar(self._channel, handle, name, size)
-        else:
-            msg = "getting is not implemented for type {type_}"
-            msg = msg.format(type_=self._attrib[name].type_)
-            raise TypeError(msg)
-        return value
+        return self._getters[name], self._setters[name]
+
+    def __getattr__(self, name):
+        try:
+            getter = self._getters[name]
+        except KeyError:
+            self._ensure_open(name)
+            getter = self._getters[name]
+        return getter()
 
     def __setattr__(self, name, value):
-        self._ensure_open(name)
-        handle = self._attrib[name].handle
-        if self._attrib[name].type_ == EnvVarType.INT:
-            value = self._channel.scriptEnvvarSetInt(handle, value)
-        elif self._attrib[name].type_ == EnvVarType.FLOAT:
-            value = self._channel.scriptEnvvarSetFloat(handle, value)
-        elif self._attrib[name].type_ == EnvVarType.STRING:
-            size = self._attrib[name].size
+        try:
+            setter = self._setters[name]
+        except KeyError:
+            self._ensure_open(name)
+            setter = self._setters[name]
+        setter(value)
+
+
+def _accessors(channel, name, attrib):
+    """Return getter and setter functions for an opened envvar"""
+    handle = attrib.handle
+    if attrib.type_ == EnvVarType.INT:
+        return (
+            functools.partial(channel.scriptEnvvarGetInt, handle),
+            functools.partial(channel.scriptEnvvarSetInt, handle),
+        )
+    elif attrib.type_ == EnvVarType.FLOAT:
+        return (
+            functools.partial(channel.scriptEnvvarGetFloat, handle),
+            functools.partial(channel.scriptEnvvarSetFloat, handle),
+        )
+    elif attrib.type_ == EnvVarType.STRING:
+        size = attrib.size
+        data = DataEnvVar(channel, handle, name, size)
+
+        def get_data():
+            return data
+
+        def set_data(value):
             if len(value) != size:
                 raise ValueError("Size of data and envvar is not same")
-            self._channel.script_envvar_set_data(handle, value, len=size, start=0)
-        else:
+            channel.script_envvar_set_data(handle, value, len=size, start=0)
+
+        return get_data, set_data
+    else:
+
+        def get_other():
+            msg = "getting is not implemented for type {type_}"
+            raise TypeError(msg.format(type_=attrib.type_))
+
+        def set_other(value):
             msg = "setting is not implemented for type {type_}"
-            msg = msg.format(type_=self._attrib[name].type_)
-            raise TypeError(msg)
+            raise TypeError(msg.format(type_=attrib.type_))
+
+        return get_other, set_other
+
+
+def read_envvars(envvar, names):
+    """Read several environment variables in one call
+
+    The envvars are opened and their types looked up the first time they are
+    used, after that each envvar is read directly:
+
+        >>> canlib.read_envvars(ch.envvar, ['IntVal', 'FloatVal'])
+        {'IntVal': 3, 'FloatVal': 15.0}
+
+    Args:
+        envvar (`EnvVar`): The environment variables of a channel, i.e.
+            `Channel.envvar`
+        names: Names of the envvars to read
+
+    Returns:
+        `dict` mapping each name to its value. The value of an envvar
+        declared as ``char*`` is returned as `bytes`.
+
+    .. versionadded:: 1.32
+
+    """
+    values = {}
+    for name in names:
+        attrib = envvar._ensure_open(name)
+        if attrib.type_ == EnvVarType.STRING:
+            values[name] = envvar._channel.script_envvar_get_data(
+                attrib.handle, len=attrib.size, start=0
+            )
+        else:
+            values[name] = envvar._getters[name]()
+    return values
+
+
+def write_envvars(envvar, values):
+    """Write several environment variables in one call
+
+        >>> canlib.write_envvars(ch.envvar, {'IntVal': 3, 'FloatVal': 15.0})
+
+    Args:
+        envvar (`EnvVar`): The environment variables of a channel, i.e.
+            `Channel.envvar`
+        values (`dict`): Mapping from envvar name to value, the envvars are
+            written in this order. Data for envvars declared as ``char*``
+            must have the same size as the envvar.
+
+    .. versionadded:: 1.32
+
+    """
+    for name, value in values.items():
+        envvar._ensure_open(name)
+        envvar._setters[name](value)
+
+
+class DataMirror:
+    """Local copy of an environment variable declared as ``char*``
+
+    Behaves like `DataEnvVar`, but reads and writes the local copy in a
+    `EnvVarMirror` instead of the t program. The regions that are changed are
+    remembered until the mirror is pushed.
+
+        >>> mirror['DataVal'][3:6] = b'old'
+        >>> mirror['DataVal'].dirty_ranges()
+        [(3, 6)]
+
+    The size can not be changed, so the data written to a slice must have the
+    same length as the slice.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, data):
+        self._data = bytearray(data)
+        self._dirty = []
+
+    def __bytes__(self):
+        return bytes(self._data)
+
+    def __eq__(self, other):
+        return bytes(self._data) == other
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return bytes(self._data[key])
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        size = len(self._data)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            if step != 1:
+                raise NotImplementedError('step is not yet implemented in set')
+            stop = max(start, stop)
+            if len(value) != stop - start:
+                raise ValueError("Size of data and envvar is not same")
+            self._data[start:stop] = value
+        else:
+            start = range(size)[key]
+            stop = start + 1
+            if isinstance(value, int):
+                self._data[start] = value
+            elif len(value) == 1:
+                self._data[start:stop] = value
+            else:
+                raise ValueError("Size of data and envvar is not same")
+        if start < stop:
+            self._dirty.append((start, stop))
+
+    def __str__(self):
+        return self._data.decode('utf-8')
+
+    def dirty_ranges(self):
+        """Return the changed regions as sorted ``(start, stop)`` tuples
+
+        Overlapping and adjacent regions are merged.
+
+        """
+        merged = []
+        for start, stop in sorted(self._dirty):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        self._dirty = merged
+        return list(merged)
+
+    def _load(self, data):
+        self._data[:] = data
+        self._dirty = []
+
+
+class EnvVarMirror:
+    """A cached local copy of environment variables in a t program
+
+    Every access through `EnvVar` is a call into CANlib, and because partial
+    reads and writes of ``char*`` envvars do not yet work (BLB-1104), every
+    access to a part of a `DataEnvVar` transfers the whole envvar, twice when
+    writing. A mirror instead reads the envvars once using `pull`, is changed
+    locally, and writes the changed envvars back using `push`:
+
+        >>> mirror = canlib.EnvVarMirror(ch.envvar, ['IntVal', 'DataVal'])
+        >>> mirror['IntVal']
+        3
+        >>> mirror['IntVal'] += 1
+        >>> mirror['DataVal'][3:6] = b'old'
+        >>> mirror['DataVal'][100] = 0
+        >>> mirror.dirty
+        ['IntVal', 'DataVal']
+        >>> mirror.push()
+
+    Envvars declared as ``char*`` are mirrored as `DataMirror` objects, which
+    keep track of the regions that have been changed. By default a changed
+    data envvar is written in full, with `partial_writes` only the changed
+    regions are written.
+
+    Args:
+        envvar (`EnvVar`): The environment variables of a channel, i.e.
+            `Channel.envvar`
+        names: Names of the envvars to mirror
+        partial_writes (`bool`): Only write the changed regions of data
+            envvars. Leave this off until partial writes are supported by
+            CANlib.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, envvar, names, partial_writes=False):
+        self.partial_writes = partial_writes
+        self._envvar = envvar
+        self._attribs = {}
+        for name in names:
+            attrib = envvar._ensure_open(name)
+            if attrib.type_ not in (EnvVarType.INT, EnvVarType.FLOAT, EnvVarType.STRING):
+                msg = "mirroring is not implemented for type {type_}"
+                raise TypeError(msg.format(type_=attrib.type_))
+            self._attribs[name] = attrib
+        self._values = {}
+        self._dirty = set()
+        self.pull()
+
+    def __contains__(self, name):
+        return name in self._attribs
+
+    def __iter__(self):
+        return iter(self._attribs)
+
+    def __len__(self):
+        return len(self._attribs)
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __setitem__(self, name, value):
+        attrib = self._attribs[name]
+        if attrib.type_ == EnvVarType.STRING:
+            if len(value) != attrib.size:
+                raise ValueError("Size of data and envvar is not same")
+            self._values[name][:] = value
+        else:
+            self._values[name] = value
+            self._dirty.add(name)
+
+    @property
+    def dirty(self):
+        """`list` of `str`: Names of envvars with changes that are not pushed"""
+        return [
+            name
+            for name, attrib in self._attribs.items()
+            if name in self._dirty
+            or (attrib.type_ == EnvVarType.STRING and self._values[name]._dirty)
+        ]
+
+    def pull(self, *names):
+        """Read envvars from the t program into the mirror
+
+        Any local changes to the envvars that have not been pushed are lost.
+
+        Args:
+            names: Names of the envvars to read, default is all mirrored
+                envvars
+
+        """
+        channel = self._envvar._channel
+        for name in names or self._attribs:
+            attrib = self._attribs[name]
+            if attrib.type_ == EnvVarType.STRING:
+                # fb:25388, BLB-1104, always read the whole envvar
+                data = channel.script_envvar_get_data(attrib.handle, len=attrib.size, start=0)
+                if name in self._values:
+                    self._values[name]._load(data)
+                else:
+                    self._values[name] = DataMirror(data)
+            else:
+                self._values[name] = self._envvar._getters[name]()
+                self._dirty.discard(name)
+
+    def push(self):
+        """Write the changed envvars in the mirror to the t program
+
+        Returns:
+            `list` of `str`: Names of the envvars that were written
+
+        """
+        channel = self._envvar._channel
+        written = []
+        for name in self.dirty:
+            attrib = self._attribs[name]
+            value = self._values[name]
+            if attrib.type_ == EnvVarType.STRING:
+                if self.partial_writes:
+                    for start, stop in value.dirty_ranges():
+                        channel.script_envvar_set_data(
+                            attrib.handle, value[start:stop], len=stop - start, start=start
+                        )
+                else:
+                    channel.script_envvar_set_data(
+                        attrib.handle, bytes(value), len=attrib.size, start=0
+                    )
+                value._dirty = []
+            else:
+                self._envvar._setters[name](value)
+                self._dirty.discard(name)
+            written.append(name)
+        return written
+
+
+class Mailbox:
+    """Framed message transfer between the host and a t program
+
+    Messages of up to `max_message` bytes are sent to the t program, whose
+    message buffer is this size, and any length is received from it, through
+    a pair of data envvars, which are divided into slots of `slot_size` bytes. A message is
+    split into sequence numbered chunks, one per slot, and as many chunks as
+    there are free slots are written in a single envvar transfer, followed by
+    a key event (see `Channel.scriptSendEvent`) that tells the t program to
+    consume them. The t program returns credits by updating an int envvar
+    with the next sequence number it expects, so the host never overwrites a
+    chunk that has not yet been consumed, but also never waits for each chunk
+    to be acknowledged.
+
+    The t side of the protocol is found in ``examples/mailbox.t``, which also
+    declares the envvars used. With the default `prefix` they are:
+
+    ============  =========================  ==================================
+    Envvar        Type                       Written by
+    ============  =========================  ==================================
+    MbxDown       ``char[]``                 host, chunks to the t program
+    MbxDownAck    ``int``                    t program, next expected chunk
+    MbxUp         ``char[]``                 t program, chunks to the host
+    MbxUpHead     ``int``                    t program, next chunk to write
+    MbxUpAck      ``int``                    host, next expected chunk
+    ============  =========================  ==================================
+
+    Example:
+
+        >>> mailbox = canlib.Mailbox(ch)
+        >>> mailbox.send(calibration_table)
+        >>> mailbox.flush(timeout=1000)
+        >>> result = mailbox.recv(timeout=1000)
+
+    Args:
+        channel (`Channel`): Channel of the device running the t program
+        prefix (`str`): Prefix of the envvar names
+        slot (`int`): Script slot of the t program, used for the key events
+        key (`str`): Key of the key event sent after writing chunks
+        slot_size (`int`): Size of each slot, must match the t program. The
+            size of the data envvars must be a multiple of this.
+        poll_interval (`float`): Seconds to sleep between polls while waiting
+            for credits or messages
+        partial_writes (`bool`): Only write the slots that changed, see
+            `EnvVarMirror`.
+        max_message (`int`): Maximum length of a message sent, must match
+            ``MBX_MAX_MESSAGE`` of the t program, which drops longer messages.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, channel, prefix='Mbx', slot=0, key='M', slot_size=MAILBOX_SLOT_SIZE,
+        poll_interval=0.0005, partial_writes=False, max_message=MAILBOX_MAX_MESSAGE,
+    ):
+        envvar = channel.envvar
+        self._channel = channel
+        self._slot = slot
+        self._key = ord(key)
+        self._slot_size = slot_size
+        self._payload_size = slot_size - _CHUNK_HEADER.size
+        self.max_message = max_message
+        self.poll_interval = poll_interval
+
+        self._tx = EnvVarMirror(envvar, [prefix + 'Down'], partial_writes=partial_writes)
+        self._tx_data = self._tx[prefix + 'Down']
+        self._tx_ack = prefix + 'DownAck'
+        self._rx_head = prefix + 'UpHead'
+        self._rx_ack = prefix + 'UpAck'
+        self._rx_attrib = envvar._ensure_open(prefix + 'Up')
+        self._get_tx_ack = envvar._accessors_of(self._tx_ack)[0]
+        self._get_rx_head = envvar._accessors_of(self._rx_head)[0]
+        get_rx_ack, self._set_rx_ack = envvar._accessors_of(self._rx_ack)
+        sizes = (len(self._tx_data), self._rx_attrib.size)
+        if self._payload_size <= 0 or any(size % slot_size for size in sizes):
+            raise ValueError(f"Size of data envvars {sizes} is not a multiple of {slot_size}")
+        self._tx_window = len(self._tx_data) // slot_size
+        self._rx_window = self._rx_attrib.size // slot_size
+
+        # Sequence numbers start at one, so that an empty slot is never valid
+        self._tx_seq = self._tx_acked = max(1, self._get_tx_ack())
+        self._rx_seq = max(1, get_rx_ack())
+        self._pending = deque()
+        self._parts = None
+        self._messages = deque()
+        self._counts = dict.fromkeys(MailboxStats._fields, 0)
+
+    @property
+    def stats(self):
+        """`MailboxStats`: Counters since the mailbox was created"""
+        return MailboxStats(**self._counts)
+
+    @property
+    def window(self):
+        """`int`: Maximum number of chunks in flight to the t program"""
+        return self._tx_window
+
+    @property
+    def in_flight(self):
+        """`int`: Chunks written but not yet consumed by the t program"""
+        return self._tx_seq - self._tx_acked
+
+    def send(self, data, timeout=1000):
+        """Send a message to the t program
+
+        Returns as soon as all chunks of the message have been written, use
+        `flush` to wait until the t program has consumed them.
+
+        Args:
+            data (`bytes`): The message
+            timeout (`int`): Maximum time in milliseconds to wait for credits
+
+        Raises:
+            `ValueError`: The message is longer than `max_message`
+            `CanTimeout`: The t program did not consume chunks in time. The
+                rest of the message is written by the next call to `send` or
+                `flush`.
+
+        """
+        data = bytes(data)
+        if len(data) > self.max_message:
+            raise ValueError(
+                f"Message of {len(data)} bytes is longer than max_message ({self.max_message})"
+            )
+        size = self._payload_size
+        offsets = range(0, max(len(data), 1), size)
+        for offset in offsets:
+            flags = 0
+            if offset == 0:
+                flags |= _CHUNK_FIRST
+            if offset + size >= len(data):
+                flags |= _CHUNK_LAST
+            self._pending.append((flags, data[offset:offset + size]))
+        self._counts['messages_sent'] += 1
+        self._drain(timeout)
+
+    def flush(self, timeout=1000):
+        """Wait until the t program has consumed all chunks sent
+
+        Raises:
+            `CanTimeout`: The t program did not consume all chunks in time
+
+        """
+        deadline = time.perf_counter() + timeout / 1000
+        self._drain(timeout)
+        while self._tx_acked != self._tx_seq:
+            self._tx_acked = self._get_tx_ack()
+            if self._tx_acked == self._tx_seq:
+                break
+            if time.perf_counter() > deadline:
+                raise CanTimeout()
+            time.sleep(self.poll_interval)
+
+    def recv(self, timeout=0):
+        """Receive a message from the t program
+
+        Args:
+            timeout (`int`): Maximum time in milliseconds to wait for a message
+
+        Returns:
+            `bytes`
+
+        Raises:
+            `CanNoMsg`: No message was received in time
+
+        """
+        deadline = time.perf_counter() + timeout / 1000
+        while not self._messages:
+            if self._receive():
+                continue
+            if time.perf_counter() >= deadline:
+                raise CanNoMsg()
+            time.sleep(self.poll_interval)
+        self._counts['messages_received'] += 1
+        return self._messages.popleft()
+
+    def _drain(self, timeout):
+        deadline = time.perf_counter() + timeout / 1000
+        while self._pending:
+            if self._transmit():
+                continue
+            self._counts['credit_waits'] += 1
+            if time.perf_counter() > deadline:
+                raise CanTimeout()
+            time.sleep(self.poll_interval)
+
+    def _transmit(self):
+        """Write as many pending chunks as there are credits for"""
+        window = self._tx_window
+        if self._tx_seq - self._tx_acked >= window:
+            # Only ask for credits when they are used up
+            self._tx_acked = self._get_tx_ack()
+            if self._tx_seq - self._tx_acked >= window:
+                return 0
+        count = min(window - (self._tx_seq - self._tx_acked), len(self._pending))
+        data = self._tx_data
+        for _ in range(count):
+            flags, payload = self._pending.popleft()
+            start = (self._tx_seq % window) * self._slot_size
+            header = _CHUNK_HEADER.pack(self._tx_seq & 0xFFFFFFFF, len(payload), flags, 0)
+            chunk = header + payload
+            data[start:start + len(chunk)] = chunk
+            self._tx_seq += 1
+        self._tx.push()
+        self._channel.scriptSendEvent(
+            slotNo=self._slot, eventType=const.kvEVENT_TYPE_KEY, eventNo=self._key,
+            data=(self._tx_seq - 1) & 0xFFFFFFFF,
+        )
+        self._counts['chunks_sent'] += count
+        self._counts['transfers'] += 1
+        return count
+
+    def _receive(self):
+        """Read all chunks written by the t program, return True if any"""
+        head = self._get_rx_head()
+        if head <= self._rx_seq:
+            return False
+        if head - self._rx_seq > self._rx_window:
+            raise MailboxProtocolError(
+                f"{head - self._rx_seq} chunks waiting, but only {self._rx_window} slots"
+            )
+        data = self._channel.script_envvar_get_data(
+            self._rx_attrib.handle, len=self._rx_attrib.size, start=0
+        )
+        self._counts['transfers'] += 1
+        for seq in range(self._rx_seq, head):
+            start = (seq % self._rx_window) * self._slot_size
+            chunk_seq, length, flags, _ = _CHUNK_HEADER.unpack_from(data, start)
+            if chunk_seq != seq & 0xFFFFFFFF:
+                raise MailboxProtocolError(f"Expected chunk {seq}, got {chunk_seq}")
+            if flags & _CHUNK_FIRST:
+                self._parts = []
+            elif self._parts is None:
+                raise MailboxProtocolError(f"Chunk {seq} does not start a message")
+            start += _CHUNK_HEADER.size
+            self._parts.append(data[start:start + length])
+            if flags & _CHUNK_LAST:
+                self._messages.append(b''.join(self._parts))
+                self._parts = None
+        self._counts['chunks_received'] += head - self._rx_seq
+        self._rx_seq = head
+        # All credits are returned at once
+        self._set_rx_ack(head)
+        return True
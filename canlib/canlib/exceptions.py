@@ -226,6 +226,19 @@ class EnvvarNameError(EnvvarException):
         super().__init__(msg)
 
 
+class MailboxProtocolError(EnvvarException):
+    """Raised when a `.Mailbox` receives a chunk it did not expect
+
+    This happens e.g. when the t program was restarted while the `.Mailbox`
+    was in use.
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
 class TxeFileIsEncrypted(CanlibException):
     """
     Raised when trying to access `Txe.source` and the source and byte-code
@@ -5,7 +5,12 @@ Rail SE 400S and variants that was added to CANlib v5.26.
 
 """
 
+import array
+import collections
 import ctypes as ct
+import threading
+import time
+from collections import namedtuple
 
 from ..cenum import CEnum
 from ..versionnumber import VersionNumber
@@ -642,3 +647,297 @@ _PIN_CLASSES = {
     PinType.ANALOG: {Direction.IN: AnalogIn, Direction.OUT: AnalogOut},
     PinType.DIGITAL: {Direction.IN: DigitalIn, Direction.OUT: DigitalOut},
 }
+
+
+IoTransition = namedtuple('IoTransition', 'timestamp pin value')
+IoTransition.__doc__ = """A change of a digital pin seen by `IoSampler`
+
+    Attributes:
+        timestamp (`float` or `int`): Time of the sample where the new value
+            was first seen, see `IoSampler`
+        pin (`int`): Pin number
+        value (`int`): The new value, 0 or 1
+
+    .. versionadded:: 1.32
+
+"""
+
+IoSamples = namedtuple('IoSamples', 'timestamps values overwritten')
+IoSamples.__doc__ = """Samples collected by `IoSampler`
+
+    Attributes:
+        timestamps (`array.array`): Time of each sample
+        values (`dict`): Maps each sampled pin number to an `array.array` with
+            one value per timestamp
+        overwritten (`int`): Number of samples that were lost because the
+            buffer was full before the samples were read
+
+    .. versionadded:: 1.32
+
+"""
+
+IoSamplerStats = namedtuple('IoSamplerStats', 'samples missed_deadlines max_lateness')
+IoSamplerStats.__doc__ = """Timing statistics of an `IoSampler`
+
+    Attributes:
+        samples (`int`): Number of times the pins have been sampled
+        missed_deadlines (`int`): Number of sampling times that were skipped
+            because sampling fell behind schedule
+        max_lateness (`float`): Largest delay in seconds between a scheduled
+            sampling time and the actual sampling
+
+    .. versionadded:: 1.32
+
+"""
+
+# How each kind of pin is read: dll function name, ctypes type and
+# array.array typecode for the stored values.
+_PIN_READERS = {
+    DigitalIn: ('kvIoPinGetDigital', ct.c_uint, 'B'),
+    DigitalOut: ('kvIoPinGetOutputDigital', ct.c_uint, 'B'),
+    Relay: ('kvIoPinGetOutputRelay', ct.c_uint, 'B'),
+    AnalogIn: ('kvIoPinGetAnalog', ct.c_float, 'f'),
+    AnalogOut: ('kvIoPinGetOutputAnalog', ct.c_float, 'f'),
+}
+
+
+class IoSampler:
+    """Sample I/O pins at a fixed rate in a background thread
+
+    The pins are read at `rate` samples per second. Each sampling time is
+    scheduled from the start time, so that delays in one sample do not
+    accumulate. If sampling falls so far behind that a sampling time has
+    already passed, that time is skipped and counted as a missed deadline,
+    see `stats`.
+
+    The values are stored in preallocated `array.array` buffers holding
+    `capacity` samples, that are emptied by `samples`::
+
+        with canlib.openChannel(0) as ch:
+            ch.io_confirm_config()
+            with iopin.IoSampler(ch, rate=1000) as sampler:
+                time.sleep(10)
+                data = sampler.samples()
+        print(len(data.timestamps), sampler.stats)
+
+    In change-only mode, digital pins are not stored in the buffers. Instead
+    an `IoTransition` is recorded whenever a digital pin changes value, which
+    can be read using `transitions` or received by an `on_change` callback.
+    The first sample of each digital pin is also recorded as a transition.
+
+    The sampler reads the pins through the handle of `channel`. Since CANlib
+    handles should not be used from several threads at once, give the
+    sampler a channel of its own.
+
+    Args:
+        channel (`Channel`): Channel with a confirmed I/O configuration
+        pins: The pins to sample, as `IoPin` objects or pin numbers. Default
+            is all input pins.
+        rate (`float`): Samples per second
+        capacity (`int`): Number of samples to buffer, default is ten seconds
+            worth of samples
+        timestamps (`str`): ``'host'`` for `time.perf_counter` seconds since
+            the sampler was started, or ``'can'`` for the device time read
+            with `Channel.readTimer`, in the same unit as received frames.
+        change_only (`bool`): Only record transitions of digital pins
+        on_change: Function called with each `IoTransition` in change-only
+            mode. It is called from the sampler thread.
+        spin (`float`): The last part of the wait for each sampling time,
+            in seconds, is done by busy waiting for better timing accuracy.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self,
+        channel,
+        pins=None,
+        rate=1000.0,
+        capacity=None,
+        timestamps='host',
+        change_only=False,
+        on_change=None,
+        spin=0.0002,
+    ):
+        if timestamps not in ('host', 'can'):
+            raise ValueError(f"timestamps must be 'host' or 'can', not {timestamps!r}")
+        if pins is None:
+            pins = [pin for pin in channel.io_pins() if isinstance(pin, (DigitalIn, AnalogIn))]
+        else:
+            pins = [get_io_pin(channel, pin) if isinstance(pin, int) else pin for pin in pins]
+        if capacity is None:
+            capacity = max(1, int(rate * 10))
+
+        self.channel = channel
+        self.period = 1 / rate
+        self.capacity = capacity
+        self.change_only = change_only
+        self.on_change = on_change
+        self.spin = spin
+        self._can_time = timestamps == 'can'
+
+        self._timestamps = array.array('d' if not self._can_time else 'q', bytes(8 * capacity))
+        self._readers = []
+        self._values = {}
+        self._digital = []
+        for pin in pins:
+            func_name, ctype, typecode = _PIN_READERS[type(pin)]
+            buf = ctype()
+            values = None
+            if change_only and typecode == 'B':
+                self._digital.append((pin.pin, buf))
+            else:
+                values = array.array(typecode, bytes(array.array(typecode).itemsize * capacity))
+                self._values[pin.pin] = values
+            self._readers.append((getattr(dll, func_name), pin.pin, ct.byref(buf), buf, values))
+
+        self._count = 0
+        self._read_count = 0
+        self._transitions = collections.deque(maxlen=capacity)
+        self._missed = 0
+        self._max_lateness = 0.0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def stats(self):
+        """`IoSamplerStats`: Timing statistics"""
+        return IoSamplerStats(
+            samples=self._count,
+            missed_deadlines=self._missed,
+            max_lateness=self._max_lateness,
+        )
+
+    def start(self):
+        """Start sampling in a new thread"""
+        if self._thread is not None:
+            raise RuntimeError("IoSampler has already been started")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the thread to finish
+
+        An error that stopped the sampler thread is raised here.
+
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._raise_error()
+
+    def samples(self):
+        """Return and remove the buffered samples
+
+        Returns:
+            `IoSamples`, with copies of the samples taken since the last call.
+
+        """
+        self._raise_error()
+        with self._lock:
+            count = self._count
+            first = max(self._read_count, count - self.capacity)
+            overwritten = first - self._read_count
+            self._read_count = count
+            timestamps = self._slice(self._timestamps, first, count)
+            values = {pin: self._slice(buf, first, count) for pin, buf in self._values.items()}
+        return IoSamples(timestamps=timestamps, values=values, overwritten=overwritten)
+
+    def transitions(self):
+        """Return and remove the recorded transitions of digital pins
+
+        Only used in change-only mode. At most `capacity` transitions are
+        kept, older ones are dropped.
+
+        Returns:
+            `list` of `IoTransition`
+
+        """
+        self._raise_error()
+        transitions = []
+        with self._lock:
+            while self._transitions:
+                transitions.append(self._transitions.popleft())
+        return transitions
+
+    def _slice(self, buf, first, last):
+        start = first % self.capacity
+        end = start + (last - first)
+        if end <= self.capacity:
+            return buf[start:end]
+        return buf[start:] + buf[:end - self.capacity]
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        try:
+            self._sample_loop()
+        except Exception as e:
+            self._error = e
+
+    def _sample_loop(self):
+        handle = self.channel.handle
+        readers = self._readers
+        timestamps = self._timestamps
+        capacity = self.capacity
+        period = self.period
+        spin = self.spin
+        digital = self._digital
+        last = {pin: None for pin, _ in digital}
+        read_timer = self.channel.readTimer
+        perf_counter = time.perf_counter
+
+        start = perf_counter()
+        tick = 0
+        while not self._stopping.is_set():
+            deadline = start + tick * period
+            remaining = deadline - perf_counter()
+            if remaining > spin:
+                time.sleep(remaining - spin)
+            while perf_counter() < deadline:
+                pass
+
+            now = perf_counter()
+            for func, pin, ref, _, _ in readers:
+                func(handle, pin, ref)
+            timestamp = read_timer() if self._can_time else now - start
+
+            with self._lock:
+                index = self._count % capacity
+                timestamps[index] = timestamp
+                for _, _, _, buf, values in readers:
+                    if values is not None:
+                        values[index] = buf.value
+                self._count += 1
+                changes = []
+                for pin, buf in digital:
+                    value = buf.value
+                    if value != last[pin]:
+                        last[pin] = value
+                        changes.append(IoTransition(timestamp, pin, value))
+                self._transitions.extend(changes)
+            if self.on_change is not None:
+                for change in changes:
+                    self.on_change(change)
+
+            lateness = now - deadline
+            if lateness > self._max_lateness:
+                self._max_lateness = lateness
+            tick += 1
+            if lateness > period:
+                # Skip the sampling times that have already passed
+                skipped = int(lateness / period)
+                self._missed += skipped
+                tick += skipped
@@ -3,8 +3,11 @@
 .. versionadded:: 1.22
 
 """
+from collections import namedtuple
+
 from ..cenum import CEnum
 from . import wrapper
+from .exceptions import CanNotImplementedError, CanOutOfMemory
 
 dll = wrapper.dll
 canOBJBUF_AUTO_RESPONSE_RTR_ONLY = 0x01
@@ -96,9 +99,13 @@ class Periodic(ObjectBuffer):
         self.ch = None
         self.idx = dll.canObjBufAllocate(ch.handle, Type.PERIODIC_TX)
         self.ch = ch
-        if frame is not None:
-            self.set_frame(frame)
-        self.set_period(period_us)
+        try:
+            if frame is not None:
+                self.set_frame(frame)
+            self.set_period(period_us)
+        except Exception:
+            self.free()
+            raise
 
     def enable(self):
         """Enable this object buffer."""
@@ -176,12 +183,16 @@ class Response(ObjectBuffer):
         self.ch = None
         self.idx = dll.canObjBufAllocate(ch.handle, Type.AUTO_RESPONSE)
         self.ch = ch
-        if frame is not None:
-            self.set_frame(frame)
-        if filter is not None:
-            self.set_filter(filter)
-        if rtr_only:
-            self.set_rtr_only(True)
+        try:
+            if frame is not None:
+                self.set_frame(frame)
+            if filter is not None:
+                self.set_filter(filter)
+            if rtr_only:
+                self.set_rtr_only(True)
+        except Exception:
+            self.free()
+            raise
 
     def set_filter(self, filter):
         """Set message reception filter.
@@ -211,3 +222,320 @@ class Response(ObjectBuffer):
         else:
             flags = 0
         dll.canObjBufSetFlags(self.ch.handle, self.idx, flags)
+
+
+Capacity = namedtuple('Capacity', 'periodic response')
+Capacity.__doc__ = """Number of object buffers of a channel, returned by `Pool.capacity`
+
+    Attributes:
+        periodic (`int`): Periodic (auto transmit) buffers
+        response (`int`): Auto response buffers
+
+    .. versionadded:: 1.32
+
+"""
+
+# Errors meaning that no (more) object buffers of a type can be allocated
+_NO_BUFFER_ERRORS = (CanOutOfMemory, CanNotImplementedError)
+
+
+class PooledMessage:
+    """A periodic or auto response message managed by a `Pool`
+
+    Returned from `Pool.add_periodic` and `Pool.add_response`.
+
+    Attributes:
+        frame (`~canlib.Frame`): The CAN frame sent.
+        period_us (`int`): Interval in microseconds between each sent CAN
+            frame, `None` for auto response messages.
+        max_jitter_us (`int`): The jitter in microseconds the message can
+            tolerate, or `None`.
+        filter (`MessageFilter`): Messages triggering the response, `None` for
+            periodic messages.
+        rtr_only (`bool`): Only respond to remote requests.
+        buffer (`ObjectBuffer`): The object buffer sending the message, or
+            `None` when it is not hardware-backed.
+        software: The `~canlib.canlib.PeriodicMessage` sending a periodic
+            message that did not get an object buffer, when the pool has a
+            scheduler.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, frame, period_us=None, max_jitter_us=None, filter=None, rtr_only=False):
+        self.frame = frame
+        self.period_us = period_us
+        self.max_jitter_us = max_jitter_us
+        self.filter = filter
+        self.rtr_only = rtr_only
+        self.buffer = None
+        self.software = None
+
+    def __repr__(self):
+        kind = 'response' if self.period_us is None else f'period_us={self.period_us}'
+        return f"<PooledMessage id={self.frame.id} {kind} hardware={self.hardware}>"
+
+    @property
+    def hardware(self):
+        """`bool`: Whether the message is sent by an object buffer"""
+        return self.buffer is not None
+
+    @property
+    def demand(self):
+        """`int`: How hard the message is to send from the host, lower is harder
+
+        The smaller of the period and the tolerated jitter, in microseconds.
+
+        """
+        if self.max_jitter_us is None:
+            return self.period_us
+        return min(self.period_us, self.max_jitter_us)
+
+    def set_frame(self, frame):
+        """Replace the CAN frame sent"""
+        self.frame = frame
+        if self.buffer is not None:
+            self.buffer.set_frame(frame)
+        elif self.software is not None:
+            self.software.set_frame(frame)
+
+
+class Pool:
+    """Manages the object buffers of a channel
+
+    Periodic messages added to the pool are given the periodic object buffers
+    in order of `PooledMessage.demand`, i.e. the messages with the shortest
+    period or the tightest jitter get hardware buffers first. When messages
+    are added or removed, buffers are moved between the messages so this
+    stays true. Periodic messages without a buffer are refused, or sent by
+    `scheduler` if one is given.
+
+    Auto response messages get buffers in the order they are added.
+
+    The number of buffers is found by allocating buffers until the device
+    runs out, unless given. Devices without object buffers have a capacity
+    of zero.
+
+    Returned from `.canlib.Channel.objbuf_pool()`.
+
+        >>> pool = ch.objbuf_pool(scheduler=canlib.TxScheduler(ch))
+        >>> pool.add_responses([(MessageFilter(code=100, mask=0x7FF), frame)])
+        >>> for frame, period_us in restbus:
+        ...     pool.add_periodic(frame, period_us)
+        >>> [m.frame.id for m in pool.refused]
+
+    Args:
+        ch (`~canlib.canlib.Channel`): The channel.
+        scheduler (`~canlib.canlib.TxScheduler`): Scheduler sending the
+            periodic messages that do not get an object buffer.
+        capacity (`Capacity`): The number of buffers, default is to find out.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, ch, scheduler=None, capacity=None):
+        self.ch = ch
+        self.scheduler = scheduler
+        self._capacity = capacity
+        self._periodic = []
+        self._responses = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def capacity(self):
+        """`Capacity`: The number of object buffers of the channel"""
+        if self._capacity is None:
+            self._capacity = Capacity(
+                self._probe(lambda: self.ch.allocate_periodic_objbuf(1_000_000, None)),
+                self._probe(lambda: self.ch.allocate_response_objbuf(None, None)),
+            )
+        return self._capacity
+
+    @property
+    def messages(self):
+        """`list` of `PooledMessage`: All messages, periodic messages first"""
+        return self._periodic + self._responses
+
+    @property
+    def hardware(self):
+        """`list` of `PooledMessage`: The messages sent by object buffers"""
+        return [m for m in self.messages if m.buffer is not None]
+
+    @property
+    def refused(self):
+        """`list` of `PooledMessage`: The messages that did not get an object buffer
+
+        Includes periodic messages sent by the scheduler.
+
+        """
+        return [m for m in self.messages if m.buffer is None]
+
+    def add_periodic(self, frame, period_us, max_jitter_us=None):
+        """Add a periodic message
+
+        Args:
+            frame (`~canlib.Frame`): The CAN frame to send.
+            period_us (`int`): Interval in microseconds between each sent CAN frame.
+            max_jitter_us (`int`): The jitter in microseconds the message can
+                tolerate, if tighter than the period.
+
+        Returns:
+            `PooledMessage`
+
+        """
+        message = PooledMessage(frame, period_us, max_jitter_us)
+        self._add(self._periodic, [message])
+        return message
+
+    def add_response(self, filter, frame, rtr_only=False):
+        """Add an auto response message
+
+        Args:
+            filter (`MessageFilter`): Messages not matching the filter are ignored.
+            frame (`~canlib.Frame`): The CAN frame to send.
+            rtr_only (`bool`): If `True`, only respond to remote requests.
+
+        Returns:
+            `PooledMessage`
+
+        """
+        message = PooledMessage(frame, filter=filter, rtr_only=rtr_only)
+        self._add(self._responses, [message])
+        return message
+
+    def add_responses(self, table, rtr_only=False):
+        """Add auto response messages from a table of (filter, frame) pairs
+
+        Returns:
+            `list` of `PooledMessage`
+
+        """
+        messages = [PooledMessage(frame, filter=filter, rtr_only=rtr_only)
+                    for filter, frame in table]
+        self._add(self._responses, messages)
+        return messages
+
+    def remove(self, message):
+        """Stop sending a message and remove it from the pool
+
+        The object buffer it had is given to the next message waiting for one.
+
+        """
+        if message.period_us is None:
+            self._responses.remove(message)
+        else:
+            self._periodic.remove(message)
+        self._release(message)
+        self._rebalance()
+
+    def close(self):
+        """Stop sending all messages
+
+        Frees all object buffers of the channel using
+        `.canlib.Channel.free_objbuf()`, including buffers allocated outside
+        the pool.
+
+        """
+        for message in self.messages:
+            if message.software is not None:
+                self.scheduler.remove(message.software)
+                message.software = None
+            message.buffer = None
+        self._periodic = []
+        self._responses = []
+        self.ch.free_objbuf()
+
+    def _add(self, queue, messages):
+        queue.extend(messages)
+        try:
+            self._rebalance()
+        except Exception:
+            # Leave the pool as it was, instead of keeping messages the
+            # caller never got back and failing on them in every rebalance
+            for message in messages:
+                queue.remove(message)
+                self._release(message)
+            self._rebalance()
+            raise
+
+    def _probe(self, allocate):
+        buffers = []
+        try:
+            while True:
+                buffers.append(allocate())
+        except _NO_BUFFER_ERRORS:
+            pass
+        finally:
+            for buffer in buffers:
+                buffer.free()
+        return len(buffers)
+
+    def _rebalance(self):
+        capacity = self.capacity
+        periodic = sorted(self._periodic, key=lambda m: m.demand)
+        self._assign(periodic, capacity.periodic, self._allocate_periodic)
+        self._assign(self._responses, capacity.response, self._allocate_response)
+
+    def _assign(self, messages, capacity, allocate):
+        wanted = messages[:capacity]
+        # Free the buffers of messages losing them first, so they can be
+        # given to the messages getting them
+        for message in messages[capacity:]:
+            if message.buffer is not None:
+                self._release(message)
+        for message in wanted:
+            if message.buffer is None:
+                try:
+                    buffer = allocate(message)
+                except _NO_BUFFER_ERRORS:
+                    # Buffers were allocated outside the pool
+                    continue
+                self._release(message)
+                message.buffer = buffer
+        if self.scheduler is not None:
+            for message in messages:
+                if (message.buffer is None and message.software is None
+                        and message.period_us is not None):
+                    message.software = self.scheduler.add(message.frame, message.period_us)
+
+    def _allocate_periodic(self, message):
+        buffer = self.ch.allocate_periodic_objbuf(message.period_us, None)
+        self._setup(buffer, message)
+        return buffer
+
+    def _allocate_response(self, message):
+        buffer = self.ch.allocate_response_objbuf(None, None)
+        try:
+            if message.filter is not None:
+                buffer.set_filter(message.filter)
+            if message.rtr_only:
+                buffer.set_rtr_only(True)
+        except Exception:
+            buffer.free()
+            raise
+        self._setup(buffer, message)
+        return buffer
+
+    def _setup(self, buffer, message):
+        # Free the buffer if it can not be set up, instead of leaking it
+        try:
+            buffer.set_frame(message.frame)
+            buffer.enable()
+        except Exception:
+            buffer.free()
+            raise
+
+    def _release(self, message):
+        if message.buffer is not None:
+            message.buffer.free()
+            message.buffer = None
+        if message.software is not None:
+            self.scheduler.remove(message.software)
+            message.software = None
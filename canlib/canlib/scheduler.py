@@ -0,0 +1,359 @@
+"""Periodic transmission of frames from the host
+
+`Channel.allocate_periodic_objbuf` sends frames periodically from the
+device, but the number of object buffers is limited, and not all devices
+have them. `TxScheduler` sends any number of periodic frames from one
+background thread instead:
+
+    >>> from canlib import Frame, canlib
+    >>> scheduler = canlib.TxScheduler(ch)
+    >>> speed = scheduler.add(Frame(0x123, b'\\x00\\x00'), period_us=10000)
+    >>> status = scheduler.add(Frame(0x456, b'\\x01'), period_us=1000000)
+    >>> with scheduler:
+    ...     speed.set_data(b'\\x12\\x34')
+    ...     time.sleep(10)
+    >>> speed.stats
+    PeriodicStats(sent=1000, missed=0, mean_jitter_us=21.3, max_jitter_us=180.6)
+
+The frames due are kept in a deadline heap. The thread sleeps until
+shortly before the next deadline and then spins until it has passed, so the
+jitter does not depend on the resolution of the operating system's sleep.
+All frames due at that time are written in one go.
+
+.. versionadded:: 1.32
+
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+from ..frame import Frame
+from .exceptions import CanOverflowError
+
+PeriodicStats = namedtuple('PeriodicStats', 'sent missed mean_jitter_us max_jitter_us')
+PeriodicStats.__doc__ = """Counters of a `PeriodicMessage`
+
+    Attributes:
+        sent (`int`): Frames sent
+        missed (`int`): Periods skipped because the scheduler fell behind by
+            more than a whole period, or because the transmit buffer was full
+        mean_jitter_us (`float`): Mean delay in microseconds from the
+            deadline of each frame until it was written
+        max_jitter_us (`float`): The longest delay in microseconds
+
+    .. versionadded:: 1.32
+
+"""
+
+SchedulerStats = namedtuple('SchedulerStats', 'ticks frames max_batch overflows')
+SchedulerStats.__doc__ = """Counters of a `TxScheduler`
+
+    Attributes:
+        ticks (`int`): Number of times frames were due
+        frames (`int`): Frames sent
+        max_batch (`int`): The most frames sent in one tick
+        overflows (`int`): Frames not sent because the transmit buffer was
+            full
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class PeriodicMessage:
+    """A frame sent periodically by a `TxScheduler`
+
+    Created by `TxScheduler.add`. The frame, data and period can be changed
+    while the scheduler is running, and take effect from the next frame
+    sent.
+
+    Attributes:
+        period_us (`int`): Interval in microseconds between each frame
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, scheduler, frame, period_us, offset_us):
+        self.scheduler = scheduler
+        self.set_frame(frame)
+        self.set_period(period_us)
+        self.offset_us = offset_us
+        # The heap entry of the next frame, None when stopped
+        self._entry = None
+        self._counts = dict.fromkeys(PeriodicStats._fields, 0)
+        self._jitter_sum = 0.0
+
+    def __repr__(self):
+        return f"<PeriodicMessage id=0x{self._payload[0]:x} period_us={self.period_us}>"
+
+    @property
+    def running(self):
+        """`bool`: Whether the frame is being sent"""
+        return self._entry is not None
+
+    @property
+    def frame(self):
+        """`~canlib.Frame`: The frame sent"""
+        return self._frame
+
+    @property
+    def stats(self):
+        """`PeriodicStats`: Counters since the message was added"""
+        counts = dict(self._counts)
+        sent = counts['sent']
+        counts['mean_jitter_us'] = self._jitter_sum / sent * 1e6 if sent else 0.0
+        counts['max_jitter_us'] *= 1e6
+        return PeriodicStats(**counts)
+
+    def set_frame(self, frame):
+        """Replace the frame sent"""
+        self._frame = frame
+        self._payload = (frame.id, bytes(frame.data), frame.flags, frame.dlc)
+
+    def set_data(self, data):
+        """Replace the data of the frame sent, keeping the identifier and flags"""
+        self.set_frame(Frame(self._frame.id, data, flags=self._frame.flags))
+
+    def set_period(self, period_us):
+        """Set interval in microseconds between each frame
+
+        Args:
+            period_us (`int`): The interval, must be positive
+
+        """
+        if period_us <= 0:
+            raise ValueError(f"Invalid period: {period_us} us")
+        self.period_us = period_us
+        self._period = period_us / 1e6
+
+    def start(self, offset_us=None):
+        """Start sending the frame
+
+        Args:
+            offset_us (`int`): Delay in microseconds until the first frame,
+                default is the offset given to `TxScheduler.add`
+
+        """
+        if offset_us is not None:
+            self.offset_us = offset_us
+        self.scheduler._schedule(self, self.offset_us / 1e6)
+
+    def stop(self):
+        """Stop sending the frame"""
+        self.scheduler._unschedule(self)
+
+
+class TxScheduler:
+    """Sends frames periodically from a background thread
+
+    Frames are added using `add`, and sent from when the scheduler is
+    started by `start` or by using it as a context manager, until it is
+    stopped. Each `PeriodicMessage` can also be started and stopped on its
+    own.
+
+    When the scheduler falls behind, each late frame is sent once as soon as
+    possible, skipping the periods it fell behind by whole periods. When the
+    transmit buffer is full, e.g. on a busy bus, the frame is not sent that
+    period. Both are counted as missed periods in the message's stats, and
+    the scheduler keeps running.
+
+    Args:
+        channel (`Channel`): The channel to write to
+        spin_us (`int`): The thread spins instead of sleeping when the next
+            frame is due within this many microseconds. 0 always sleeps, which
+            uses less CPU time but gives the jitter of the operating system's
+            sleep.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, channel, spin_us=1000):
+        self.channel = channel
+        self.spin_us = spin_us
+        self._messages = []
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._error = None
+        self._counts = dict.fromkeys(SchedulerStats._fields, 0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def messages(self):
+        """`list` of `PeriodicMessage`: The messages added"""
+        with self._cond:
+            return list(self._messages)
+
+    @property
+    def stats(self):
+        """`SchedulerStats`: Counters since the scheduler was created"""
+        return SchedulerStats(**self._counts)
+
+    def add(self, frame, period_us, offset_us=0, start=True):
+        """Add a frame to send periodically
+
+        Args:
+            frame (`~canlib.Frame`): The frame
+            period_us (`int`): Interval in microseconds between each frame
+            offset_us (`int`): Delay in microseconds from when the message
+                is started until the first frame, used to spread out messages
+                with the same period
+            start (`bool`): Start sending the frame, otherwise the message is
+                started using `PeriodicMessage.start`
+
+        Returns:
+            `PeriodicMessage`
+
+        """
+        message = PeriodicMessage(self, frame, period_us, offset_us)
+        with self._cond:
+            self._messages.append(message)
+        if start:
+            message.start()
+        return message
+
+    def remove(self, message):
+        """Stop sending a message and remove it"""
+        message.stop()
+        with self._cond:
+            self._messages.remove(message)
+
+    def start(self):
+        """Start sending the frames of the started messages"""
+        if self._thread is not None:
+            return
+        with self._cond:
+            # Messages started before the scheduler are timed from now
+            self._heap.clear()
+            now = time.perf_counter()
+            for message in self._messages:
+                if message._entry is not None:
+                    self._push(message, now + message.offset_us / 1e6)
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sending frames
+
+        Messages keep their started or stopped state, to be used when the
+        scheduler is started again. Any error raised by writing to the
+        channel is raised again here.
+
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _schedule(self, message, offset):
+        with self._cond:
+            self._push(message, time.perf_counter() + offset)
+            self._cond.notify()
+
+    def _unschedule(self, message):
+        with self._cond:
+            # The heap entry is dropped when it reaches the top of the heap
+            message._entry = None
+
+    def _push(self, message, deadline):
+        entry = [deadline, next(self._sequence), message]
+        message._entry = entry
+        heapq.heappush(self._heap, entry)
+
+    def _run(self):
+        try:
+            while self._wait():
+                self._tick()
+        except Exception as e:
+            self._error = e
+
+    def _wait(self):
+        """Wait until the next frame is due, return False when stopping"""
+        heap = self._heap
+        clock = time.perf_counter
+        spin = self.spin_us / 1e6
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return False
+                while heap and heap[0] is not heap[0][2]._entry:
+                    heapq.heappop(heap)
+                if not heap:
+                    self._cond.wait()
+                    continue
+                deadline = heap[0][0]
+                remaining = deadline - clock()
+                if remaining <= spin:
+                    break
+                self._cond.wait(remaining - spin)
+        while clock() < deadline:
+            pass
+        return True
+
+    def _tick(self):
+        heap = self._heap
+        clock = time.perf_counter
+        now = clock()
+        due = []
+        with self._cond:
+            while heap and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                message = entry[2]
+                if entry is not message._entry:
+                    continue
+                due.append((entry[0], message))
+                period = message._period
+                deadline = entry[0] + period
+                if deadline <= now:
+                    skipped = int((now - entry[0]) // period)
+                    message._counts['missed'] += skipped
+                    deadline = entry[0] + (skipped + 1) * period
+                # Reusing the entry avoids allocations, which would make the
+                # garbage collector pause the thread more often
+                entry[0] = deadline
+                entry[1] = next(self._sequence)
+                heapq.heappush(heap, entry)
+        write = self.channel.write_raw
+        overflows = 0
+        for deadline, message in due:
+            id_, data, flags, dlc = message._payload
+            jitter = clock() - deadline
+            counts = message._counts
+            try:
+                write(id_, data, flags, dlc)
+            except CanOverflowError:
+                # The transmit buffer is full, the frame is sent next period
+                # instead of queueing up behind the others
+                counts['missed'] += 1
+                overflows += 1
+                continue
+            counts['sent'] += 1
+            message._jitter_sum += jitter
+            if jitter > counts['max_jitter_us']:
+                counts['max_jitter_us'] = jitter
+        counts = self._counts
+        counts['ticks'] += 1
+        counts['frames'] += len(due) - overflows
+        counts['overflows'] += overflows
+        if len(due) > counts['max_batch']:
+            counts['max_batch'] = len(due)
@@ -0,0 +1,280 @@
+"""Stream printf text from t programs
+
+`Channel.scriptGetText` returns one piece of text per call and must be
+polled. `ScriptTextStream` subscribes to the chosen script slots and drains
+the text in bursts from a background thread, so no text is missed while the
+program is busy, and no core is spent spinning while the t programs are
+quiet.
+
+.. versionadded:: 1.32
+
+"""
+
+import asyncio
+import collections
+import threading
+import time
+from collections import namedtuple
+
+from .enums import ScriptRequest, Stat
+from .exceptions import CanNoMsg
+
+ScriptLine = namedtuple('ScriptLine', 'slot text time host_time flags')
+ScriptLine.__doc__ = """A line of text printed by a t program
+
+    Attributes:
+        slot (`int`): Script slot of the t program that printed the line
+        text (`str`): The line, without trailing newline
+        time (`int`): Device timestamp of the text, in milliseconds
+        host_time (`float`): Host time when the text was read, as returned by
+            `time.time`
+        flags (`Stat`): Status flags of the text, e.g. `Stat.OVERRUN` if
+            text was lost before it could be read
+
+    .. versionadded:: 1.32
+
+"""
+
+ScriptTextStats = namedtuple('ScriptTextStats', 'lines dropped overruns bursts')
+ScriptTextStats.__doc__ = """Counters of a `ScriptTextStream`
+
+    Attributes:
+        lines (`int`): Number of lines read
+        dropped (`int`): Lines dropped because the buffer was full
+        overruns (`int`): Texts flagged with `Stat.OVERRUN`, i.e. text lost
+            in the device or driver
+        bursts (`int`): Number of times text was read
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class ScriptTextStream:
+    """Background reader of printf text from t programs
+
+    The stream subscribes to the given script slots when started, and
+    unsubscribes when stopped. Each piece of text is split into
+    `ScriptLine` objects, which are read by iterating over the stream:
+
+        >>> with canlib.ScriptTextStream(ch, slots=[0, 1]) as stream:
+        ...     for line in stream:
+        ...         print(line.slot, line.text)
+
+    In asyncio code, iterate using ``async for``:
+
+        >>> async for line in stream:
+        ...     print(line.slot, line.text)
+
+    Or pass a `callback`, which is then called from the background thread
+    with each line instead of the lines being buffered.
+
+    Lines are kept in a buffer of at most `maxlen` lines. When the buffer is
+    full the oldest line is dropped, and counted in `stats`.
+
+    The channel must not be used to read text elsewhere while the stream is
+    running.
+
+    Args:
+        channel (`Channel`): Channel of the device running the t programs
+        slots: Script slots to subscribe to, default is all slots
+        maxlen (`int`): Maximum number of buffered lines, or `None` for no
+            limit
+        callback: Function called with each `ScriptLine`, instead of
+            buffering the lines
+        poll_interval (`float`): Seconds to wait for more text after the
+            text available has been read
+        burst (`int`): Maximum number of texts read in one go. When this
+            many were read, reading continues without waiting.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, channel, slots=None, maxlen=10000, callback=None, poll_interval=0.01, burst=256
+    ):
+        self.channel = channel
+        self.slots = [ScriptRequest.ALL_SLOTS] if slots is None else list(slots)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self._buffer = collections.deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._running = False
+        self._error = None
+        self._async_waiters = []
+        self._counts = dict.fromkeys(ScriptTextStats._fields, 0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __iter__(self):
+        while True:
+            with self._cond:
+                while not self._buffer and self._running:
+                    self._cond.wait()
+                if not self._buffer:
+                    self._raise_error()
+                    return
+                line = self._buffer.popleft()
+            yield line
+
+    def __aiter__(self):
+        return self._aiter()
+
+    @property
+    def stats(self):
+        """`ScriptTextStats`: Counters since the stream was created"""
+        with self._cond:
+            return ScriptTextStats(**self._counts)
+
+    def start(self):
+        """Subscribe to the slots and start reading text"""
+        if self._thread is not None:
+            return
+        for slot in self.slots:
+            self.channel.scriptRequestText(slot, ScriptRequest.SUBSCRIBE)
+        self._stopping.clear()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reading text and unsubscribe from the slots
+
+        Lines already read can still be taken from the stream. Any error
+        raised by `callback` is raised again here.
+
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        for slot in self.slots:
+            self.channel.scriptRequestText(slot, ScriptRequest.UNSUBSCRIBE)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._wake_async()
+        self._raise_error()
+
+    def read(self, timeout=0):
+        """Return the next buffered line
+
+        Args:
+            timeout (`int`): Maximum time in milliseconds to wait for a line,
+                `None` waits until the stream is stopped
+
+        Raises:
+            `CanNoMsg`: No line was available in time
+
+        """
+        with self._cond:
+            seconds = None if timeout is None else timeout / 1000
+            self._cond.wait_for(lambda: self._buffer or not self._running, seconds)
+            if not self._buffer:
+                raise CanNoMsg()
+            return self._buffer.popleft()
+
+    async def _aiter(self):
+        # Inside a coroutine this is the running loop, get_running_loop needs
+        # Python 3.7
+        loop = asyncio.get_event_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._cond:
+            self._async_waiters.append(waiter)
+        try:
+            while True:
+                event.clear()
+                with self._cond:
+                    line = self._buffer.popleft() if self._buffer else None
+                    running = self._running
+                if line is not None:
+                    yield line
+                elif not running:
+                    self._raise_error()
+                    return
+                else:
+                    await event.wait()
+        finally:
+            with self._cond:
+                self._async_waiters.remove(waiter)
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.is_set()
+            try:
+                count = self._read_burst()
+            except Exception as e:
+                self._error = e
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+                self._wake_async()
+                return
+            if count < self.burst:
+                if stopping:
+                    # Everything printed before stop was called has been read
+                    return
+                self._stopping.wait(self.poll_interval)
+
+    def _read_burst(self):
+        texts = []
+        host_time = time.time()
+        for _ in range(self.burst):
+            try:
+                texts.append(self.channel.scriptGetText())
+            except CanNoMsg:
+                break
+        if not texts:
+            return 0
+
+        lines = []
+        overruns = 0
+        for text in texts:
+            flags = text.flags
+            if flags & Stat.OVERRUN:
+                overruns += 1
+            for part in text.rstrip('\n').split('\n'):
+                lines.append(ScriptLine(text.slot, part, text.time, host_time, flags))
+
+        with self._cond:
+            self._counts['lines'] += len(lines)
+            self._counts['overruns'] += overruns
+            self._counts['bursts'] += 1
+            if self.callback is None:
+                buffer = self._buffer
+                if buffer.maxlen is not None:
+                    self._counts['dropped'] += max(0, len(buffer) + len(lines) - buffer.maxlen)
+                buffer.extend(lines)
+                self._cond.notify_all()
+        if self.callback is None:
+            self._wake_async()
+        else:
+            for line in lines:
+                self.callback(line)
+        return len(texts)
+
+    def _wake_async(self):
+        with self._cond:
+            waiters = list(self._async_waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The event loop has been closed
+                pass
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -13,6 +13,16 @@ _ct_dll = dllLoader.load_dll(win_name='canlib32.dll', linux_name='libcanlib.so')
 dll = CanlibDll(_ct_dll)
 dll.canInitializeLibrary()
 
+# Incremented whenever the library is (re)initialized or the hardware is
+# enumerated, i.e. whenever a channel number may start to refer to another
+# device. Used to invalidate cached channel information.
+_library_generation = 0
+
+
+def _new_library_generation():
+    global _library_generation
+    _library_generation += 1
+
 
 class CANLib:
     """Deprecated wrapper class for the Kvaser CANlib.
@@ -96,6 +106,7 @@ def enumerate_hardware():
     """
     chan_count = ct.c_int()
     dll.canEnumHardwareEx(ct.byref(chan_count))
+    _new_library_generation()
     return chan_count.value
 
 
@@ -515,6 +526,7 @@ def unloadLibrary():
         dll.canUnloadLibrary()
     except AttributeError as e:
         logging.debug(str(e) + ' (Not implemented in Linux)')
+    _new_library_generation()
 
 
 def initializeLibrary():
@@ -533,6 +545,7 @@ def initializeLibrary():
 
     """
     dll.canInitializeLibrary()
+    _new_library_generation()
 
 
 def reinitializeLibrary():
@@ -550,6 +563,7 @@ def reinitializeLibrary():
     """
     unloadLibrary()
     dll.canInitializeLibrary()
+    _new_library_generation()
 
 
 class ChannelData_Channel_Flags_bits(ct.LittleEndianStructure):
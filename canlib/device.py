@@ -76,7 +76,7 @@ def connected_devices():
     last_device = None
     for curr_channel in itertools.count():
         try:
-            data = _libs.canlib.ChannelData(curr_channel)
+            data = _libs.canlib.ChannelData(curr_channel, cache=False)
             ean = data.card_upc_no
             serial = data.card_serial_no
         except _libs.canlib.CanNotFound:
@@ -118,7 +118,7 @@ def _match_channel(channel_number, info):
     target_name = info.channel_name
     if (target_ch is not None) and (channel_number != target_ch):
         return None
-    data = _libs.canlib.ChannelData(channel_number)
+    data = _libs.canlib.ChannelData(channel_number, cache=False)
     ean = data.card_upc_no
     if (target_ean is not None) and (ean != target_ean):
         return None
@@ -428,3 +428,232 @@ class Device:
 
         """
         return _libs.kvrlib.openDevice(self.channel_number(), *args, **kwargs)
+
+
+_RegistryEntry = namedtuple(
+    '_RegistryEntry',
+    "channel_number ean serial channel_name chan_no_on_card",
+)
+
+DeviceEvent = namedtuple('DeviceEvent', 'type device')
+DeviceEvent.__doc__ = """A device added to or removed from a `DeviceRegistry`
+
+    Attributes:
+        type (`str`): Either ``'added'`` or ``'removed'``
+        device (`Device`): The device, with `Device.last_channel_number` set
+            to the channel number the device was last found on.
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class DeviceRegistry:
+    """Cached snapshot of all connected devices
+
+    Looking up devices with `Device.find` or `connected_devices` queries the
+    CANlib driver for every channel on every call. A `DeviceRegistry` reads
+    all channels once and then answers lookups by EAN, serial number, custom
+    channel name or channel number from its indexes::
+
+        registry = DeviceRegistry()
+        dev = registry.find(ean=EAN('73-30130-00752-9'), serial=1234)
+        with dev.open_channel() as ch:
+            ...
+
+    The registry is refreshed automatically on the next lookup after the
+    library has been reinitialized or the hardware has been enumerated (see
+    `canlib.canlib.reinitializeLibrary` and
+    `canlib.canlib.enumerate_hardware`). A refresh only re-reads the custom
+    name and local channel number of channels where a different device has
+    appeared. Call `refresh` to rescan at any other time, e.g. periodically
+    to notice devices that have been plugged in.
+
+    Devices that appear or disappear when refreshing are reported as
+    `DeviceEvent` objects, both as the return value of `refresh` and to the
+    callbacks registered with `subscribe`::
+
+        registry.subscribe(lambda event: print(event.type, event.device))
+        canlib.canlib.enumerate_hardware()
+        registry.refresh()
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._by_ean = {}
+        self._by_serial = {}
+        self._by_name = {}
+        self._devices = {}
+        self._callbacks = []
+        self._generation = None
+        self.refresh()
+
+    def __contains__(self, device):
+        self._check()
+        return device in self._devices
+
+    def __iter__(self):
+        return iter(self.devices())
+
+    def __len__(self):
+        self._check()
+        return len(self._devices)
+
+    def devices(self):
+        """Return all connected devices
+
+        Returns:
+            `list` of `Device`, in channel number order.
+
+        """
+        self._check()
+        return [self._device(device, channel) for device, channel in self._devices.items()]
+
+    def channel_numbers(self, device):
+        """Return the CANlib channel numbers of a device
+
+        Raises:
+            `canlib.CanNotFound`: The device is not connected.
+
+        """
+        self._check()
+        try:
+            first = self._devices[device]
+        except KeyError:
+            raise _libs.canlib.CanNotFound
+        return [
+            entry.channel_number
+            for entry in self._entries.values()
+            if entry.channel_number - entry.chan_no_on_card == first
+        ]
+
+    def find(self, channel_number=None, ean=None, serial=None, channel_name=None):
+        """Find a connected device
+
+        Works like `Device.find`, but uses the indexes of the registry
+        instead of querying every channel.
+
+        Args:
+            channel_number (`int`): Find a device on this CANlib channel (number).
+            ean (`canlib.EAN`): Find a device with this EAN.
+            serial (`int`): Find a device with this serial number.
+            channel_name (`str`): Find a device with this custom channel name.
+
+        Returns:
+            `Device`
+
+        Raises:
+            `canlib.CanNotFound`: No connected device matches.
+
+        """
+        self._check()
+        if channel_number is not None:
+            entry = self._entries.get(channel_number)
+            entries = [] if entry is None else [entry]
+        elif channel_name is not None:
+            entries = self._by_name.get(channel_name, [])
+        elif serial is not None:
+            entries = self._by_serial.get(serial, [])
+        elif ean is not None:
+            entries = self._by_ean.get(ean, [])
+        else:
+            entries = self._entries.values()
+        for entry in entries:
+            if ean is not None and entry.ean != ean:
+                continue
+            if serial is not None and entry.serial != serial:
+                continue
+            if channel_name is not None and entry.channel_name != channel_name:
+                continue
+            device = Device(ean=entry.ean, serial=entry.serial)
+            return self._device(device, entry.channel_number - entry.chan_no_on_card)
+        raise _libs.canlib.CanNotFound
+
+    def refresh(self, force=False):
+        """Rescan all CANlib channels
+
+        Args:
+            force (`bool`): Re-read all information about every channel,
+                instead of only channels where another device has appeared.
+
+        Returns:
+            `list` of `DeviceEvent` for devices that have been added or
+            removed since the last refresh.
+
+        """
+        generation = _libs.canlib.wrapper._library_generation
+        previous = {} if force else self._entries
+        old_devices = self._devices
+        self._scan(previous)
+        self._generation = generation
+
+        events = [
+            DeviceEvent('removed', self._device(device, channel))
+            for device, channel in old_devices.items()
+            if device not in self._devices
+        ]
+        events.extend(
+            DeviceEvent('added', self._device(device, channel))
+            for device, channel in self._devices.items()
+            if device not in old_devices
+        )
+        for event in events:
+            for callback in list(self._callbacks):
+                callback(event)
+        return events
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every `DeviceEvent`"""
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop calling a callback registered with `subscribe`"""
+        self._callbacks.remove(callback)
+
+    def _check(self):
+        if self._generation != _libs.canlib.wrapper._library_generation:
+            self.refresh()
+
+    def _device(self, device, channel_number):
+        # A new object each time, since last_channel_number is mutable
+        device = Device(ean=device.ean, serial=device.serial)
+        device.last_channel_number = channel_number
+        return device
+
+    def _scan(self, previous):
+        entries = {}
+        for channel_number in range(_libs.canlib.getNumberOfChannels()):
+            try:
+                data = _libs.canlib.ChannelData(channel_number, cache=False)
+                ean = data.card_upc_no
+                serial = data.card_serial_no
+                old = previous.get(channel_number)
+                if old is not None and old.ean == ean and old.serial == serial:
+                    entry = old
+                else:
+                    entry = _RegistryEntry(
+                        channel_number, ean, serial, data.custom_name, data.chan_no_on_card
+                    )
+            except _libs.canlib.CanNotFound:
+                break
+            except _libs.canlib.exceptions.CanError as e:
+                if e.status == _libs.canlib.enums.Error.NOCARD:
+                    continue
+                raise
+            entries[channel_number] = entry
+
+        self._entries = entries
+        self._by_ean = {}
+        self._by_serial = {}
+        self._by_name = {}
+        self._devices = {}
+        for entry in entries.values():
+            self._by_ean.setdefault(entry.ean, []).append(entry)
+            self._by_serial.setdefault(entry.serial, []).append(entry)
+            if entry.channel_name:
+                self._by_name.setdefault(entry.channel_name, []).append(entry)
+            device = Device(ean=entry.ean, serial=entry.serial)
+            self._devices.setdefault(device, entry.channel_number - entry.chan_no_on_card)
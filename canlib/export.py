@@ -0,0 +1,460 @@
+"""Streaming export of CAN frames to text files
+
+The writers in this module produce Vector ASC and CSV files directly from
+`canlib.Frame` objects (e.g. as read using `canlib.canlib.Channel.read`) or
+`canlib.kvmlib` events, without creating a `canlib.kvlclib.Converter`::
+
+    from canlib import export
+
+    with export.AscWriter('capture.asc', channels=[0, 1]) as asc:
+        for frames in batches:
+            asc.write(frames, channel=0)
+
+The message lines written are the same as those written by the kvlclib
+writers `~canlib.kvlclib.FileFormat.VECTOR_ASC` and
+`~canlib.kvlclib.FileFormat.CSV` for the same events. CAN FD frames are not
+supported by `AscWriter`.
+
+Frames are formatted a whole chunk at a time using precomputed lookup tables
+and written with a single call per chunk. Files ending in ``.gz`` or ``.xz``
+are compressed using `gzip` or `lzma`.
+
+.. versionadded:: 1.32
+
+"""
+import datetime
+import gzip
+import itertools
+import lzma
+import os
+
+from .canlib.enums import MessageFlag
+
+_RTR = int(MessageFlag.RTR)
+_EXT = int(MessageFlag.EXT)
+_ERROR_FRAME = int(MessageFlag.ERROR_FRAME)
+_TXACK = int(MessageFlag.TXACK)
+_FDF = int(MessageFlag.FDF)
+
+_NS_PER_SECOND = 1000000000
+
+# Lookup table used to format data bytes as decimal
+_CSV_DEC = tuple(str(b) for b in range(256))
+
+try:
+    bytes().hex(' ')
+
+    def _hex(data):
+        return bytes(data).hex(' ').upper()
+
+except TypeError:
+    # bytes.hex() does not take a separator before Python 3.8
+    _HEX = tuple(f"{b:02X}" for b in range(256))
+
+    def _hex(data):
+        return ' '.join(map(_HEX.__getitem__, data))
+
+# English names used in the ASC header, independent of locale
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+_COMPRESSION = {
+    None: open,
+    'gzip': gzip.open,
+    'lzma': lzma.open,
+}
+
+# Kinds of rows produced by _rows()
+_MESSAGE = 0
+_TRIGGER = 1
+
+
+def _open(file, compression):
+    if hasattr(file, 'write'):
+        return file, False
+    file = os.fspath(file)
+    if compression == 'infer':
+        if file.endswith('.gz'):
+            compression = 'gzip'
+        elif file.endswith('.xz'):
+            compression = 'lzma'
+        else:
+            compression = None
+    try:
+        opener = _COMPRESSION[compression]
+    except KeyError:
+        raise ValueError(f"Unknown compression: {compression!r}")
+    return opener(file, 'wb'), True
+
+
+class _Writer:
+    """Base class for the writers, handles files, chunking and timestamps"""
+
+    def __init__(self, file, compression, ticks_per_second, chunk_size, newline):
+        self._file, self._owns_file = _open(file, compression)
+        self.chunk_size = chunk_size
+        self.newline = newline
+        self._ticks_per_second = ticks_per_second
+        self._header_written = False
+        self.frames_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, frames, channel=0):
+        """Write frames or events
+
+        Args:
+            frames: Iterable of `canlib.Frame` objects, tuples ``(id, data,
+                dlc, flags, timestamp)`` (optionally followed by a channel), or
+                `canlib.kvmlib` events. Events other than message and trigger
+                events are ignored.
+            channel (`int`): Channel of frames and tuples without a channel
+                of their own. Note that channels are numbered from 0, while
+                they are written numbered from 1, as kvlclib does.
+
+        """
+        frames = iter(frames)
+        while True:
+            rows = self._rows(itertools.islice(frames, self.chunk_size), channel)
+            if not rows:
+                return
+            if not self._header_written:
+                self._write_header(rows)
+                self._header_written = True
+            self._write_text(self._format(rows))
+
+    def write_columns(self, ids, data, dlcs=None, flags=None, timestamps=None, channels=0):
+        """Write a batch of frames given as columns
+
+        Args:
+            ids: Sequence of frame ids.
+            data: Sequence of data bytes for each frame.
+            dlcs: Sequence of DLCs, default is the length of the data.
+            flags: Sequence of `canlib.canlib.MessageFlag`, default is no flags.
+            timestamps: Sequence of timestamps, default is zero.
+            channels: Sequence of channels, or a single channel for all frames.
+
+        """
+        if dlcs is None:
+            dlcs = map(len, data)
+        if flags is None:
+            flags = itertools.repeat(0)
+        if timestamps is None:
+            timestamps = itertools.repeat(0)
+        if isinstance(channels, int):
+            channels = itertools.repeat(channels)
+        self.write(zip(ids, data, dlcs, flags, timestamps, channels))
+
+    def close(self):
+        """Write any footer and close the file"""
+        if self._file is None:
+            return
+        if not self._header_written:
+            self._write_header([])
+            self._header_written = True
+        self._write_footer()
+        if self._owns_file:
+            self._file.close()
+        self._file = None
+
+    def _write_text(self, lines):
+        if lines:
+            lines.append('')
+            self._file.write(self.newline.join(lines).encode('ascii'))
+
+    def _write_header(self, rows):
+        pass
+
+    def _write_footer(self):
+        pass
+
+    def _rows(self, items, channel):
+        """Convert frames and events to rows with timestamps in nanoseconds
+
+        Each row is ``(kind, timestamp, channel, id, data, dlc, flags)`` for
+        messages and ``(kind, timestamp, event)`` for triggers.
+
+        """
+        tps = self._ticks_per_second
+        if _NS_PER_SECOND % tps == 0:
+            factor = _NS_PER_SECOND // tps
+
+            def to_ns(ticks):
+                return (ticks or 0) * factor
+
+        else:
+
+            def to_ns(ticks):
+                return (ticks or 0) * _NS_PER_SECOND // tps
+
+        rows = []
+        append = rows.append
+        for item in items:
+            if isinstance(item, tuple):
+                if len(item) == 6:
+                    id_, data, dlc, flags, timestamp, ch = item
+                else:
+                    id_, data, dlc, flags, timestamp = item
+                    ch = channel
+                append((_MESSAGE, to_ns(timestamp), ch, id_, data, dlc, int(flags)))
+            elif hasattr(item, 'timeStamp'):
+                # kvmlib events, always timestamped in nanoseconds
+                if hasattr(item, 'data'):
+                    append(
+                        (
+                            _MESSAGE,
+                            item.timeStamp,
+                            item.channel,
+                            item.id,
+                            item.data,
+                            item.dlc,
+                            item.flags,
+                        )
+                    )
+                elif hasattr(item, 'trigno'):
+                    append((_TRIGGER, item.timeStamp, item))
+            else:
+                append(
+                    (
+                        _MESSAGE,
+                        to_ns(item.timestamp),
+                        channel,
+                        item.id,
+                        item.data,
+                        item.dlc,
+                        int(item.flags),
+                    )
+                )
+        return rows
+
+
+class AscWriter(_Writer):
+    """Write frames to a Vector ASC file
+
+    The lines are formatted as by the kvlclib writer
+    `~canlib.kvlclib.FileFormat.VECTOR_ASC`, with absolute timestamps and
+    hexadecimal ids and data.
+
+    Only classic CAN frames are supported, `write` raises `ValueError` for
+    CAN FD frames (with `~canlib.canlib.MessageFlag.FDF` set), which kvlclib
+    writes using the ``CANFD`` line format. Use `canlib.kvlclib` to convert
+    CAN FD logs.
+
+    Args:
+        file: Filename or binary file object to write to.
+        channels (`list` of `int`): Channels listed in the header. Default is
+            the channels of the frames in the first chunk.
+        start_time (`datetime.datetime`): Time written in the header, default
+            is now.
+        compression: ``'gzip'``, ``'lzma'``, `None`, or ``'infer'`` to use the
+            extension of the filename.
+        ticks_per_second (`int`): Resolution of the timestamps of frames and
+            tuples, default is 1000 which is the default of
+            `canlib.canlib.Channel.read`. Events from `canlib.kvmlib` are
+            always in nanoseconds.
+        chunk_size (`int`): Number of frames formatted and written at a time.
+        newline (`str`): Line separator, kvlclib uses ``'\\r\\n'``.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, file, channels=None, start_time=None, compression='infer', ticks_per_second=1000,
+        chunk_size=8192, newline='\r\n',
+    ):
+        super().__init__(file, compression, ticks_per_second, chunk_size, newline)
+        self.channels = channels
+        self.start_time = start_time
+
+    def _write_header(self, rows):
+        start = self.start_time
+        if start is None:
+            start = datetime.datetime.now()
+        channels = self.channels
+        if channels is None:
+            channels = sorted({row[2] for row in rows if row[0] == _MESSAGE})
+        date = "date {} {} {:02d} {:02d}:{:02d}:{:02d} {} {}".format(
+            _WEEKDAYS[start.weekday()],
+            _MONTHS[start.month - 1],
+            start.day,
+            start.hour % 12 or 12,
+            start.minute,
+            start.second,
+            'am' if start.hour < 12 else 'pm',
+            start.year,
+        )
+        self._write_text(
+            [
+                date,
+                "base hex timestamps absolute",
+                "// CAN channel: " + " ".join(str(ch + 1) for ch in channels),
+                "Begin Triggerblock",
+                "// ;    time  can ident           attr dlc data ...  ",
+            ]
+        )
+
+    def _write_footer(self):
+        self._write_text(["End Triggerblock"])
+
+    def _format(self, rows):
+        lines = []
+        append = lines.append
+        for row in rows:
+            seconds, ns = divmod(row[1], _NS_PER_SECOND)
+            if row[0] == _TRIGGER:
+                event = row[2]
+                append(
+                    "%7d.%09d Log Trigger Event (type=0x%x, active=0x%02x, "
+                    "pre-trigger=%d, post-trigger=%d)"
+                    % (seconds, ns, event.type, event.trigno, event.pretrigger, event.posttrigger)
+                )
+                continue
+            _, _, ch, id_, data, dlc, flags = row
+            if flags & _ERROR_FRAME:
+                append("%7d.%09d %d  ErrorFrame" % (seconds, ns, ch + 1))
+                continue
+            if flags & _FDF:
+                raise ValueError(f"CAN FD frames are not supported, got id 0x{id_:x}")
+            direction = "Tx" if flags & _TXACK else "Rx"
+            if flags & _EXT:
+                id_ = "%Xx" % id_
+            else:
+                id_ = "%X" % id_
+            if flags & _RTR:
+                append("%7d.%09d %d  %-13s%s   r %3d" % (seconds, ns, ch + 1, id_, direction, dlc))
+            else:
+                append(
+                    "%7d.%09d %d  %-13s%s   d %3d %-23s "
+                    % (seconds, ns, ch + 1, id_, direction, dlc, _hex(data))
+                )
+        self.frames_written += len(lines)
+        return lines
+
+
+class CsvWriter(_Writer):
+    """Write frames to a CSV file
+
+    The lines are formatted as by the kvlclib writer
+    `~canlib.kvlclib.FileFormat.CSV`, without a header::
+
+        time,channel,id,flags,dlc,data0,...,data7,counter
+
+    where the time is in seconds, truncated to five decimals, and the
+    counter numbers the frames from 1. Trigger events are not written.
+
+    Args:
+        file: Filename or binary file object to write to.
+        data_bytes (`int`): Number of data columns, longer frames are
+            truncated.
+        compression: ``'gzip'``, ``'lzma'``, `None`, or ``'infer'`` to use the
+            extension of the filename.
+        ticks_per_second (`int`): Resolution of the timestamps of frames and
+            tuples, see `AscWriter`.
+        chunk_size (`int`): Number of frames formatted and written at a time.
+        newline (`str`): Line separator, kvlclib uses ``'\\r\\n'``.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, file, data_bytes=8, compression='infer', ticks_per_second=1000, chunk_size=8192,
+        newline='\r\n',
+    ):
+        super().__init__(file, compression, ticks_per_second, chunk_size, newline)
+        self.data_bytes = data_bytes
+        # Padding for the empty data columns, indexed by number of data bytes
+        self._padding = [',' * (data_bytes - n) for n in range(data_bytes + 1)]
+        self._padding[0] = ',' * (data_bytes - 1)
+
+    def _format(self, rows):
+        lines = []
+        append = lines.append
+        dec_table = _CSV_DEC
+        padding = self._padding
+        data_bytes = self.data_bytes
+        counter = self.frames_written
+        for row in rows:
+            if row[0] != _MESSAGE:
+                continue
+            _, timestamp, ch, id_, data, dlc, flags = row
+            counter += 1
+            data = data[:data_bytes]
+            append(
+                "%d.%05d,%d,%d,%d,%d,%s%s,%d"
+                % (
+                    timestamp // _NS_PER_SECOND,
+                    timestamp % _NS_PER_SECOND // 10000,
+                    ch + 1,
+                    id_,
+                    flags,
+                    dlc,
+                    ','.join(map(dec_table.__getitem__, data)),
+                    padding[len(data)],
+                    counter,
+                )
+            )
+        self.frames_written = counter
+        return lines
+
+
+class SignalCsvWriter:
+    """Write decoded signal values to a CSV file
+
+    Each row holds a timestamp followed by the value of each signal, with a
+    header row naming the columns::
+
+        with export.SignalCsvWriter('signals.csv', ['EngineSpeed', 'Load']) as csv:
+            csv.write(timestamps, {'EngineSpeed': speeds, 'Load': loads})
+
+    Args:
+        file: Filename or binary file object to write to.
+        names (`list` of `str`): Names of the signal columns.
+        compression: ``'gzip'``, ``'lzma'``, `None`, or ``'infer'`` to use the
+            extension of the filename.
+        newline (`str`): Line separator.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, file, names, compression='infer', newline='\r\n'):
+        self._file, self._owns_file = _open(file, compression)
+        self.names = list(names)
+        self.newline = newline
+        self._write_lines([','.join(['Time'] + self.names)])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, timestamps, columns):
+        """Write a chunk of rows
+
+        Args:
+            timestamps: Sequence of timestamps in seconds.
+            columns (`dict`): Sequence of values for each signal name, signals
+                missing from `columns` are left empty.
+
+        """
+        empty = itertools.repeat('')
+        values = [map(str, columns[name]) if name in columns else empty for name in self.names]
+        self._write_lines([','.join(row) for row in zip(map(str, timestamps), *values)])
+
+    def close(self):
+        """Close the file"""
+        if self._file is not None and self._owns_file:
+            self._file.close()
+        self._file = None
+
+    def _write_lines(self, lines):
+        if lines:
+            lines.append('')
+            self._file.write(self.newline.join(lines).encode('utf-8'))
@@ -0,0 +1,575 @@
+"""ISO-TP (ISO 15765-2) transport protocol on a CANlib channel
+
+ISO-TP carries messages of up to 4 GiB over CAN by splitting them into a
+first frame and consecutive frames, with flow control frames from the
+receiver telling the sender how many frames it may send (block size) and how
+long to wait between them (STmin). Messages that fit in one frame are sent
+as a single frame.
+
+Example of usage:
+
+    >>> from canlib import canlib, isotp
+    >>> ch = canlib.openChannel(0, bitrate=canlib.Bitrate.BITRATE_500K)
+    >>> ch.busOn()
+    >>> with isotp.IsoTpEngine(ch) as engine:
+    ...     ecu = engine.connect(tx_id=0x7E0, rx_id=0x7E8)
+    ...     ecu.send(b'\\x22\\xf1\\x90')
+    ...     response = ecu.recv(timeout=1000)
+
+Both classic CAN (8 byte frames) and CAN FD (up to 64 byte frames) are
+supported, and frames using the escape sequences of ISO 15765-2:2016 are
+received. Only normal addressing is supported, i.e. each connection uses one
+CAN identifier in each direction.
+
+.. versionadded:: 1.32
+
+"""
+
+import math
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from .canlib.enums import MessageFlag
+from .canlib.exceptions import CanNoMsg, CanOverflowError
+from .exceptions import CanlibException
+
+SINGLE_FRAME = 0x0
+FIRST_FRAME = 0x1
+CONSECUTIVE_FRAME = 0x2
+FLOW_CONTROL = 0x3
+
+#: Flow status of a flow control frame: continue to send
+FS_CTS = 0
+#: Flow status of a flow control frame: wait
+FS_WAIT = 1
+#: Flow status of a flow control frame: overflow, the message is too long
+FS_OVFLW = 2
+
+# Time before a deadline when sleeping stops and busy waiting starts
+_SPIN = 0.0002
+
+# Valid CAN FD frame lengths, used for padding
+_FD_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+_PAD_LENGTH = [next(n for n in _FD_LENGTHS if n >= i) for i in range(65)]
+
+IsoTpStats = namedtuple(
+    'IsoTpStats',
+    'messages_sent messages_received bytes_sent bytes_received frames_sent frames_received '
+    'rx_errors',
+)
+IsoTpStats.__doc__ = """Counters of an `IsoTpConnection`
+
+    Attributes:
+        messages_sent (`int`): Messages sent
+        messages_received (`int`): Complete messages received
+        bytes_sent (`int`): Payload bytes sent
+        bytes_received (`int`): Payload bytes received
+        frames_sent (`int`): CAN frames sent, including flow control
+        frames_received (`int`): CAN frames received, including flow control
+        rx_errors (`int`): Messages that were aborted while receiving, e.g.
+            because of a wrong sequence number or a timeout
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class IsoTpError(CanlibException):
+    """Raised when an ISO-TP message could not be sent
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+class IsoTpTimeout(IsoTpError):
+    """Raised when the receiver did not send a flow control frame in time
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+def st_min_to_seconds(st_min):
+    """Convert a STmin value from a flow control frame to seconds
+
+    Values 0x00-0x7F are milliseconds and 0xF1-0xF9 are 100-900
+    microseconds. Reserved values are treated as the longest time, 127 ms,
+    as required by ISO 15765-2.
+
+    .. versionadded:: 1.32
+
+    """
+    if st_min <= 0x7F:
+        return st_min / 1000
+    if 0xF1 <= st_min <= 0xF9:
+        return (st_min - 0xF0) / 10000
+    return 0.127
+
+
+def seconds_to_st_min(seconds):
+    """Convert a time in seconds to the smallest STmin value at least as long
+
+    .. versionadded:: 1.32
+
+    """
+    if seconds <= 0:
+        return 0
+    if seconds <= 0.0009:
+        return 0xF0 + max(1, math.ceil(round(seconds * 10000, 6)))
+    return min(0x7F, math.ceil(round(seconds * 1000, 6)))
+
+
+class _Reassembly:
+    """A message being received, in a buffer allocated from the first frame"""
+
+    __slots__ = ('buffer', 'view', 'length', 'received', 'sn', 'block', 'deadline')
+
+    def __init__(self, length):
+        self.buffer = bytearray(length)
+        self.view = memoryview(self.buffer)
+        self.length = length
+        self.received = 0
+        self.sn = 1
+        self.block = 0
+        self.deadline = 0.0
+
+
+class IsoTpConnection:
+    """One ISO-TP connection, created by `IsoTpEngine.connect`
+
+    Sending happens in the calling thread, while frames are received and flow
+    control frames are answered by the engine's reader thread. Several
+    connections of the same engine can send at the same time from different
+    threads.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, engine, tx_id, rx_id, extended, fd, tx_dl, padding, block_size, st_min,
+        max_length, timeout,
+    ):
+        self.engine = engine
+        self.tx_id = tx_id
+        self.rx_id = rx_id
+        self.fd = fd
+        self.tx_dl = tx_dl
+        self.padding = padding
+        self.block_size = block_size
+        self.st_min = st_min
+        self.max_length = max_length
+        self.timeout = timeout
+        flags = MessageFlag.EXT if extended else 0
+        if fd:
+            flags |= MessageFlag.FDF | MessageFlag.BRS
+        self._flags = flags
+        self._messages = queue.Queue()
+        self._fc = queue.Queue()
+        self._rx = None
+        self._send_lock = threading.Lock()
+        self._counts = dict.fromkeys(IsoTpStats._fields, 0)
+
+    def __repr__(self):
+        return f"IsoTpConnection(tx_id=0x{self.tx_id:x}, rx_id=0x{self.rx_id:x})"
+
+    @property
+    def stats(self):
+        """`IsoTpStats`: Counters since the connection was created"""
+        return IsoTpStats(**self._counts)
+
+    def send(self, data, timeout=None):
+        """Send a message
+
+        Returns when the last frame has been queued for transmission.
+
+        Args:
+            data (`bytes`): The message
+            timeout (`int`): Maximum time in milliseconds to wait for each
+                flow control frame (N_Bs), default is the timeout of the
+                connection
+
+        Raises:
+            `ValueError`: The message is empty
+            `IsoTpTimeout`: No flow control frame was received in time
+            `IsoTpError`: The receiver reported overflow, or sent too many
+                wait frames
+
+        """
+        data = memoryview(bytes(data))
+        length = len(data)
+        if not length:
+            raise ValueError("ISO-TP can not send empty messages")
+        timeout = self.timeout if timeout is None else timeout
+        with self._send_lock:
+            if length <= self._max_single_frame():
+                self._write(self._single_frame(data))
+            else:
+                self._send_segmented(data, length, timeout / 1000)
+            self._counts['messages_sent'] += 1
+            self._counts['bytes_sent'] += length
+
+    def recv(self, timeout=0):
+        """Receive a message
+
+        Args:
+            timeout (`int`): Maximum time in milliseconds to wait, `None`
+                waits forever
+
+        Returns:
+            `bytearray`: The message. This is the buffer the message was
+            received into, and is not used by the connection again.
+
+        Raises:
+            `~canlib.canlib.CanNoMsg`: No message was received in time
+
+        """
+        try:
+            if timeout is None:
+                return self._messages.get()
+            return self._messages.get(timeout=timeout / 1000)
+        except queue.Empty:
+            raise CanNoMsg()
+
+    def close(self):
+        """Remove the connection from the engine"""
+        self.engine._remove(self)
+
+    def _max_single_frame(self):
+        if self.tx_dl > 8:
+            return self.tx_dl - 2
+        return 7
+
+    def _pad(self, payload):
+        length = len(payload)
+        if self.fd and length > 8:
+            size = _PAD_LENGTH[length]
+        elif self.padding is not None:
+            size = 8
+        else:
+            return payload
+        if size > length:
+            payload += bytes((self.padding or 0,)) * (size - length)
+        return payload
+
+    def _single_frame(self, data):
+        if len(data) <= 7:
+            return self._pad(bytes((len(data),)) + data)
+        return self._pad(bytes((0, len(data))) + data)
+
+    def _write(self, payload):
+        self.engine._write(self.tx_id, payload, self._flags)
+        self._counts['frames_sent'] += 1
+
+    def _send_segmented(self, data, length, timeout):
+        tx_dl = self.tx_dl
+        if length <= 0xFFF:
+            header = bytes((0x10 | (length >> 8), length & 0xFF))
+        else:
+            header = bytes((0x10, 0)) + length.to_bytes(4, 'big')
+        offset = tx_dl - len(header)
+        # Drop stale flow control frames from an earlier aborted transfer
+        while not self._fc.empty():
+            self._fc.get_nowait()
+        self._write(header + data[:offset])
+
+        cf_size = tx_dl - 1
+        pad = self._pad
+        write = self.engine._write
+        tx_id = self.tx_id
+        flags = self._flags
+        sn = 1
+        while offset < length:
+            block_size, st_min = self._wait_for_clearance(timeout)
+            # Build the whole block up front, so that nothing but the writes
+            # happen between the frames
+            count = -(-(length - offset) // cf_size)
+            if block_size:
+                count = min(count, block_size)
+            frames = []
+            for _ in range(count):
+                frames.append(pad(bytes((0x20 | sn,)) + data[offset:offset + cf_size]))
+                offset += cf_size
+                sn = (sn + 1) & 0xF
+            if st_min:
+                self.engine._write_spaced(tx_id, frames, flags, st_min_to_seconds(st_min))
+            else:
+                for payload in frames:
+                    write(tx_id, payload, flags)
+            self._counts['frames_sent'] += count
+
+    def _wait_for_clearance(self, timeout):
+        waits = 0
+        while True:
+            try:
+                status, block_size, st_min = self._fc.get(timeout=timeout)
+            except queue.Empty:
+                raise IsoTpTimeout(f"No flow control from 0x{self.rx_id:x} (N_Bs)")
+            if status == FS_CTS:
+                return block_size, st_min
+            if status == FS_WAIT:
+                waits += 1
+                if waits > self.engine.max_wait_frames:
+                    raise IsoTpError(f"Too many wait frames from 0x{self.rx_id:x}")
+                continue
+            if status == FS_OVFLW:
+                raise IsoTpError(f"Message too long for 0x{self.rx_id:x} (overflow)")
+            raise IsoTpError(f"Invalid flow status {status} from 0x{self.rx_id:x}")
+
+    def _flow_control(self, status):
+        self._write(self._pad(bytes((0x30 | status, self.block_size, self.st_min))))
+
+    def _deliver(self, buffer):
+        self._counts['messages_received'] += 1
+        self._counts['bytes_received'] += len(buffer)
+        self._messages.put(buffer)
+
+    def _abort(self):
+        self._rx = None
+        self._counts['rx_errors'] += 1
+
+    def _on_frame(self, data, now):
+        """Handle a frame received on rx_id, called from the reader thread"""
+        self._counts['frames_received'] += 1
+        pci = data[0] >> 4
+        if pci == CONSECUTIVE_FRAME:
+            rx = self._rx
+            if rx is None:
+                return
+            if data[0] & 0xF != rx.sn:
+                self._abort()
+                return
+            end = min(rx.received + len(data) - 1, rx.length)
+            rx.view[rx.received:end] = data[1:1 + end - rx.received]
+            rx.received = end
+            rx.sn = (rx.sn + 1) & 0xF
+            if end == rx.length:
+                self._rx = None
+                self._deliver(rx.buffer)
+                return
+            rx.deadline = now + self.timeout / 1000
+            if self.block_size:
+                rx.block += 1
+                if rx.block == self.block_size:
+                    rx.block = 0
+                    self._flow_control(FS_CTS)
+        elif pci == FLOW_CONTROL:
+            if len(data) >= 3:
+                self._fc.put((data[0] & 0xF, data[1], data[2]))
+        elif pci == SINGLE_FRAME:
+            if self._rx is not None:
+                self._abort()
+            length = data[0] & 0xF
+            start = 1
+            if length == 0 and len(data) > 8:
+                length = data[1]
+                start = 2
+            if length and start + length <= len(data):
+                self._deliver(bytearray(data[start:start + length]))
+        elif pci == FIRST_FRAME:
+            if self._rx is not None:
+                self._abort()
+            length = ((data[0] & 0xF) << 8) | data[1]
+            start = 2
+            if length == 0:
+                length = int.from_bytes(data[2:6], 'big')
+                start = 6
+            if self.max_length is not None and length > self.max_length:
+                self._flow_control(FS_OVFLW)
+                self._counts['rx_errors'] += 1
+                return
+            rx = _Reassembly(length)
+            first = min(len(data) - start, length)
+            rx.view[:first] = data[start:start + first]
+            rx.received = first
+            rx.deadline = now + self.timeout / 1000
+            self._rx = rx
+            self._flow_control(FS_CTS)
+
+    def _check_timeout(self, now):
+        rx = self._rx
+        if rx is not None and now > rx.deadline:
+            # N_Cr, the sender stopped sending consecutive frames
+            self._abort()
+
+
+class IsoTpEngine:
+    """ISO-TP engine running on a CANlib channel
+
+    The engine reads all frames from the channel in a background thread,
+    started by `start` or by using the engine as a context manager, and
+    passes them to the connection with the matching receive identifier.
+    Frames with other identifiers are ignored. The channel must be on bus
+    and must not be read from elsewhere while the engine is running.
+
+    Consecutive frames are built a block at a time and written back to
+    back, or spaced by STmin using a sleep followed by a short busy wait,
+    since `time.sleep` alone is far too coarse for sub-millisecond STmin.
+
+    Args:
+        channel (`~canlib.canlib.Channel`): The channel to use
+        fd (`bool`): Send CAN FD frames by default
+        tx_dl (`int`): Default transmit data length, 8 for classic CAN and 8
+            to 64 for CAN FD. Default is 64 for CAN FD.
+        padding (`int`): Byte used to pad frames to 8 bytes, or `None` to
+            send classic CAN frames unpadded. CAN FD frames longer than 8
+            bytes are always padded to a valid length.
+        timeout (`int`): Default N_Bs/N_Cr timeout of the connections, in
+            milliseconds
+        max_wait_frames (`int`): Maximum number of flow control wait frames
+            accepted in a row (N_WFTmax)
+        read_timeout (`int`): Timeout in milliseconds of each read in the
+            reader thread, which limits how long `stop` takes
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, channel, fd=False, tx_dl=None, padding=0xCC, timeout=1000, max_wait_frames=10,
+        read_timeout=10,
+    ):
+        self.channel = channel
+        self.fd = fd
+        self.tx_dl = tx_dl if tx_dl is not None else (64 if fd else 8)
+        self.padding = padding
+        self.timeout = timeout
+        self.max_wait_frames = max_wait_frames
+        self.read_timeout = read_timeout
+        self._connections = {}
+        self._by_rx_id = {}
+        self._write_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def connect(
+        self, tx_id, rx_id, extended=False, fd=None, tx_dl=None, block_size=0, st_min=0,
+        max_length=None, timeout=None,
+    ):
+        """Create a connection for a pair of CAN identifiers
+
+        Args:
+            tx_id (`int`): CAN identifier of frames sent
+            rx_id (`int`): CAN identifier of frames received, must be unique
+                among the connections of the engine
+            extended (`bool`): Use extended (29-bit) identifiers
+            fd, tx_dl: Override the engine defaults for this connection
+            block_size (`int`): Block size sent in flow control frames, i.e.
+                number of consecutive frames the peer may send before waiting
+                for the next flow control frame. 0 means no limit.
+            st_min (`int`): STmin value sent in flow control frames, see
+                `seconds_to_st_min`
+            max_length (`int`): Longest message accepted, longer messages are
+                refused with an overflow flow control frame
+            timeout (`int`): Override the engine timeout for this connection
+
+        Returns:
+            `IsoTpConnection`
+
+        """
+        if rx_id in self._by_rx_id:
+            raise ValueError(f"A connection already receives on 0x{rx_id:x}")
+        fd = self.fd if fd is None else fd
+        if tx_dl is None:
+            tx_dl = self.tx_dl if fd else 8
+        if tx_dl not in (8, 12, 16, 20, 24, 32, 48, 64) or (tx_dl > 8 and not fd):
+            raise ValueError(f"Invalid tx_dl: {tx_dl}")
+        connection = IsoTpConnection(
+            self, tx_id, rx_id, extended, fd, tx_dl, self.padding, block_size, st_min,
+            max_length, self.timeout if timeout is None else timeout,
+        )
+        self._connections[(tx_id, rx_id)] = connection
+        self._by_rx_id[rx_id] = connection
+        return connection
+
+    def connection(self, tx_id, rx_id):
+        """Return the connection for a pair of CAN identifiers"""
+        return self._connections[(tx_id, rx_id)]
+
+    def start(self):
+        """Start the reader thread"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread
+
+        Any error raised in the reader thread is raised again here.
+
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _remove(self, connection):
+        self._connections.pop((connection.tx_id, connection.rx_id), None)
+        if self._by_rx_id.get(connection.rx_id) is connection:
+            del self._by_rx_id[connection.rx_id]
+
+    def _run(self):
+        read = self.channel.read
+        by_rx_id = self._by_rx_id
+        read_timeout = self.read_timeout
+        last_check = time.perf_counter()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    frame = read(timeout=read_timeout)
+                except CanNoMsg:
+                    frame = None
+                now = time.perf_counter()
+                if frame is not None and not frame.flags & MessageFlag.ERROR_FRAME:
+                    connection = by_rx_id.get(frame.id)
+                    if connection is not None and frame.data:
+                        connection._on_frame(frame.data, now)
+                if now - last_check > 0.01:
+                    last_check = now
+                    for connection in list(by_rx_id.values()):
+                        connection._check_timeout(now)
+        except Exception as e:
+            self._error = e
+
+    def _write(self, id_, payload, flags):
+        with self._write_lock:
+            while True:
+                try:
+                    self.channel.write_raw(id_, payload, flags)
+                    return
+                except CanOverflowError:
+                    # The transmit queue is full, wait for it to drain
+                    self.channel.writeSync(self.timeout)
+
+    def _write_spaced(self, id_, frames, flags, st_min):
+        spin = _SPIN
+        next_time = time.perf_counter()
+        for payload in frames:
+            now = time.perf_counter()
+            if next_time - now > spin:
+                time.sleep(next_time - now - spin)
+            while time.perf_counter() < next_time:
+                pass
+            self._write(id_, payload, flags)
+            next_time = time.perf_counter() + st_min
@@ -0,0 +1,107 @@
+"""
+
+This module holds definitions of J1939 Protocol Data Unit (PDU) frames.
+
+Example of usage:
+
+    >>> from canlib import Frame, j1939
+    >>> from canlib.canlib import MessageFlag
+    >>> def frame_from_pdu(pdu):
+    ...     can_id = j1939.can_id_from_pdu(pdu)
+    ...     frame = Frame(
+    ...         id_=can_id,
+    ...         data=pdu.data,
+    ...         flags=MessageFlag.EXT,
+    ...     )
+    ...     return frame
+    >>> pdu = j1939.Pdu1(
+    ...     p=3, edp=0, dp=0, pf=0x99, ps=0xfe, sa=0xfe,
+    ...     data=[1]
+    ... )
+    >>> frame_from_pdu(pdu)
+    Frame(id=211418878, data=bytearray(b'\\x01'), dlc=1, flags=<MessageFlag.EXT: 4>, timestamp=None)
+
+The `Pdu1` and `Pdu2` models use pydantic, and are imported when first used.
+To decode the identifiers of many frames, e.g. from a log file, use
+`decode_id` or `decode_ids` instead, see `canlib.j1939.pdu`.
+
+
+The particular characteristics of J1939 are:
+
+ - Extended CAN identifier (29 bit)
+ - Bit rate 250 kbit/s
+ - Peer-to-peer and broadcast communication
+ - Transport protocols for up to 1785 data bytes
+ - Network management
+ - Definition of parameter groups for commercial vehicles and others
+ - Manufacturer specific parameter groups are supported
+ - Diagnostics features
+
+
+(Extended) Data Page Bit
+************************
+
++-----------+-----------+----------------------------------------------+
+| Extended  |           |                                              |
+| Data page | Data page | Description                                  |
++===========+===========+==============================================+
+|         0 |         0 | SAE J1939 Page 0 Parameter Groups            |
++-----------+-----------+----------------------------------------------+
+|         0 |         1 | SAE J1939 Page 1 Parameter Groups (NMEA2000) |
++-----------+-----------+----------------------------------------------+
+|         1 |         1 | SAE J1939 reserved                           |
++-----------+-----------+----------------------------------------------+
+|         1 |         1 | ISO 15765-3 defined                          |
++-----------+-----------+----------------------------------------------+
+
+    .. versionadded:: 1.18
+
+"""
+# Reference:
+# https://assets.vector.com/cms/content/know-how/_application-notes/AN-ION-1-3100_Introduction_to_J1939.pdf
+# https://forums.ni.com/t5/Example-Code/J1939-Transport-Protocol-Reference-Example/ta-p/3984291?profile.language=en
+
+import sys
+
+from .dispatch import (
+    PGN_ADDRESS_CLAIMED,
+    AddressClaimTable,
+    Name,
+    PgnDispatcher,
+    PgnRate,
+    decode_name,
+)
+from .fastpacket import (
+    FAST_PACKET_PGNS,
+    MAX_FAST_PACKET_SIZE,
+    FastPacketAssembler,
+    FastPacketStats,
+)
+from .pdu import PduColumns, PduId, decode_id, decode_ids, encode_id
+from .transport import (
+    GLOBAL_ADDRESS,
+    MAX_SIZE,
+    TpAbort,
+    TpEngine,
+    TpError,
+    TpMessage,
+    TpStats,
+    TpTimeout,
+)
+
+_MODELS = ('Pdu', 'Pdu1', 'Pdu2', 'pdu_from_can_id', 'can_id_from_pdu')
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+        # The pydantic models are imported when first used, since importing
+        # pydantic takes longer than the rest of canlib
+        if name in _MODELS:
+            from . import models
+
+            value = globals()[name] = getattr(models, name)
+            return value
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+else:
+    from .models import Pdu, Pdu1, Pdu2, can_id_from_pdu, pdu_from_can_id
@@ -0,0 +1,360 @@
+"""Dispatching of J1939 frames by PGN, and address claim tracking
+
+`PgnDispatcher` calls the handlers registered for the PGN and source address
+of each frame. The handlers for each CAN identifier seen are looked up once
+and kept in a table, so dispatching a frame costs one dictionary lookup
+however many handlers are registered:
+
+    >>> from canlib import j1939
+    >>> dispatcher = j1939.PgnDispatcher(ch)
+    >>> @dispatcher.handler(pgn=0xFEF1)
+    ... def on_ccvs(frame, pdu):
+    ...     speed = int.from_bytes(frame.data[1:3], 'little') / 256
+    >>> with dispatcher:
+    ...     time.sleep(10)
+    >>> dispatcher.claims.address_of(name)
+    0x21
+
+The dispatcher also keeps `AddressClaimTable` up to date from the Address
+Claimed messages (PGN 60928) on the bus.
+
+.. versionadded:: 1.32
+
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from ..canlib.enums import MessageFlag
+from ..canlib.exceptions import CanNoMsg
+from .pdu import decode_id
+
+#: PGN of Address Claimed messages
+PGN_ADDRESS_CLAIMED = 0xEE00
+#: Source address used in Cannot Claim Address messages
+NULL_ADDRESS = 0xFE
+
+_EXT = int(MessageFlag.EXT)
+_ERROR_FRAME = int(MessageFlag.ERROR_FRAME)
+
+PgnRate = namedtuple('PgnRate', 'pgn frames rate')
+PgnRate.__doc__ = """Number of frames of one PGN, returned by `PgnDispatcher.rates`
+
+    Attributes:
+        pgn (`int`): Parameter group number
+        frames (`int`): Number of frames
+        rate (`float`): Frames per second
+
+    .. versionadded:: 1.32
+
+"""
+
+Name = namedtuple(
+    'Name',
+    'identity_number manufacturer_code ecu_instance function_instance function '
+    'vehicle_system vehicle_system_instance industry_group arbitrary_address_capable',
+)
+Name.__doc__ = """The fields of a J1939 NAME, see `decode_name`
+
+    .. versionadded:: 1.32
+
+"""
+
+
+def decode_name(name):
+    """Split a 64-bit J1939 NAME into its fields
+
+    Args:
+        name (`int`): The NAME, as sent in little endian byte order in
+            Address Claimed messages
+
+    Returns:
+        `Name`
+
+    .. versionadded:: 1.32
+
+    """
+    return Name(
+        name & 0x1FFFFF,
+        (name >> 21) & 0x7FF,
+        (name >> 32) & 0x7,
+        (name >> 35) & 0x1F,
+        (name >> 40) & 0xFF,
+        (name >> 49) & 0x7F,
+        (name >> 56) & 0xF,
+        (name >> 60) & 0x7,
+        name >> 63,
+    )
+
+
+class AddressClaimTable:
+    """The addresses claimed by the nodes on a J1939 bus
+
+    Updated with each Address Claimed message passed to `claim`. When two
+    nodes claim the same address, the one with the lower NAME keeps it, as
+    in J1939-81. A node sending Cannot Claim Address (source address 254)
+    is removed.
+
+    Args:
+        callback: Function called as ``callback(name, address)`` when the
+            address of a NAME changes, with address `None` when the node no
+            longer has an address
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._by_name = {}
+        self._by_address = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def items(self):
+        """Return a list of (NAME, address) pairs"""
+        with self._lock:
+            return list(self._by_name.items())
+
+    def address_of(self, name):
+        """Return the address claimed by a NAME, or `None`"""
+        return self._by_name.get(name)
+
+    def name_of(self, address):
+        """Return the NAME that has claimed an address, or `None`"""
+        return self._by_address.get(address)
+
+    def claim(self, name, address):
+        """Handle an Address Claimed message
+
+        Args:
+            name (`int`): The NAME in the message
+            address (`int`): The source address of the message
+
+        Returns:
+            `bool`: Whether the table changed
+
+        """
+        changes = []
+        with self._lock:
+            if address == NULL_ADDRESS:
+                self._release(name, changes)
+            else:
+                holder = self._by_address.get(address)
+                if holder == name:
+                    return False
+                if holder is not None:
+                    if holder < name:
+                        # The claim lost, the node has no address until it
+                        # claims another one
+                        self._release(name, changes)
+                        return self._notify(changes)
+                    self._release(holder, changes)
+                self._release(name, changes)
+                self._by_name[name] = address
+                self._by_address[address] = name
+                changes.append((name, address))
+        return self._notify(changes)
+
+    def _release(self, name, changes):
+        address = self._by_name.pop(name, None)
+        if address is not None:
+            del self._by_address[address]
+            changes.append((name, None))
+
+    def _notify(self, changes):
+        if self.callback is not None:
+            for name, address in changes:
+                self.callback(name, address)
+        return bool(changes)
+
+
+class PgnDispatcher:
+    """Calls handlers for J1939 frames, registered by PGN and source address
+
+    Handlers are called as ``handler(frame, pdu)``, where `pdu` is the
+    `PduId` of the frame, in the order:
+
+     1. handlers for the PGN and source address,
+     2. handlers for the PGN from any source,
+     3. handlers for the source address with any PGN,
+     4. handlers for all frames,
+
+    and in the order they were added within each group. Only frames with
+    extended identifiers are dispatched.
+
+    Frames are read from `channel` in a background thread, started by
+    `start` or by using the dispatcher as a context manager, and handlers
+    are called from that thread. Frames can also be passed to `dispatch`.
+    To receive multi-frame messages, pass the transport protocol frames to
+    a `~canlib.j1939.TpEngine` that is not started itself::
+
+        tp = j1939.TpEngine(ch, addresses=[0xF9], callback=on_message)
+        for pgn in (j1939.transport.PGN_TP_CM, j1939.transport.PGN_TP_DT):
+            dispatcher.add_handler(lambda frame, pdu: tp.process(frame), pgn=pgn)
+
+    Args:
+        channel (`~canlib.canlib.Channel`): The channel to read from
+        read_timeout (`int`): Timeout in milliseconds of each read in the
+            reader thread, which limits how long `stop` takes
+
+    Attributes:
+        claims (`AddressClaimTable`): The addresses claimed on the bus
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, channel=None, read_timeout=10):
+        self.channel = channel
+        self.read_timeout = read_timeout
+        self.claims = AddressClaimTable()
+        self._handlers = {}
+        # CAN identifier -> [frame count, PduId, handlers]
+        self._table = {}
+        self._lock = threading.Lock()
+        self._rates_time = time.perf_counter()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+        self.add_handler(self._on_address_claimed, pgn=PGN_ADDRESS_CLAIMED)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_handler(self, handler, pgn=None, source=None):
+        """Add a handler
+
+        Args:
+            handler: Function called as ``handler(frame, pdu)``
+            pgn (`int`): The PGN to handle, or `None` for all
+            source (`int`): The source address to handle, or `None` for all
+
+        """
+        with self._lock:
+            self._handlers.setdefault((pgn, source), []).append(handler)
+            self._rebuild()
+
+    def remove_handler(self, handler, pgn=None, source=None):
+        """Remove a handler added using the same arguments"""
+        with self._lock:
+            self._handlers[(pgn, source)].remove(handler)
+            self._rebuild()
+
+    def handler(self, pgn=None, source=None):
+        """Decorator adding a function as handler, see `add_handler`"""
+
+        def decorator(function):
+            self.add_handler(function, pgn, source)
+            return function
+
+        return decorator
+
+    def dispatch(self, frame):
+        """Call the handlers of a frame"""
+        flags = frame.flags
+        if not flags & _EXT or flags & _ERROR_FRAME:
+            return
+        entry = self._table.get(frame.id)
+        if entry is None:
+            entry = self._add_entry(frame.id)
+        entry[0] += 1
+        pdu = entry[1]
+        for handler in entry[2]:
+            handler(frame, pdu)
+
+    def rates(self, reset=True):
+        """Return the number of frames received of each PGN
+
+        Args:
+            reset (`bool`): Start counting from zero again
+
+        Returns:
+            `dict` mapping PGN to `PgnRate`, for the time since the
+            dispatcher was created or the counters were last reset
+
+        """
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = now - self._rates_time
+            counts = {}
+            for entry in self._table.values():
+                pgn = entry[1].pgn
+                counts[pgn] = counts.get(pgn, 0) + entry[0]
+                if reset:
+                    entry[0] = 0
+            if reset:
+                self._rates_time = now
+        return {
+            pgn: PgnRate(pgn, count, count / elapsed if elapsed > 0 else 0.0)
+            for pgn, count in sorted(counts.items())
+        }
+
+    def start(self):
+        """Start reading frames from the channel"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reading frames
+
+        Any error raised in the reader thread, e.g. by a handler, is raised
+        again here.
+
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        read = self.channel.read
+        dispatch = self.dispatch
+        read_timeout = self.read_timeout
+        try:
+            while not self._stopping.is_set():
+                try:
+                    frame = read(timeout=read_timeout)
+                except CanNoMsg:
+                    continue
+                dispatch(frame)
+        except Exception as e:
+            self._error = e
+
+    def _handlers_for(self, pdu):
+        get = self._handlers.get
+        handlers = []
+        for key in ((pdu.pgn, pdu.sa), (pdu.pgn, None), (None, pdu.sa), (None, None)):
+            handlers.extend(get(key, ()))
+        return tuple(handlers)
+
+    def _add_entry(self, can_id):
+        with self._lock:
+            pdu = decode_id(can_id)
+            entry = [0, pdu, self._handlers_for(pdu)]
+            return self._table.setdefault(can_id, entry)
+
+    def _rebuild(self):
+        for entry in self._table.values():
+            entry[2] = self._handlers_for(entry[1])
+
+    def _on_address_claimed(self, frame, pdu):
+        if len(frame.data) >= 8:
+            self.claims.claim(int.from_bytes(frame.data[:8], 'little'), pdu.sa)
@@ -0,0 +1,235 @@
+"""NMEA 2000 fast-packet reassembly
+
+NMEA 2000 sends parameter groups of up to 223 bytes, e.g. GNSS positions
+and AIS reports, as a burst of single frames using the same CAN identifier.
+The first byte of each frame holds a 3-bit sequence id, which is the same
+for all frames of a message, and a 5-bit frame counter. The first frame
+(counter 0) holds the message length and 6 data bytes, and the following
+frames hold 7 data bytes each.
+
+`FastPacketAssembler` reassembles these messages, and can be passed to
+`canlib.kvadblib.Dbc.interpret` to decode the reassembled messages:
+
+    >>> from canlib import j1939, kvadblib
+    >>> assembler = j1939.FastPacketAssembler()
+    >>> with kvadblib.Dbc('nmea2000.dbc') as db:
+    ...     for frame in frames:
+    ...         bmsg = db.interpret(frame, j1939=True, fast_packet=assembler)
+    ...         if bmsg is not None:
+    ...             print(bmsg._message.name, [s.phys for s in bmsg])
+
+Which parameter groups use fast-packet can not be told from the frames, so
+the assembler only handles the PGNs in `FAST_PACKET_PGNS`, or the PGNs it
+is given.
+
+.. versionadded:: 1.32
+
+"""
+
+from collections import namedtuple
+
+from ..frame import Frame
+from .pdu import decode_id
+
+#: The largest fast-packet message
+MAX_FAST_PACKET_SIZE = 223
+
+#: NMEA 2000 PGNs sent as fast-packet. Add proprietary or other PGNs to this
+#: set to have `FastPacketAssembler` handle them.
+FAST_PACKET_PGNS = {
+    65240,  # ISO Commanded Address
+    126208,  # NMEA Request/Command/Acknowledge Group Function
+    126464,  # PGN List
+    126720,  # Proprietary fast-packet, addressable
+    126983, 126984, 126985, 126986, 126987, 126988,  # Alerts
+    126996,  # Product Information
+    126998,  # Configuration Information
+    127233,  # Man Overboard Notification
+    127237,  # Heading/Track Control
+    127489,  # Engine Parameters, Dynamic
+    127496, 127497, 127498,  # Trip Parameters and Engine Parameters, Static
+    127503, 127504,  # AC Input/Output Status
+    127506,  # DC Detailed Status
+    127507,  # Charger Status
+    127509, 127510, 127511, 127512, 127513, 127514,  # Inverter, charger and battery
+    128275,  # Distance Log
+    128520,  # Tracked Target Data
+    129029,  # GNSS Position Data
+    129038, 129039, 129040, 129041,  # AIS position reports and aids to navigation
+    129044,  # Datum
+    129045,  # User Datum
+    129284,  # Navigation Data
+    129285,  # Navigation Route/WP Information
+    129301,  # Time to/from Mark
+    129302,  # Bearing and Distance between two Marks
+    129538,  # GNSS Control Status
+    129540,  # GNSS Satellites in View
+    129541,  # GPS Almanac Data
+    129542,  # GNSS Pseudorange Noise Statistics
+    129545,  # GNSS RAIM Output
+    129547,  # GNSS Pseudorange Error Statistics
+    129549,  # DGNSS Corrections
+    129551,  # GNSS Differential Correction Receiver Signal
+    129556,  # GLONASS Almanac Data
+    129792, 129793, 129794, 129795, 129796, 129797, 129798, 129799, 129800, 129801, 129802,
+    129803, 129804, 129805, 129806, 129807, 129808, 129809, 129810,  # AIS and DSC
+    130052, 130053, 130054, 130060, 130061,  # Loran-C and label
+    130064, 130065, 130066, 130067, 130068, 130069, 130070, 130071, 130072, 130073, 130074,
+    130320, 130321, 130322, 130323, 130324,  # Tide, salinity, current and meteorological
+    130567,  # Watermaker Input Setting and Status
+    130577,  # Direction Data
+    130578,  # Vessel Speed Components
+    130816,  # Proprietary fast-packet, non addressable
+}
+
+FastPacketStats = namedtuple(
+    'FastPacketStats', 'messages frames out_of_order incomplete orphans'
+)
+FastPacketStats.__doc__ = """Counters of a `FastPacketAssembler`
+
+    Attributes:
+        messages (`int`): Complete messages
+        frames (`int`): Fast-packet frames handled
+        out_of_order (`int`): Frames received after a later frame of the
+            same message
+        incomplete (`int`): Messages dropped because frames were lost, i.e.
+            a new message with the same sequence id started before all
+            frames were received
+        orphans (`int`): Frames not belonging to a message being assembled,
+            e.g. because its first frame was lost, or repeated frames
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class _Session:
+    """A message being assembled, in a buffer allocated from the first frame"""
+
+    __slots__ = ('buffer', 'view', 'length', 'missing', 'next')
+
+    def __init__(self, length):
+        self.buffer = bytearray(length)
+        self.view = memoryview(self.buffer)
+        self.length = length
+        frames = 1 + max(0, -(-(length - 6) // 7))
+        # Bit n is set while frame n has not been received
+        self.missing = ((1 << frames) - 1) & ~1
+        # One more than the highest frame counter received
+        self.next = 1
+
+
+class FastPacketAssembler:
+    """Reassembles NMEA 2000 fast-packet messages
+
+    Messages are assembled per source address, PGN and sequence id, so
+    messages from different nodes and of different parameter groups may be
+    interleaved, as may consecutive messages of the same parameter group.
+    Frames within a message may arrive out of order.
+
+    Frames of other parameter groups are passed through unchanged by
+    `process`.
+
+    Args:
+        pgns: The PGNs to reassemble, default is `FAST_PACKET_PGNS`
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, pgns=None):
+        self.pgns = FAST_PACKET_PGNS if pgns is None else set(pgns)
+        self._sessions = {}
+        self._counts = dict.fromkeys(FastPacketStats._fields, 0)
+
+    @property
+    def stats(self):
+        """`FastPacketStats`: Counters since the assembler was created"""
+        return FastPacketStats(**self._counts)
+
+    @property
+    def sessions(self):
+        """`int`: Number of messages being assembled"""
+        return sum(len(s) - s.count(None) for s in self._sessions.values())
+
+    def process(self, frame):
+        """Handle a frame
+
+        Returns:
+            `~canlib.Frame` or `None`: For a frame of a fast-packet PGN, a new
+            frame with the same id and flags holding the whole message when
+            this was its last frame, otherwise `None`. Frames of other PGNs
+            are returned as they are.
+
+        """
+        pgn = decode_id(frame.id).pgn
+        if pgn not in self.pgns:
+            return frame
+        data = self.add(frame.id, frame.data)
+        if data is None:
+            return None
+        return Frame(
+            id_=frame.id, data=data, dlc=len(data), flags=frame.flags, timestamp=frame.timestamp
+        )
+
+    def add(self, can_id, data):
+        """Add a frame of a fast-packet PGN
+
+        Args:
+            can_id (`int`): CAN identifier of the frame
+            data (`bytes`): Data of the frame
+
+        Returns:
+            `bytearray` or `None`: The message when this was its last frame
+
+        """
+        if not data:
+            return None
+        counts = self._counts
+        counts['frames'] += 1
+        pdu = decode_id(can_id)
+        key = (pdu.sa, pdu.pgn)
+        slots = self._sessions.get(key)
+        if slots is None:
+            slots = self._sessions[key] = [None] * 8
+        seq = data[0] >> 5
+        counter = data[0] & 0x1F
+        session = slots[seq]
+
+        if counter == 0:
+            if session is not None:
+                counts['incomplete'] += 1
+            if len(data) < 2:
+                slots[seq] = None
+                return None
+            length = min(data[1], MAX_FAST_PACKET_SIZE)
+            first = data[2:2 + min(6, length)]
+            if length <= 6:
+                slots[seq] = None
+                if len(first) < length:
+                    return None
+                counts['messages'] += 1
+                return bytearray(first)
+            session = slots[seq] = _Session(length)
+            session.view[: len(first)] = first
+            return None
+
+        bit = 1 << counter
+        if session is None or not session.missing & bit:
+            counts['orphans'] += 1
+            return None
+        if counter < session.next:
+            counts['out_of_order'] += 1
+        else:
+            session.next = counter + 1
+        start = 6 + (counter - 1) * 7
+        end = min(start + 7, session.length)
+        chunk = data[1:1 + end - start]
+        session.view[start:start + len(chunk)] = chunk
+        session.missing &= ~bit
+        if session.missing:
+            return None
+        slots[seq] = None
+        counts['messages'] += 1
+        session.view.release()
+        return session.buffer
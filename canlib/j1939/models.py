@@ -0,0 +1,111 @@
+"""pydantic models of J1939 Protocol Data Units
+
+These are imported by `canlib.j1939` when first used, since pydantic is slow
+to import. See `canlib.j1939.pdu` for a faster way of decoding CAN
+identifiers.
+
+"""
+
+from pydantic import BaseModel
+from typing import Optional, Any, List
+
+from .pdu import decode_id
+
+
+class Pdu(BaseModel):
+    """Protocol Data Unit in j1939.
+
+    Base class with attributes common to `Pdu1` and `Pdu2`
+
+    """
+    p: int  #: priority
+    edp: int  #: extended data page
+    dp: int  #: data page
+    pf: int  #: PDU format
+    ps: int  #: PDU specific
+    sa: int  #: source address
+    data: Optional[List[int]] = None #: data field
+
+    def __repr__(self):
+        return (f"p={self.p}, edp={self.edp}, dp={self.dp},"
+                f" pf=0x{self.pf:02x}, ps=0x{self.ps:02x},"
+                f" sa=0x{self.sa:02x}, data={self.data})")
+
+
+class Pdu1(Pdu):
+    """Protocol Data Unit, Format 1
+
+    When `Pdu.pf` < 240, the PDU Specific field is a Destination Address and
+
+    `pgn` = Extended Data Page + Data Page + PDU Format + "00"
+
+    """
+    da: Optional[int] = None #: destination address, `Pdu.ps`
+    pgn: Optional[int] = None  #: parameter group number
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self.da = self.ps
+        self.pgn = self.pf << 8
+
+    def __str__(self):
+        return (f"pgn=0x{self.pgn:x}: Pdu1({super().__repr__()}")
+
+
+class Pdu2(Pdu):
+    """Protocol Data Unit, Format 2
+
+    When `Pdu.pf` >= 240, the PDU Specific field is the Group Extension
+
+      `pgn` = Extended Data Page + Data Page + PDU Format + Group Extension
+
+    """
+    ge: Optional[int] = None #: group extension, equal to `Pdu.ps`
+    pgn: Optional[int] = None #: parameter group number
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self.ge = self.ps
+        self.pgn = (self.pf << 8) + self.ps
+
+    def __str__(self):
+        return (f"pgn=0x{self.pgn:x}: Pdu2({super().__repr__()}")
+
+
+def pdu_from_can_id(can_id):
+    """Create j1939 Protocol Data Unit object based on CAN Id.
+
+    Args:
+        can_id (`int`): CAN Identifier
+
+    Returns:
+        `Pdu1` or `Pdu2` depending on value of `can_id`
+
+    """
+    p, edp, dp, pf, ps, sa, _, _ = decode_id(can_id)
+    if pf < 240:
+        # pgn = pf
+        return Pdu1(p=p, edp=edp, dp=dp, pf=pf, ps=ps, sa=sa)
+    else:
+        # pgn = (pf << 8) + ps
+        return Pdu2(p=p, edp=edp, dp=dp, pf=pf, ps=ps, sa=sa)
+
+
+def can_id_from_pdu(pdu):
+    """Extract CAN Id based on j1939 Protocol Data Unit object.
+
+    Args:
+        pdu (`Pdu1` or `Pdu2`): Protocol Data Unit
+
+    Returns:
+        can_id (`int`): CAN Identifier
+
+    """
+    # can_id =  0x80000000  # Extended flag in id
+    can_id = pdu.sa
+    can_id |= pdu.ps << 8
+    can_id |= pdu.pf << 16
+    can_id |= pdu.p << 26
+    can_id |= pdu.dp << 24
+    can_id |= pdu.edp << 25
+    return can_id
@@ -0,0 +1,140 @@
+"""Fast decoding of J1939 CAN identifiers
+
+`decode_id` splits a CAN identifier into its J1939 fields using only bit
+operations, returning a `PduId` tuple, and `decode_ids` does the same for a
+whole sequence of identifiers at once, returning one column per field. Use
+these instead of `~canlib.j1939.pdu_from_can_id` when decoding many frames,
+e.g. from log files:
+
+    >>> from canlib import j1939
+    >>> j1939.decode_id(0x18FEE300)
+    PduId(p=6, edp=0, dp=0, pf=254, ps=227, sa=0, pgn=65251, da=255)
+    >>> columns = j1939.decode_ids([0x18FEE300, 0x0CEA00F9])
+    >>> list(columns.pgn), list(columns.da)
+    ([65251, 59904], [255, 0])
+
+.. versionadded:: 1.32
+
+"""
+
+import functools
+from array import array
+from collections import namedtuple
+
+PduId = namedtuple('PduId', 'p edp dp pf ps sa pgn da')
+PduId.__doc__ = """The J1939 fields of a CAN identifier
+
+    Attributes:
+        p (`int`): Priority
+        edp (`int`): Extended data page
+        dp (`int`): Data page
+        pf (`int`): PDU format
+        ps (`int`): PDU specific, the destination address or group extension
+        sa (`int`): Source address
+        pgn (`int`): Parameter group number
+        da (`int`): Destination address, 255 (global) for PDU2 parameter
+            groups
+
+    .. versionadded:: 1.32
+
+"""
+
+PduColumns = namedtuple('PduColumns', 'p pgn sa da pf')
+PduColumns.__doc__ = """J1939 fields of a sequence of CAN identifiers, returned by `decode_ids`
+
+    Each attribute holds one value per identifier, as an `array.array`, or
+    as an array of the same type when a NumPy array was decoded.
+
+    Attributes:
+        p: Priorities
+        pgn: Parameter group numbers
+        sa: Source addresses
+        da: Destination addresses, 255 (global) for PDU2 parameter groups
+        pf: PDU formats
+
+    .. versionadded:: 1.32
+
+"""
+
+
+@functools.lru_cache(maxsize=4096)
+def decode_id(can_id):
+    """Split a CAN identifier into its J1939 fields
+
+    The results are cached, since J1939 traffic uses few distinct
+    identifiers.
+
+    Args:
+        can_id (`int`): 29-bit CAN identifier
+
+    Returns:
+        `PduId`
+
+    .. versionadded:: 1.32
+
+    """
+    pf = (can_id >> 16) & 0xFF
+    ps = (can_id >> 8) & 0xFF
+    page = (can_id >> 24) & 0x3
+    if pf < 240:
+        pgn = (page << 16) | (pf << 8)
+        da = ps
+    else:
+        pgn = (page << 16) | (pf << 8) | ps
+        da = 0xFF
+    return PduId((can_id >> 26) & 0x7, page >> 1, page & 1, pf, ps, can_id & 0xFF, pgn, da)
+
+
+def decode_ids(can_ids):
+    """Split a sequence of CAN identifiers into columns of J1939 fields
+
+    A NumPy array (or any array type supporting the bitwise operators
+    element-wise) is decoded using array operations, without a Python loop.
+    Other iterables of `int` are decoded using `decode_id`.
+
+    Args:
+        can_ids: The 29-bit CAN identifiers
+
+    Returns:
+        `PduColumns`
+
+    .. versionadded:: 1.32
+
+    """
+    if hasattr(can_ids, '__array_ufunc__'):
+        ids = can_ids
+        pf = (ids >> 16) & 0xFF
+        ps = (ids >> 8) & 0xFF
+        pdu2 = pf >= 240
+        pgn = ((ids >> 8) & 0x3FF00) | (ps * pdu2)
+        da = ps + (0xFF - ps) * pdu2
+        return PduColumns((ids >> 26) & 0x7, pgn, ids & 0xFF, da, pf)
+
+    decoded = list(map(decode_id, can_ids))
+    return PduColumns(
+        array('B', [d.p for d in decoded]),
+        array('L', [d.pgn for d in decoded]),
+        array('B', [d.sa for d in decoded]),
+        array('B', [d.da for d in decoded]),
+        array('B', [d.pf for d in decoded]),
+    )
+
+
+def encode_id(pgn, sa, da=0xFF, p=6):
+    """Build a CAN identifier from J1939 fields
+
+    Args:
+        pgn (`int`): Parameter group number
+        sa (`int`): Source address
+        da (`int`): Destination address, ignored for PDU2 parameter groups
+        p (`int`): Priority
+
+    Returns:
+        `int`: 29-bit CAN identifier
+
+    .. versionadded:: 1.32
+
+    """
+    if (pgn >> 8) & 0xFF < 240:
+        pgn = (pgn & 0x3FF00) | da
+    return (p << 26) | (pgn << 8) | sa
@@ -0,0 +1,618 @@
+"""J1939 transport protocol (SAE J1939-21)
+
+Parameter groups longer than 8 bytes, up to 1785 bytes, are sent as a
+connection management frame (TP.CM) followed by data transfer frames
+(TP.DT) of 7 bytes each:
+
+ - Broadcast Announce Message (BAM): the sender announces the message and
+   sends the TP.DT frames with 50-200 ms between them, without any
+   handshake.
+ - Connection Mode Data Transfer (CMDT): the sender sends Request To Send,
+   the receiver answers with Clear To Send for a number of packets at a time,
+   and ends the session with End of Message Acknowledgment.
+
+The TP.DT frames carry no PGN, so sessions are identified by their source
+and destination addresses. J1939 allows only one session in each direction
+between two addresses, and one BAM from each address, at a time.
+
+.. versionadded:: 1.32
+
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from ..canlib.enums import MessageFlag
+from ..canlib.exceptions import CanNoMsg, CanOverflowError
+from ..exceptions import CanlibException
+from .pdu import encode_id
+
+#: PGN of the transport protocol connection management frames (TP.CM)
+PGN_TP_CM = 0xEC00
+#: PGN of the transport protocol data transfer frames (TP.DT)
+PGN_TP_DT = 0xEB00
+
+#: Global destination address, used for BAM
+GLOBAL_ADDRESS = 0xFF
+#: Longest message the transport protocol can carry
+MAX_SIZE = 1785
+
+# Control bytes of TP.CM
+CM_RTS = 16
+CM_CTS = 17
+CM_EOM_ACK = 19
+CM_BAM = 32
+CM_ABORT = 255
+
+#: Abort reasons, sent in Connection Abort frames
+ABORT_BUSY = 1
+ABORT_RESOURCES = 2
+ABORT_TIMEOUT = 3
+ABORT_CTS_WHILE_SENDING = 4
+ABORT_RETRANSMIT_LIMIT = 5
+ABORT_UNEXPECTED_DT = 6
+ABORT_BAD_SEQUENCE = 7
+ABORT_DUPLICATE_SEQUENCE = 8
+ABORT_TOO_LARGE = 9
+
+#: Timeouts of J1939-21 in seconds: between TP.DT frames (T1), after CTS
+#: until the first TP.DT frame (T2), after the last TP.DT frame of a block
+#: until CTS or EOM (T3), and after a CTS hold until the next CTS (T4)
+T1 = 0.750
+T2 = 1.250
+T3 = 1.250
+T4 = 1.050
+
+_DT_SIZE = 7
+_CHECK_INTERVAL = 0.01
+
+TpMessage = namedtuple('TpMessage', 'pgn source destination data')
+TpMessage.__doc__ = """A message received using the transport protocol
+
+    Attributes:
+        pgn (`int`): Parameter group number of the message
+        source (`int`): Address of the sender
+        destination (`int`): Address of the receiver, `GLOBAL_ADDRESS` for
+            BAM
+        data (`bytearray`): The message
+
+    .. versionadded:: 1.32
+
+"""
+
+TpStats = namedtuple(
+    'TpStats',
+    'messages_sent messages_received bytes_sent bytes_received aborts_sent aborts_received '
+    'timeouts rx_errors',
+)
+TpStats.__doc__ = """Counters of a `TpEngine`
+
+    Attributes:
+        messages_sent (`int`): Messages sent
+        messages_received (`int`): Complete messages received
+        bytes_sent (`int`): Payload bytes sent
+        bytes_received (`int`): Payload bytes received
+        aborts_sent (`int`): Connection Abort frames sent
+        aborts_received (`int`): Connection Abort frames received for a
+            session of the engine
+        timeouts (`int`): Receive sessions dropped because of a timeout
+        rx_errors (`int`): Receive sessions dropped for other reasons, e.g.
+            a wrong sequence number or a new session replacing it
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class TpError(CanlibException):
+    """Raised when a message could not be sent using the transport protocol
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+class TpTimeout(TpError):
+    """Raised when the receiver did not answer in time
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+class TpAbort(TpError):
+    """Raised when the receiver aborted the session
+
+    Attributes:
+        reason (`int`): The abort reason, e.g. `ABORT_RESOURCES`
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, reason, msg):
+        self.reason = reason
+        super().__init__(msg)
+
+
+def _pgn_bytes(pgn):
+    return bytes((pgn & 0xFF, (pgn >> 8) & 0xFF, (pgn >> 16) & 0xFF))
+
+
+class _RxSession:
+    """A message being received, in a buffer allocated from the announcement"""
+
+    __slots__ = (
+        'pgn', 'source', 'destination', 'size', 'packets', 'buffer', 'view', 'next', 'block_end',
+        'max_per_cts', 'deadline', 'active',
+    )
+
+    def __init__(self, pgn, source, destination, size, packets, active):
+        self.pgn = pgn
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.packets = packets
+        self.buffer = bytearray(packets * _DT_SIZE)
+        self.view = memoryview(self.buffer)
+        self.next = 1
+        self.block_end = packets
+        self.max_per_cts = 0xFF
+        self.deadline = 0.0
+        self.active = active
+
+
+class TpEngine:
+    """J1939 transport protocol engine running on a CANlib channel
+
+    The engine reads all frames from the channel in a background thread,
+    started by `start` or by using the engine as a context manager. BAM
+    messages from all nodes are received, as are CMDT messages sent to one of
+    `addresses`, which the engine answers with CTS and EOM frames. With
+    `monitor` set, CMDT messages between other nodes are reassembled as
+    well, without taking part in the session.
+
+    Received messages are read using `recv`, or passed to `callback` which
+    is then called from the reader thread. Frames can also be passed to
+    `process`, e.g. from a log file, instead of starting the engine.
+
+    Each receive session uses a buffer allocated when the session is
+    announced, and frames are copied straight into it, so that hundreds of
+    concurrent sessions cost no more per frame than one. Timeouts are
+    checked every 10 ms.
+
+    Args:
+        channel (`~canlib.canlib.Channel`): The channel to use
+        addresses: The addresses of this node, the first one is the default
+            source address when sending
+        monitor (`bool`): Also receive CMDT messages to other nodes
+        bam_interval (`float`): Time in seconds between BAM data frames,
+            50 to 200 ms
+        cts_packets (`int`): Number of packets to ask for in each CTS frame
+        max_size (`int`): Longest message accepted, longer messages are
+            refused with `ABORT_TOO_LARGE`
+        callback: Function called with each `TpMessage`
+        read_timeout (`int`): Timeout in milliseconds of each read in the
+            reader thread, which limits how long `stop` takes
+
+    Attributes:
+        t1, t2, t3, t4 (`float`): The timeouts in seconds, initialized from
+            `T1`, `T2`, `T3` and `T4`
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, channel, addresses=(), monitor=False, bam_interval=0.05, cts_packets=255,
+        max_size=MAX_SIZE, callback=None, read_timeout=10,
+    ):
+        if not 0.05 <= bam_interval <= 0.2:
+            raise ValueError("bam_interval must be between 50 and 200 ms")
+        if not 1 <= cts_packets <= 255:
+            raise ValueError("cts_packets must be between 1 and 255")
+        self.channel = channel
+        addresses = list(addresses)
+        self.addresses = frozenset(addresses)
+        self.source = addresses[0] if addresses else None
+        self.monitor = monitor
+        self.bam_interval = bam_interval
+        self.cts_packets = cts_packets
+        self.max_size = max_size
+        self.callback = callback
+        self.read_timeout = read_timeout
+        self.t1, self.t2, self.t3, self.t4 = T1, T2, T3, T4
+        self._rx = {}
+        self._tx = {}
+        self._tx_lock = threading.Lock()
+        self._bam_locks = {}
+        self._write_lock = threading.Lock()
+        self._messages = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._error = None
+        self._last_check = 0.0
+        self._counts = dict.fromkeys(TpStats._fields, 0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def stats(self):
+        """`TpStats`: Counters since the engine was created"""
+        return TpStats(**self._counts)
+
+    @property
+    def sessions(self):
+        """`int`: Number of messages currently being received"""
+        return len(self._rx)
+
+    def start(self):
+        """Start the reader thread"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread
+
+        Any error raised in the reader thread is raised again here.
+
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def recv(self, timeout=0):
+        """Receive a message
+
+        Args:
+            timeout (`int`): Maximum time in milliseconds to wait, `None`
+                waits forever
+
+        Returns:
+            `TpMessage`
+
+        Raises:
+            `~canlib.canlib.CanNoMsg`: No message was received in time
+
+        """
+        try:
+            if timeout is None:
+                return self._messages.get()
+            return self._messages.get(timeout=timeout / 1000)
+        except queue.Empty:
+            raise CanNoMsg()
+
+    def send(self, pgn, data, destination=GLOBAL_ADDRESS, source=None, priority=7):
+        """Send a message
+
+        Messages of up to 8 bytes are sent as a single frame. Longer
+        messages are sent using BAM when `destination` is `GLOBAL_ADDRESS`,
+        and using CMDT otherwise. The call returns when the last frame has
+        been written, for BAM after about ``bam_interval`` seconds per 7
+        bytes, and for CMDT when the receiver has acknowledged the message.
+
+        Args:
+            pgn (`int`): Parameter group number
+            data (`bytes`): The message
+            destination (`int`): Destination address, only PDU1 parameter
+                groups can be sent to a specific address
+            source (`int`): Source address, default is the first of
+                `addresses`
+            priority (`int`): Priority of the frames
+
+        Raises:
+            `TpTimeout`: The receiver did not answer in time
+            `TpAbort`: The receiver aborted the session
+            `TpError`: A session to the destination is already in progress
+
+        """
+        data = memoryview(bytes(data))
+        size = len(data)
+        if source is None:
+            if self.source is None:
+                raise ValueError("No source address given, and the engine has no addresses")
+            source = self.source
+        pdu1 = ((pgn >> 8) & 0xFF) < 240
+        if not pdu1 and destination != GLOBAL_ADDRESS:
+            raise ValueError(f"PGN 0x{pgn:x} is a PDU2 parameter group, it can only be broadcast")
+        if size > MAX_SIZE:
+            raise ValueError(f"Messages longer than {MAX_SIZE} bytes can not be sent")
+        if size <= 8:
+            self._write(encode_id(pgn, source, destination, priority), data)
+        elif destination == GLOBAL_ADDRESS:
+            self._send_bam(pgn, data, source, priority)
+        else:
+            self._send_cmdt(pgn, data, source, destination, priority)
+        self._counts['messages_sent'] += 1
+        self._counts['bytes_sent'] += size
+
+    def process(self, frame, now=None):
+        """Handle a received frame
+
+        This is what the reader thread does with each frame read, and can be
+        used to feed the engine frames from elsewhere when it is not
+        started.
+
+        Args:
+            frame (`~canlib.Frame`): The frame
+            now (`float`): The time, as returned by `time.perf_counter`
+
+        """
+        if now is None:
+            now = time.perf_counter()
+        if frame.flags & MessageFlag.EXT and not frame.flags & MessageFlag.ERROR_FRAME:
+            self._on_frame(frame.id, frame.data, now)
+        if now - self._last_check > _CHECK_INTERVAL:
+            self._last_check = now
+            self._check_timeouts(now)
+
+    def _run(self):
+        read = self.channel.read
+        process = self.process
+        read_timeout = self.read_timeout
+        try:
+            while not self._stopping.is_set():
+                try:
+                    frame = read(timeout=read_timeout)
+                except CanNoMsg:
+                    now = time.perf_counter()
+                    if now - self._last_check > _CHECK_INTERVAL:
+                        self._last_check = now
+                        self._check_timeouts(now)
+                    continue
+                process(frame)
+        except Exception as e:
+            self._error = e
+
+    def _on_frame(self, can_id, data, now):
+        pf = (can_id >> 16) & 0x3FF
+        if pf == 0xEB:
+            if not data:
+                return
+            session = self._rx.get((can_id & 0xFF, (can_id >> 8) & 0xFF))
+            if session is not None:
+                self._on_data(session, data, now)
+        elif pf == 0xEC:
+            if len(data) >= 8:
+                self._on_control(can_id & 0xFF, (can_id >> 8) & 0xFF, data, now)
+
+    def _on_data(self, session, data, now):
+        seq = data[0]
+        if seq != session.next:
+            if session.active:
+                self._abort_rx(session, ABORT_BAD_SEQUENCE)
+            else:
+                self._drop(session)
+            return
+        start = (seq - 1) * _DT_SIZE
+        n = min(len(data) - 1, _DT_SIZE)
+        session.view[start:start + n] = data[1:1 + n]
+        session.next = seq + 1
+        if seq == session.packets:
+            del self._rx[(session.source, session.destination)]
+            if session.active:
+                size = session.size
+                self._write_cm(
+                    session.destination, session.source,
+                    bytes((CM_EOM_ACK, size & 0xFF, size >> 8, session.packets, 0xFF)),
+                    session.pgn,
+                )
+            self._deliver(session)
+        elif session.active and seq == session.block_end:
+            self._send_cts(session)
+            session.deadline = now + self.t2
+        else:
+            session.deadline = now + self.t1
+
+    def _on_control(self, source, destination, data, now):
+        control = data[0]
+        pgn = data[5] | (data[6] << 8) | (data[7] << 16)
+        if control == CM_BAM or control == CM_RTS:
+            self._on_announce(control, source, destination, data, pgn, now)
+        elif control == CM_CTS or control == CM_EOM_ACK:
+            tx = self._tx.get((destination, source))
+            if tx is not None and tx[0] == pgn:
+                tx[1].put((control, data[1], data[2]))
+        elif control == CM_ABORT:
+            tx = self._tx.get((destination, source))
+            if tx is not None and tx[0] == pgn:
+                self._counts['aborts_received'] += 1
+                tx[1].put((control, data[1], 0))
+            session = self._rx.get((source, destination))
+            if session is None:
+                # Aborted by the receiver of the session
+                session = self._rx.get((destination, source))
+            if session is not None and session.pgn == pgn:
+                if session.active:
+                    self._counts['aborts_received'] += 1
+                self._drop(session)
+
+    def _on_announce(self, control, source, destination, data, pgn, now):
+        if control == CM_BAM:
+            if destination != GLOBAL_ADDRESS:
+                return
+            active = False
+        else:
+            active = destination in self.addresses
+            if not active and not self.monitor:
+                return
+        key = (source, destination)
+        old = self._rx.get(key)
+        if old is not None:
+            # The sender started over
+            self._drop(old)
+        size = data[1] | (data[2] << 8)
+        packets = data[3]
+        if size <= 8 or packets != -(-size // _DT_SIZE):
+            self._counts['rx_errors'] += 1
+            return
+        if size > self.max_size:
+            if active:
+                self._send_abort(destination, source, pgn, ABORT_TOO_LARGE)
+            self._counts['rx_errors'] += 1
+            return
+        session = _RxSession(pgn, source, destination, size, packets, active)
+        self._rx[key] = session
+        if active:
+            session.max_per_cts = data[4] or 0xFF
+            self._send_cts(session)
+            session.deadline = now + self.t2
+        else:
+            session.deadline = now + self.t1
+
+    def _send_cts(self, session):
+        count = min(self.cts_packets, session.max_per_cts, session.packets - session.next + 1)
+        session.block_end = session.next + count - 1
+        self._write_cm(
+            session.destination, session.source,
+            bytes((CM_CTS, count, session.next, 0xFF, 0xFF)), session.pgn,
+        )
+
+    def _check_timeouts(self, now):
+        for session in [s for s in self._rx.values() if now > s.deadline]:
+            self._counts['timeouts'] += 1
+            if session.active:
+                self._send_abort(session.destination, session.source, session.pgn, ABORT_TIMEOUT)
+            self._remove(session)
+
+    def _deliver(self, session):
+        session.view.release()
+        buffer = session.buffer
+        del buffer[session.size:]
+        self._counts['messages_received'] += 1
+        self._counts['bytes_received'] += session.size
+        message = TpMessage(session.pgn, session.source, session.destination, buffer)
+        if self.callback is not None:
+            self.callback(message)
+        else:
+            self._messages.put(message)
+
+    def _remove(self, session):
+        key = (session.source, session.destination)
+        if self._rx.get(key) is session:
+            del self._rx[key]
+
+    def _drop(self, session):
+        self._counts['rx_errors'] += 1
+        self._remove(session)
+
+    def _abort_rx(self, session, reason):
+        self._send_abort(session.destination, session.source, session.pgn, reason)
+        self._drop(session)
+
+    def _send_abort(self, source, destination, pgn, reason):
+        self._counts['aborts_sent'] += 1
+        self._write_cm(source, destination, bytes((CM_ABORT, reason, 0xFF, 0xFF, 0xFF)), pgn)
+
+    def _write_cm(self, source, destination, control, pgn, priority=7):
+        can_id = (priority << 26) | (0xEC << 16) | (destination << 8) | source
+        self._write(can_id, control + _pgn_bytes(pgn))
+
+    def _data_frames(self, data, first, count, source, destination, priority):
+        can_id = (priority << 26) | (0xEB << 16) | (destination << 8) | source
+        frames = []
+        for seq in range(first, first + count):
+            chunk = data[(seq - 1) * _DT_SIZE:seq * _DT_SIZE]
+            frame = bytes((seq,)) + chunk
+            if len(chunk) < _DT_SIZE:
+                frame += b'\xff' * (_DT_SIZE - len(chunk))
+            frames.append(frame)
+        return can_id, frames
+
+    def _send_bam(self, pgn, data, source, priority):
+        size = len(data)
+        packets = -(-size // _DT_SIZE)
+        with self._tx_lock:
+            lock = self._bam_locks.setdefault(source, threading.Lock())
+        with lock:
+            can_id, frames = self._data_frames(data, 1, packets, source, GLOBAL_ADDRESS, priority)
+            self._write_cm(
+                source, GLOBAL_ADDRESS, bytes((CM_BAM, size & 0xFF, size >> 8, packets, 0xFF)),
+                pgn, priority,
+            )
+            next_time = time.perf_counter()
+            for frame in frames:
+                next_time += self.bam_interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write(can_id, frame)
+
+    def _send_cmdt(self, pgn, data, source, destination, priority):
+        size = len(data)
+        packets = -(-size // _DT_SIZE)
+        key = (source, destination)
+        events = queue.Queue()
+        with self._tx_lock:
+            if key in self._tx:
+                raise TpError(
+                    f"A session from 0x{source:02x} to 0x{destination:02x} is in progress"
+                )
+            self._tx[key] = (pgn, events)
+        try:
+            self._write_cm(
+                source, destination,
+                bytes((CM_RTS, size & 0xFF, size >> 8, packets, 0xFF)), pgn, priority,
+            )
+            timeout = self.t3
+            while True:
+                try:
+                    control, arg1, arg2 = events.get(timeout=timeout)
+                except queue.Empty:
+                    self._send_abort(source, destination, pgn, ABORT_TIMEOUT)
+                    raise TpTimeout(f"No response from 0x{destination:02x} to PGN 0x{pgn:x}")
+                if control == CM_CTS:
+                    count, first = arg1, arg2
+                    if count == 0:
+                        # Hold the connection open
+                        timeout = self.t4
+                        continue
+                    if first < 1 or first + count - 1 > packets:
+                        self._send_abort(source, destination, pgn, ABORT_BAD_SEQUENCE)
+                        raise TpError(
+                            f"Invalid CTS from 0x{destination:02x}: {count} packets from {first}"
+                        )
+                    can_id, frames = self._data_frames(
+                        data, first, count, source, destination, priority
+                    )
+                    for frame in frames:
+                        self._write(can_id, frame)
+                    timeout = self.t3
+                elif control == CM_EOM_ACK:
+                    return
+                else:
+                    raise TpAbort(
+                        arg1, f"0x{destination:02x} aborted PGN 0x{pgn:x}, reason {arg1}"
+                    )
+        finally:
+            with self._tx_lock:
+                del self._tx[key]
+
+    def _write(self, can_id, payload):
+        with self._write_lock:
+            while True:
+                try:
+                    self.channel.write_raw(can_id, payload, MessageFlag.EXT)
+                    return
+                except CanOverflowError:
+                    # The transmit queue is full, wait for it to drain
+                    self.channel.writeSync(int(self.t1 * 1000))
@@ -394,12 +394,30 @@ class Dbc:
             except KvdNoMessage:
                 return
 
-    def interpret(self, frame, j1939=False):
-        """Interprets a given `canlib.Frame` object, returning a `BoundMessage`."""
+    def interpret(self, frame, j1939=False, fast_packet=None):
+        """Interprets a given `canlib.Frame` object, returning a `BoundMessage`.
+
+        Args:
+            frame (`canlib.Frame`): The frame to interpret
+            j1939 (bool): Look up the message using the PGN of the CAN id
+            fast_packet (`canlib.j1939.FastPacketAssembler`, optional): Used
+                with `j1939` to reassemble NMEA 2000 fast-packet messages.
+                Frames of fast-packet PGNs are passed to the assembler, and
+                `None` is returned until the last frame of a message has
+                been received, when the whole message is interpreted.
+
+        .. versionchanged:: 1.32
+           Added `fast_packet`.
+
+        """
         can_id = frame.id
         flags = 0
 
         if j1939:
+            if fast_packet is not None:
+                frame = fast_packet.process(frame)
+                if frame is None:
+                    return None
             # When calling get_message_by_pgn, the EXT flag must be attached to the CAN ID
             # Check frame.flags first, since it may be '0'
             # Note that MessageFlag.EXT has different values in canlib vs kvadblib
@@ -6,6 +6,8 @@ https://www.kvaser.com/developer/canlib-sdk/
 
 """
 
+from .batch import (MAX_CONVERTERS, ConversionJob, ConversionResult,
+                    convert_files)
 from .constants import *
 from .converter import Converter
 from .deprecated import KvlcLib as Kvlclib  # for backwards-compatibility
@@ -13,6 +15,7 @@ from .deprecated import *
 from .enums import ChannelMask, Error, FileFormat
 from .exceptions import (KvlcEndOfFile, KvlcError, KvlcFileExists,
                          KvlcNotImplemented)
+from .pipeline import ConversionPipeline, WriterSummary
 from .properties import Property
 from .readerformat import ReaderFormat, reader_formats
 from .wrapper import dllversion, getVersion
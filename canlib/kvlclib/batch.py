@@ -0,0 +1,128 @@
+import concurrent.futures
+import os
+import time
+from collections import namedtuple
+
+from .converter import Converter
+
+#: Maximum number of converters that kvlclib can have open at the same time.
+MAX_CONVERTERS = 128
+
+ConversionJob = namedtuple('ConversionJob', 'input input_format output writer_format properties')
+ConversionJob.__doc__ = """A file to convert using `convert_files`
+
+    Attributes:
+        input (`str`): Name of input file
+        input_format (`.FileFormat` | `.ReaderFormat`): Format of input file
+        output (`str`): Name of output file
+        writer_format (`.FileFormat` | `.WriterFormat`): Format of output file
+        properties (`dict`): Writer properties to set, as a mapping from
+            `.Property` to value, or `None`
+
+    .. versionadded:: 1.32
+
+"""
+
+ConversionResult = namedtuple(
+    'ConversionResult',
+    'job events seconds events_per_second output dlc_mismatch truncated overrun error',
+)
+ConversionResult.__doc__ = """The outcome of a `ConversionJob`
+
+    Attributes:
+        job (`ConversionJob`): The job that was run
+        events (`int`): Number of converted events
+        seconds (`float`): Time spent converting
+        events_per_second (`float`): Conversion speed
+        output (`str`): Filename of the (last) output file
+        dlc_mismatch (`dict`): DLC mismatches, as returned by
+            `.Converter.getDlcMismatch`
+        truncated (`bool`): True if data was truncated
+        overrun (`bool`): True if the data contained overrun
+        error (`str`): Description of the error that stopped the
+            conversion, or `None` if the conversion succeeded
+
+    .. versionadded:: 1.32
+
+"""
+
+
+def convert_files(jobs, processes=None):
+    """Convert several files in parallel
+
+    Each job is converted in its own `Converter` using `.Converter.convertAll`
+    in a pool of worker processes. A job that fails does not stop the other
+    jobs, instead its `ConversionResult.error` is set::
+
+        jobs = [
+            (kme, kvlclib.FileFormat.KME50, kme.with_suffix('.asc'),
+             kvlclib.FileFormat.VECTOR_ASC, {kvlclib.Property.OVERWRITE: 1})
+            for kme in Path('logs').glob('*.kme50')
+        ]
+        for result in kvlclib.convert_files(jobs):
+            print(f"{result.output}: {result.events_per_second:.0f} events/s")
+
+    Args:
+        jobs: Iterable of `ConversionJob` objects or tuples ``(input,
+            input_format, output, writer_format, properties)``.
+        processes (`int`): Number of worker processes, default is the number
+            of cores. Never more than `MAX_CONVERTERS`.
+
+    Returns:
+        `list` of `ConversionResult`, in the same order as `jobs`.
+
+    .. versionadded:: 1.32
+
+    """
+    jobs = [ConversionJob(*job) for job in jobs]
+    if not jobs:
+        return []
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, MAX_CONVERTERS, len(jobs)))
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_convert_job, jobs))
+
+
+def _convert_job(job):
+    events = 0
+    seconds = 0.0
+    output = None
+    dlc_mismatch = {}
+    truncated = False
+    overrun = False
+    error = None
+    try:
+        converter = Converter(os.fspath(job.output), job.writer_format)
+        try:
+            for wr_property, value in (job.properties or {}).items():
+                converter.setProperty(wr_property, value)
+            converter.setInputFile(os.fspath(job.input), job.input_format)
+
+            start = time.perf_counter()
+            events = converter.convertAll()
+            seconds = time.perf_counter() - start
+
+            output = converter.getOutputFilename()
+            if converter.isDlcMismatch():
+                dlc_mismatch = converter.getDlcMismatch()
+            truncated = bool(converter.isDataTruncated())
+            overrun = bool(converter.isOverrunActive())
+        finally:
+            # Deleting the converter writes its files to disk
+            del converter
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    return ConversionResult(
+        job=job,
+        events=events,
+        seconds=seconds,
+        events_per_second=events / seconds if seconds else 0.0,
+        output=output,
+        dlc_mismatch=dlc_mismatch,
+        truncated=truncated,
+        overrun=overrun,
+        error=error,
+    )
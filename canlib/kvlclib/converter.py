@@ -3,6 +3,7 @@ import os
 
 from .. import deprecation
 from ..futureapi import NotYetSupportedError
+from .exceptions import KvlcEndOfFile
 from .properties import _PROPERTY_TYPE
 from .readerformat import ReaderFormat
 from .writerformat import WriterFormat
@@ -85,6 +86,32 @@ class Converter:
         """
         dll.kvlcConvertEvent(self.handle)
 
+    def convertAll(self):
+        """Convert all remaining events.
+
+        Convert events from the input file until the end of the file is
+        reached. This is equivalent to calling `convertEvent` until
+        `.KvlcEndOfFile` is raised.
+
+        Note that when the output is split into several files, the new files
+        can not be detected using `isOutputFilenameNew` during the conversion.
+
+        Returns:
+            `int`: The number of events converted.
+
+        .. versionadded:: 1.32
+
+        """
+        convert = dll.kvlcConvertEvent
+        handle = self.handle
+        count = 0
+        while True:
+            try:
+                convert(handle)
+            except KvlcEndOfFile:
+                return count
+            count += 1
+
     def feedLogEvent(self, event):
         """Feed one event to the converter.
 
@@ -96,6 +123,28 @@ class Converter:
         memoLogEventEx = event._asMrtEvent()
         dll.kvlcFeedLogEvent(self.handle, ct.byref(memoLogEventEx))
 
+    def feedLogEvents(self, events):
+        """Feed several events to the converter.
+
+        Same as calling `feedLogEvent` for each event, but with less overhead
+        per event. Low level `~canlib.kvmlib.memoLogEventEx` structures, as
+        read from a `~canlib.kvmlib.Kme`, are fed as they are.
+
+        Returns:
+            `int`: The number of events fed.
+
+        .. versionadded:: 1.32
+
+        """
+        feed = dll.kvlcFeedLogEvent
+        handle = self.handle
+        count = 0
+        for event in events:
+            as_mrt = getattr(event, '_asMrtEvent', None)
+            feed(handle, ct.byref(event if as_mrt is None else as_mrt()))
+            count += 1
+        return count
+
     def feedNextFile(self):
         """Prepare for new file
 
@@ -107,7 +156,11 @@ class Converter:
 
         .. versionadded:: 1.18
 
+        .. versionchanged:: 1.32
+            Previously this method did not call ``kvlcFeedNextFile``.
+
         """
+        dll.kvlcFeedNextFile(self.handle)
 
     def flush(self):
         """Recreate the converter so changes are saved to disk
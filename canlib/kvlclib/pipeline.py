@@ -0,0 +1,225 @@
+import itertools
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from .enums import FileFormat
+
+WriterSummary = namedtuple('WriterSummary', 'converter events batches seconds events_per_second')
+WriterSummary.__doc__ = """Throughput of one converter in a `ConversionPipeline`
+
+    Attributes:
+        converter (`Converter`): The converter
+        events (`int`): Number of events fed to the converter
+        batches (`int`): Number of batches the events were fed in
+        seconds (`float`): Time spent feeding events to the converter
+        events_per_second (`float`): Events fed per second of feeding time
+
+    .. versionadded:: 1.32
+
+"""
+
+# Markers sent to writer threads in between batches of events
+_NEXT_FILE = object()
+_STOP = object()
+
+
+class _Writer:
+    def __init__(self, converter):
+        self.converter = converter
+        self.events = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.error = None
+        self.queue = None
+        self.thread = None
+
+    def feed(self, batch):
+        start = time.perf_counter()
+        self.events += self.converter.feedLogEvents(batch)
+        self.seconds += time.perf_counter() - start
+        self.batches += 1
+
+    def start(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            if self.error is not None:
+                # Keep draining the queue so the reader is never blocked
+                continue
+            try:
+                if item is _NEXT_FILE:
+                    self.converter.feedNextFile()
+                else:
+                    self.feed(item)
+            except Exception as e:
+                self.error = e
+
+    def summary(self):
+        return WriterSummary(
+            converter=self.converter,
+            events=self.events,
+            batches=self.batches,
+            seconds=self.seconds,
+            events_per_second=self.events / self.seconds if self.seconds else 0.0,
+        )
+
+
+class ConversionPipeline:
+    """Convert events read once into several output formats
+
+    Feeds each batch of events to all given converters, so that e.g. the logs
+    of a Memorator can be converted to ASC, signal based CSV and MDF4 while
+    reading the device only once::
+
+        converters = [
+            kvlclib.Converter('out.asc', kvlclib.FileFormat.VECTOR_ASC),
+            kvlclib.Converter('out.mf4', kvlclib.FileFormat.MDF_4X),
+        ]
+        with kvlclib.ConversionPipeline(converters, threaded=True) as pipeline:
+            pipeline.run(*memorator.log)
+        for summary in pipeline.summary():
+            print(summary.converter.filename, summary.events_per_second)
+
+    The input format of all converters is set to `input_format` using
+    `Converter.setInputFile`. As the converters only write their files to disk
+    when deleted, call `Converter.flush` or delete the converters when done.
+
+    Args:
+        converters (`list` of `Converter`): The converters to feed
+        input_format (`.FileFormat`): The format of the fed events
+        threaded (`bool`): Feed each converter from a thread of its own. The
+            threads run in parallel since the feeding happens in the dll.
+        queue_size (`int`): Maximum number of batches waiting for each
+            converter thread. Reading blocks while a queue is full.
+        batch_size (`int`): Number of events read before they are fed to the
+            converters, used by `run`.
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(
+        self, converters, input_format=FileFormat.MEMO_LOG, threaded=False, queue_size=8,
+        batch_size=1024,
+    ):
+        self.batch_size = batch_size
+        self._writers = [_Writer(converter) for converter in converters]
+        for converter in converters:
+            converter.setInputFile(None, input_format)
+        self._threaded = threaded
+        if threaded:
+            for writer in self._writers:
+                writer.start(queue_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop()
+        if exc_type is None:
+            self._raise_error()
+
+    def feed(self, events):
+        """Feed a batch of events to all converters
+
+        Args:
+            events: The events, e.g. `~canlib.kvmlib.LogEvent` objects or low
+                level `~canlib.kvmlib.memoLogEventEx` structures.
+
+        """
+        batch = list(events)
+        if not batch:
+            return
+        self._send(batch)
+
+    def next_file(self):
+        """Tell all converters that the following events come from another file
+
+        See `Converter.feedNextFile`.
+
+        """
+        self._send(_NEXT_FILE)
+
+    def run(self, *sources):
+        """Read all events from the sources and feed them to the converters
+
+        Each source is a `~canlib.kvmlib.LogFile`, `~canlib.kvmlib.Kme`, or
+        an iterable of events, and `next_file` is called between sources.
+        Events are read as lazy views when the source supports it, so the
+        events do not need to be decoded in Python.
+
+        Returns:
+            `list` of `WriterSummary`, see `summary`. With `threaded` some
+            events may still be waiting to be fed, call `close` first to
+            get the final summary.
+
+        """
+        for index, source in enumerate(sources):
+            if index:
+                self.next_file()
+            events = _source_events(source)
+            while True:
+                batch = list(itertools.islice(events, self.batch_size))
+                if not batch:
+                    break
+                self._send(batch)
+        return self.summary()
+
+    def summary(self):
+        """Return the throughput of each converter
+
+        Returns:
+            `list` of `WriterSummary`, in the same order as the converters.
+
+        """
+        return [writer.summary() for writer in self._writers]
+
+    def close(self):
+        """Wait until all events have been fed and stop the converter threads
+
+        Any error raised in a converter thread is raised again here.
+
+        """
+        self._stop()
+        self._raise_error()
+
+    def _stop(self):
+        if self._threaded:
+            for writer in self._writers:
+                writer.queue.put(_STOP)
+            for writer in self._writers:
+                writer.thread.join()
+            self._threaded = False
+
+    def _send(self, item):
+        if self._threaded:
+            self._raise_error()
+            for writer in self._writers:
+                writer.queue.put(item)
+        elif item is _NEXT_FILE:
+            for writer in self._writers:
+                writer.converter.feedNextFile()
+        else:
+            for writer in self._writers:
+                writer.feed(item)
+
+    def _raise_error(self):
+        for writer in self._writers:
+            if writer.error is not None:
+                raise writer.error
+
+
+def _source_events(source):
+    try:
+        return source.events(lazy=True)
+    except (AttributeError, TypeError):
+        # Plain iterables, and KME files that are read as low level structures
+        return iter(source)
@@ -20,7 +20,7 @@ from .events import (LogEvent, MessageEvent, RTCEvent, TriggerEvent,
 from .exceptions import (
     KvmDiskError, KvmDiskNotFormated, KvmError, KvmNoDisk, KvmNoLogMsg,
     LockedLogError)
-from .kme import Kme, createKme, kme_file_type, openKme
+from .kme import Kme, createKme, kme_file_type, merge_kme, openKme
 from .kmf import Kmf, KmfSystem, openKmf
 from .log import MountedLog, UnmountedLog
 from .logfile import LogFile
@@ -12,8 +12,23 @@ def _eq_or_none(a, b):
     return a == b or a is None or b is None
 
 
+def _calendar_time(dt):
+    """Convert a `datetime.datetime` to whole seconds of unix time"""
+    # datetime.timestamp does not exist in Python 2.7
+    try:
+        return int(dt.timestamp())  # only whole seconds
+    except AttributeError:
+        return int(time.mktime(dt.timetuple()) + dt.microsecond / 1000000.0)
+
+
 class LogEvent:
-    """The base class for events recorded by a Memorator."""
+    """The base class for events recorded by a Memorator.
+
+    .. versionchanged:: 1.32
+        Events use ``__slots__`` and no longer have a ``__dict__``.
+
+    """
+    __slots__ = ('timeStamp', 'ignored')
     _comp_fields = None  # if not None, these attributes will be used to
     # compare objects
 
@@ -52,6 +67,7 @@ class LogEvent:
 class MessageEvent(LogEvent):
     """A CAN message recorded by a Memorator"""
 
+    __slots__ = ('id', 'channel', 'dlc', 'flags', 'data')
     _comp_fields = ('id', 'channel', 'dlc', 'flags', 'data', 'timeStamp')
 
     def __init__(self, id=None, channel=None, dlc=None, flags=None, data=None, timestamp=None):
@@ -136,6 +152,7 @@ class MessageEvent(LogEvent):
 class RTCEvent(LogEvent):
     """An real-time clock message recorded by a Memorator"""
 
+    __slots__ = ('calendartime',)
     _comp_fields = ('calendartime', 'timeStamp')
 
     def __init__(self, calendartime=None, timestamp=None):
@@ -156,18 +173,9 @@ class RTCEvent(LogEvent):
         .. versionadded:: 1.7
 
         """
-        # datetime.timestamp does not exist in Python 2.7
-        try:
-            calendar_time = int(self.calendartime.timestamp())  # only whole seconds
-        except AttributeError:
-            calendar_time = int(
-                time.mktime(self.calendartime.timetuple())
-                + self.calendartime.microsecond / 1000000.0
-            )
-
         rtc = memoLogRtcClockEx(
             evType=memoLogEventEx.MEMOLOG_TYPE_CLOCK,
-            calendarTime=calendar_time,
+            calendarTime=_calendar_time(self.calendartime),
             timeStamp=self.timeStamp,
         )
         return memoLogMrtEx(rtc=rtc)
@@ -176,6 +184,7 @@ class RTCEvent(LogEvent):
 class TriggerEvent(LogEvent):
     """A trigger message recorded by a Memorator"""
 
+    __slots__ = ('type', 'pretrigger', 'posttrigger', 'trigno')
     _comp_fields = ('type', 'timeStamp', 'pretrigger', 'posttrigger', 'trigno')
 
     def __init__(self, type=None, timestamp=None, pretrigger=None, posttrigger=None, trigno=None):
@@ -220,7 +229,7 @@ class TriggerEvent(LogEvent):
 class VersionEvent(LogEvent):
     """A version message recorded by a Memorator"""
 
-    _comp_fields = (
+    __slots__ = (
         'lioMajor',
         'lioMinor',
         'fwMajor',
@@ -230,6 +239,7 @@ class VersionEvent(LogEvent):
         'eanHi',
         'eanLo',
     )
+    _comp_fields = __slots__
 
     def __init__(self, lioMajor, lioMinor, fwMajor, fwMinor, fwBuild, serialNumber, eanHi, eanLo):
         super().__init__(None)
@@ -279,6 +289,118 @@ class VersionEvent(LogEvent):
         return memoLogMrtEx(ver=ver)
 
 
+####################################################################
+# Lazy views, decoding fields from a memoLogEventEx only when accessed
+def _view_field(name, doc=None):
+    def fget(self):
+        return getattr(self._part, name)
+
+    def fset(self, value):
+        setattr(self._part, name, value)
+
+    return property(fget, fset, doc=doc)
+
+
+class _EventView:
+    """Mixin for events that wrap a `memoLogEventEx` instead of copying it
+
+    The wrapped structure is owned by the view, so it must not be reused by
+    the reader. Assigning to a field writes straight into the structure.
+
+    """
+    __slots__ = ()
+
+    def _init_view(self, logevent, part):
+        self._mle = logevent
+        self._part = part
+
+    def _asMrtEvent(self):
+        return self._mle.event
+
+
+class _MessageEventView(_EventView, MessageEvent):
+    __slots__ = ('_mle', '_part')
+
+    def __init__(self, logevent):
+        self._init_view(logevent, logevent.event.msg)
+        self.ignored = False
+
+    timeStamp = _view_field('timeStamp')
+    id = _view_field('id')
+    channel = _view_field('channel')
+    dlc = _view_field('dlc')
+    flags = _view_field('flags')
+
+    @property
+    def data(self):
+        msg = self._part
+        return bytes(msg.data)[: msg.dlc]
+
+    @data.setter
+    def data(self, value):
+        value = bytes(value)
+        ct.memmove(self._part.data, value, min(len(value), 64))
+
+
+class _RTCEventView(_EventView, RTCEvent):
+    __slots__ = ('_mle', '_part')
+
+    def __init__(self, logevent):
+        self._init_view(logevent, logevent.event.rtc)
+        self.ignored = False
+
+    timeStamp = _view_field('timeStamp')
+
+    @property
+    def calendartime(self):
+        return datetime.datetime.fromtimestamp(self._part.calendarTime)
+
+    @calendartime.setter
+    def calendartime(self, value):
+        self._part.calendarTime = _calendar_time(value)
+
+
+class _TriggerEventView(_EventView, TriggerEvent):
+    __slots__ = ('_mle', '_part')
+
+    def __init__(self, logevent):
+        self._init_view(logevent, logevent.event.trig)
+        self.ignored = False
+
+    type = _view_field('type')
+    pretrigger = _view_field('preTrigger')
+    posttrigger = _view_field('postTrigger')
+    trigno = _view_field('trigNo')
+
+    @property
+    def timeStamp(self):
+        trig = self._part
+        return trig.timeStampLo + (trig.timeStampHi << 32)
+
+    @timeStamp.setter
+    def timeStamp(self, value):
+        self._part.timeStampHi = value >> 32
+        self._part.timeStampLo = value & 0xFFFFFFFF
+
+
+class _VersionEventView(_EventView, VersionEvent):
+    __slots__ = ('_mle', '_part')
+
+    def __init__(self, logevent):
+        self._init_view(logevent, logevent.event.ver)
+        self.timeStamp = None
+        self.ignored = True
+
+    lioMajor = _view_field('lioMajor')
+    lioMinor = _view_field('lioMinor')
+    fwMajor = _view_field('fwMajor')
+    fwMinor = _view_field('fwMinor')
+    fwBuild = _view_field('fwBuild')
+    serialNumber = _view_field('serialNumber')
+    eanHi = _view_field('eanHi')
+    eanLo = _view_field('eanLo')
+
+
 ####################################################################
 # Low level ctypes classes for interacting with dll
 class memoLogMsgEx(ct.Structure):
@@ -357,45 +479,68 @@ class memoLogEventEx(ct.Structure):
 
     _fields_ = [('event', memoLogMrtEx)]
 
-    def createMemoEvent(self):
-        """Convert event to `LogEvent`."""
+    def createMemoEvent(self, lazy=False):
+        """Convert event to `LogEvent`.
+
+        Arguments:
+            lazy (`bool`): If `True`, the returned event is a view that keeps
+                a reference to this structure and decodes its fields only when
+                they are accessed. This structure must then not be reused for
+                reading other events. Default is `False`, which copies all
+                fields into a new event.
+
+        .. versionchanged:: 1.32
+            Added argument `lazy`.
+
+        """
         type = self.event.raw.evType
 
-        if type == self.MEMOLOG_TYPE_CLOCK:
-            cTime = self.event.rtc.calendarTime
-            ct = datetime.datetime.fromtimestamp(cTime)
-            memoEvent = RTCEvent(timestamp=self.event.rtc.timeStamp, calendartime=ct)
+        if lazy:
+            try:
+                view = _views[type]
+            except KeyError:
+                raise CanlibException(f"createMemoEvent: Unknown event type :{type}")
+            return view(self)
 
-        elif type == self.MEMOLOG_TYPE_MSG:
+        if type == self.MEMOLOG_TYPE_MSG:
+            msg = self.event.msg
             memoEvent = MessageEvent(
-                timestamp=self.event.msg.timeStamp,
-                id=self.event.msg.id,
-                channel=self.event.msg.channel,
-                dlc=self.event.msg.dlc,
-                flags=self.event.msg.flags,
-                data=self.event.msg.data,
+                timestamp=msg.timeStamp,
+                id=msg.id,
+                channel=msg.channel,
+                dlc=msg.dlc,
+                flags=msg.flags,
+                data=bytes(msg.data)[: msg.dlc],
+            )
+
+        elif type == self.MEMOLOG_TYPE_CLOCK:
+            rtc = self.event.rtc
+            memoEvent = RTCEvent(
+                timestamp=rtc.timeStamp,
+                calendartime=datetime.datetime.fromtimestamp(rtc.calendarTime),
             )
 
         elif type == self.MEMOLOG_TYPE_TRIGGER:
-            tstamp = self.event.trig.timeStampLo + (self.event.trig.timeStampHi * 4294967296)
+            trig = self.event.trig
             memoEvent = TriggerEvent(
-                timestamp=tstamp,
-                type=self.event.trig.type,
-                pretrigger=self.event.trig.preTrigger,
-                posttrigger=self.event.trig.postTrigger,
-                trigno=self.event.trig.trigNo,
+                timestamp=trig.timeStampLo + (trig.timeStampHi << 32),
+                type=trig.type,
+                pretrigger=trig.preTrigger,
+                posttrigger=trig.postTrigger,
+                trigno=trig.trigNo,
             )
 
         elif type == self.MEMOLOG_TYPE_VERSION:
+            ver = self.event.ver
             memoEvent = VersionEvent(
-                lioMajor=self.event.ver.lioMajor,
-                lioMinor=self.event.ver.lioMinor,
-                fwMajor=self.event.ver.fwMajor,
-                fwMinor=self.event.ver.fwMinor,
-                fwBuild=self.event.ver.fwBuild,
-                serialNumber=self.event.ver.serialNumber,
-                eanHi=self.event.ver.eanHi,
-                eanLo=self.event.ver.eanLo,
+                lioMajor=ver.lioMajor,
+                lioMinor=ver.lioMinor,
+                fwMajor=ver.fwMajor,
+                fwMinor=ver.fwMinor,
+                fwBuild=ver.fwBuild,
+                serialNumber=ver.serialNumber,
+                eanHi=ver.eanHi,
+                eanLo=ver.eanLo,
             )
         else:
             raise CanlibException(f"createMemoEvent: Unknown event type :{type}")
@@ -463,3 +608,84 @@ class memoLogEventEx(ct.Structure):
             text += "FW v%d.%d.%d, " % (fwMajor, fwMinor, fwBuild)
             text += "LIO v%d.%d" % (lioMajor, lioMinor)
         return text
+
+
+_views = {
+    memoLogEventEx.MEMOLOG_TYPE_CLOCK: _RTCEventView,
+    memoLogEventEx.MEMOLOG_TYPE_MSG: _MessageEventView,
+    memoLogEventEx.MEMOLOG_TYPE_TRIGGER: _TriggerEventView,
+    memoLogEventEx.MEMOLOG_TYPE_VERSION: _VersionEventView,
+}
+
+
+_event_types = {
+    MessageEvent: memoLogEventEx.MEMOLOG_TYPE_MSG,
+    RTCEvent: memoLogEventEx.MEMOLOG_TYPE_CLOCK,
+    TriggerEvent: memoLogEventEx.MEMOLOG_TYPE_TRIGGER,
+    VersionEvent: memoLogEventEx.MEMOLOG_TYPE_VERSION,
+}
+
+
+def _event_filter(logevent, ids=None, channel_mask=None, types=None, start=None, end=None):
+    """Compile a predicate for the low level event held by `logevent`
+
+    The returned function takes no arguments and tests the event currently
+    stored in `logevent`, which is meant to be a structure that is reused for
+    every read. This lets readers discard events without creating any
+    `LogEvent` objects. If no filter is given, `None` is returned.
+
+    See `canlib.kvmlib.Kme50.events` for a description of the arguments.
+
+    """
+    if ids is None and channel_mask is None and types is None and start is None and end is None:
+        return None
+
+    raw = logevent.event.raw
+    msg = logevent.event.msg
+    rtc = logevent.event.rtc
+    trig = logevent.event.trig
+    msg_type = memoLogEventEx.MEMOLOG_TYPE_MSG
+    clock_type = memoLogEventEx.MEMOLOG_TYPE_CLOCK
+    trigger_type = memoLogEventEx.MEMOLOG_TYPE_TRIGGER
+
+    id_set = None
+    id_ranges = ()
+    if ids is not None:
+        # Listed, since an iterator would be used up by the first pass
+        ids = [ids] if isinstance(ids, (int, range)) else list(ids)
+        id_ranges = tuple(r for r in ids if isinstance(r, range))
+        id_set = frozenset(i for i in ids if not isinstance(i, range))
+
+    type_set = None
+    if types is not None:
+        types = [types] if isinstance(types, type) else list(types)
+        type_set = frozenset(
+            value for cls, value in _event_types.items() for t in types if issubclass(cls, t)
+        )
+
+    def accept():
+        type = raw.evType
+        if type_set is not None and type not in type_set:
+            return False
+        if type == msg_type:
+            if id_set is not None:
+                id = msg.id
+                if id not in id_set and not any(id in r for r in id_ranges):
+                    return False
+            if channel_mask is not None and not (channel_mask >> msg.channel) & 1:
+                return False
+            timestamp = msg.timeStamp
+        elif type == clock_type:
+            timestamp = rtc.timeStamp
+        elif type == trigger_type:
+            timestamp = trig.timeStampLo + (trig.timeStampHi << 32)
+        else:
+            # Version events have no timestamp
+            return True
+        if start is not None and timestamp < start:
+            return False
+        if end is not None and timestamp >= end:
+            return False
+        return True
+
+    return accept
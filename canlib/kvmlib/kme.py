@@ -1,10 +1,14 @@
+import contextlib
 import ctypes as ct
+import heapq
+import itertools
 import os
 
 from .. import deprecation
+from ..frame import Frame
 from ..futureapi import NotYetSupportedError
 from .enums import FileType
-from .events import memoLogEventEx
+from .events import LogEvent, MessageEvent, _event_filter, memoLogEventEx
 from .exceptions import KvmNoLogMsg, kvm_error
 from .wrapper import dll
 
@@ -92,6 +96,139 @@ def kme_file_type(path):
     return FileType(type.value)
 
 
+# Maximum number of events read from the start of each file while looking for
+# the RTC event used to align it in merge_kme
+_RTC_LOOKAHEAD = 64
+
+
+def merge_kme(paths, output=None, channel_offsets=None, align_rtc=True, lazy=False):
+    """Merge several KME files into one stream of events ordered by timestamp
+
+    The files are read in parallel, keeping only one pending event per file in
+    memory, and events are yielded as ``(source, event)`` tuples where
+    ``source`` is the index into `paths` of the file the event was read from::
+
+        for source, event in kvmlib.merge_kme(['logger0.kme50', 'logger1.kme50']):
+            ...
+
+    Each logger timestamps its events relative to when it started logging.
+    If `align_rtc` is `True`, the first `~kvmlib.events.RTCEvent` of each file
+    is used to move the timestamps of all files onto the time base of the file
+    that started first. Note that the calendar time of an RTC event only has a
+    resolution of one second. Files without an RTC event among their first
+    events are not shifted.
+
+    Arguments:
+
+        paths: The KME files to merge. The file type of each file is detected
+            using `kme_file_type`.
+
+        output (`str`): If given, the merged events are written to a new KME50
+            file with this name instead of being returned.
+
+        channel_offsets (`list` of `int`): Number added to the channel of all
+            `~kvmlib.events.MessageEvent` objects read from the
+            corresponding file, e.g. ``[0, 2]`` to keep the two channels of
+            two loggers apart. Default is to keep the channels unchanged.
+
+        align_rtc (`bool`): Align the timestamps of the files using their RTC
+            events.
+
+        lazy (`bool`): Read lazy event views, see
+            `memoLogEventEx.createMemoEvent`.
+
+    Returns:
+        An iterator of ``(source, event)`` tuples, or, if `output` was given,
+        the number of events written.
+
+    .. versionadded:: 1.32
+
+    """
+    paths = [os.fspath(path) for path in paths]
+    if channel_offsets is None:
+        channel_offsets = [0] * len(paths)
+    elif len(channel_offsets) != len(paths):
+        raise ValueError(
+            f"Got {len(channel_offsets)} channel offsets for {len(paths)} files"
+        )
+
+    merged = _merge_kme(paths, channel_offsets, align_rtc, lazy)
+    if output is None:
+        return merged
+    with createKme(os.fspath(output), filetype=FileType.KME50) as kme:
+        return kme.write_events(event for _, event in merged)
+
+
+def _merge_kme(paths, channel_offsets, align_rtc, lazy):
+    with contextlib.ExitStack() as stack:
+        inputs = []
+        starts = []
+        for path in paths:
+            kme = stack.enter_context(openKme(path, filetype=kme_file_type(path)))
+            # Low level structures of all file types, the events read while
+            # looking for the RTC event are kept, so each needs its own copy
+            logevents = (
+                memoLogEventEx.from_buffer_copy(logevent)
+                for logevent in kme._raw_events(None, None, None, None, None)
+            )
+            start = None
+            if align_rtc:
+                head = []
+                for logevent in itertools.islice(logevents, _RTC_LOOKAHEAD):
+                    head.append(logevent)
+                    if logevent.event.raw.evType == memoLogEventEx.MEMOLOG_TYPE_CLOCK:
+                        # Start of logging, in nanoseconds since the epoch. The
+                        # raw unix time is used, since the local time of
+                        # RTCEvent.calendartime is ambiguous around DST changes.
+                        rtc = logevent.event.rtc
+                        start = rtc.calendarTime * 1000000000 - rtc.timeStamp
+                        break
+                logevents = itertools.chain(head, logevents)
+            events = (logevent.createMemoEvent(lazy=lazy) for logevent in logevents)
+            inputs.append(events)
+            starts.append(start)
+
+        aligned = [start for start in starts if start is not None]
+        base = min(aligned) if aligned else 0
+        time_offsets = [0 if start is None else start - base for start in starts]
+
+        heap = []
+        for index, events in enumerate(inputs):
+            entry = _next_merge_entry(
+                index, events, time_offsets[index], channel_offsets[index], 0
+            )
+            if entry is not None:
+                heap.append(entry)
+        heapq.heapify(heap)
+
+        while heap:
+            key, index, event = heap[0]
+            yield index, event
+            entry = _next_merge_entry(
+                index, inputs[index], time_offsets[index], channel_offsets[index], key
+            )
+            if entry is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, entry)
+
+
+def _next_merge_entry(index, events, time_offset, channel_offset, last_key):
+    event = next(events, None)
+    if event is None:
+        return None
+    if event.timeStamp is None:
+        # Version events have no timestamp, keep them where they are
+        key = last_key
+    else:
+        if time_offset:
+            event.timeStamp += time_offset
+        key = event.timeStamp
+    if channel_offset and isinstance(event, MessageEvent):
+        event.channel += channel_offset
+    return (key, index, event)
+
+
 def _dump_hex(text, data, group_size=4):
     hexstring = ''.join([f'{b:02x}' for b in data])
     n = group_size
@@ -120,6 +257,10 @@ class Kme:
 
     Note that only KME files of type KME50 and KME60 may currently be written to.
 
+    When only a few fields of each event are used, e.g. when filtering on
+    ``id``, iterating using ``kme.events(lazy=True)`` avoids decoding the rest
+    of the event.
+
     .. versionadded:: 1.7
 
     .. versionchanged:: 1.20
@@ -174,13 +315,59 @@ class Kme:
         dll.kvmKmeCountEvents(self.handle, ct.byref(eventCount))
         return eventCount.value
 
-    def events(self):
+    def events(self, ids=None, channel_mask=None, types=None, start=None, end=None):
+        """Iterate over all events in the KME file
+
+        Events that do not match the given filters are discarded directly
+        after being read, before any Python event objects are created, which
+        is much faster than filtering the returned events.
+
+            Arguments:
+
+                ids: Only include message events with these ids, given as an
+                    id, a `range`, or an iterable of ids and/or `range` objects.
+
+                channel_mask (`int`): Only include message events on channels
+                    whose bit is set, e.g. ``0b101`` for channel 0 and 2.
+
+                types: Only include events of these classes, e.g.
+                    ``[kvmlib.MessageEvent, kvmlib.RTCEvent]``, or of a single
+                    class.
+
+                start (`int`): Only include events with a timestamp (in
+                    nanoseconds) of at least `start`.
+
+                end (`int`): Only include events with a timestamp (in
+                    nanoseconds) less than `end`.
+
+            Yields:
+                `memoLogEventEx`
+
+        Note:
+            The `ids` and `channel_mask` filters only apply to message events,
+            use `types` to also exclude other events. Version events have no
+            timestamp and are never excluded by `start` and `end`.
+
+        .. versionchanged:: 1.32
+            Added filter arguments.
+
+        """
+        for logevent in self._raw_events(ids, channel_mask, types, start, end):
+            yield memoLogEventEx.from_buffer_copy(logevent)
+
+    def _raw_events(self, ids, channel_mask, types, start, end):
+        # The same structure is used for every read and is only yielded for
+        # the events passing the filter
+        logevent = memoLogEventEx()
+        accept = _event_filter(logevent, ids, channel_mask, types, start, end)
+        read = dll.kvmKmeReadEvent
         while True:
             try:
-                event = self.read_event()
+                read(self.handle, logevent)
             except (KvmNoLogMsg):
                 return
-            yield event
+            if accept is None or accept():
+                yield logevent
 
     def read_event(self):
         """Read logevent from KME file
@@ -207,17 +394,51 @@ class Kme:
 
 
 class Kme50(Kme):
-    def read_event(self):
+    def events(
+        self, ids=None, channel_mask=None, types=None, start=None, end=None, *, lazy=False
+    ):
+        """Iterate over all events in the KME50 file
+
+        See `Kme.events` for a description of the filter arguments, which are
+        applied before any event objects are created.
+
+            Arguments:
+
+                lazy (`bool`): Yield lazy views that decode their fields only
+                    when accessed, see `memoLogEventEx.createMemoEvent`. Must be
+                    given as a keyword argument.
+
+            Yields:
+                `kvmlib.events.LogEvent`: E.g. `kvmlib.events.MessageEvent`.
+
+        .. versionadded:: 1.32
+
+        """
+        for logevent in self._raw_events(ids, channel_mask, types, start, end):
+            if lazy:
+                # A view needs a structure of its own
+                logevent = memoLogEventEx.from_buffer_copy(logevent)
+            yield logevent.createMemoEvent(lazy=lazy)
+
+    def read_event(self, lazy=False):
         """Read logevent from KME50 file
 
+            Arguments:
+
+                lazy (`bool`): Return a lazy view that decodes its fields only
+                    when accessed, see `memoLogEventEx.createMemoEvent`.
+
             Returns:
                 `kvmlib.events.LogEvent`: E.g. `kvmlib.events.MessageEvent`.
 
         .. versionadded:: 1.7
 
+        .. versionchanged:: 1.32
+            Added argument `lazy`.
+
         """
         logevent = super().read_event()
-        return logevent.createMemoEvent()
+        return logevent.createMemoEvent(lazy=lazy)
 
     def write_event(self, event):
         """Write logevent to KME50 file
@@ -235,6 +456,91 @@ class Kme50(Kme):
         # _dump_hex("writing event:", mle.event.raw.data)
         dll.kvmKmeWriteEvent(self.handle, ct.byref(mle))
 
+    def write_events(self, events, channel=0):
+        """Write several events to KME50 file
+
+        All events are encoded into the same, reused, low level structure
+        before being written, which is considerably faster than calling
+        `write_event` for each event.
+
+        Besides `kvmlib.events.LogEvent` objects, `events` may contain
+        `canlib.Frame` objects, or tuples ``(id, data, dlc, flags,
+        timestamp)`` in the same order as the slots of `canlib.Frame`. The
+        timestamp of frames and tuples is written as is, i.e. it must be
+        given in nanoseconds, which is the inverse of
+        `kvmlib.events.MessageEvent.asframe`. A missing timestamp is written as
+        zero.
+
+        Note that frames read from a `canlib.canlib.Channel` are timestamped
+        in units of `canlib.canlib.Channel.iocontrol.timer_scale`, by default
+        milliseconds, so their timestamps must be converted to nanoseconds
+        first, e.g. by multiplying them by 1000000.
+
+            Arguments:
+
+                events: Iterable of events, frames or tuples to write.
+
+                channel (`int`): The channel that frames and tuples are
+                    written to, `kvmlib.events.MessageEvent` objects keep
+                    their own channel.
+
+            Returns:
+                `int`: The number of events written.
+
+        .. versionadded:: 1.32
+
+        """
+        write = dll.kvmKmeWriteEvent
+        handle = self.handle
+        mle = memoLogEventEx()
+        ref = ct.byref(mle)
+        msg = mle.event.msg
+        msg_type = memoLogEventEx.MEMOLOG_TYPE_MSG
+
+        count = 0
+        for event in events:
+            if isinstance(event, Frame):
+                id_, data, dlc, flags, timestamp = (
+                    event.id,
+                    event.data,
+                    event.dlc,
+                    event.flags,
+                    event.timestamp,
+                )
+                msg.channel = channel
+            elif isinstance(event, MessageEvent):
+                view = getattr(event, '_mle', None)
+                if view is not None:
+                    # Lazy views already carry an encoded structure
+                    write(handle, ct.byref(view))
+                    count += 1
+                    continue
+                id_, data, dlc, flags, timestamp = (
+                    event.id,
+                    event.data,
+                    event.dlc,
+                    event.flags,
+                    event.timeStamp,
+                )
+                msg.channel = event.channel
+            elif isinstance(event, LogEvent):
+                mle.event = event._asMrtEvent()
+                write(handle, ref)
+                count += 1
+                continue
+            else:
+                id_, data, dlc, flags, timestamp = event
+                msg.channel = channel
+            msg.evType = msg_type
+            msg.id = id_
+            msg.timeStamp = timestamp or 0
+            msg.dlc = dlc
+            msg.flags = flags
+            ct.memmove(msg.data, bytes(data).ljust(64, b'\x00'), 64)
+            write(handle, ref)
+            count += 1
+        return count
+
 
 class Kme60(Kme50):
     """Experimental support for Kme60 currently only includes identical events to Kme50.
@@ -3,7 +3,7 @@ import datetime
 from functools import wraps
 
 from .enums import LogFileType
-from .events import memoLogEventEx
+from .events import _event_filter, memoLogEventEx
 from .exceptions import KvmNoLogMsg
 from .wrapper import dll
 
@@ -62,17 +62,47 @@ class LogFile:
         self.index = index
 
     def __iter__(self):
+        return self.events()
+
+    def events(
+        self, ids=None, channel_mask=None, types=None, start=None, end=None, *, lazy=False
+    ):
+        """Iterate over all events in the log file
+
+        Iterating directly over the `LogFile` is the same as calling this
+        method with default arguments.
+
+        Events that do not match the given filters are discarded directly
+        after being read, before any Python event objects are created, see
+        `Kme.events` for a description of the filter arguments.
+
+        Arguments:
+            lazy (`bool`): Yield lazy views that decode their fields only when
+                accessed, see `memoLogEventEx.createMemoEvent`. Must be given as
+                a keyword argument.
+
+        .. versionadded:: 1.32
+
+        """
         # force a remount, to reset the dll's internal event counter
         self._remount()
 
         try:
             self._container._mount_lock = True
+            eventstruct = memoLogEventEx()
+            accept = _event_filter(eventstruct, ids, channel_mask, types, start, end)
+            ref = ct.byref(eventstruct)
             while True:
                 # It is currently up to the user to make sure the handle/device
                 # stays mounted on this file during iteration.
-                eventstruct = memoLogEventEx()
-                dll.kvmLogFileReadEvent(self._container.handle, ct.byref(eventstruct))
-                event = eventstruct.createMemoEvent()
+                dll.kvmLogFileReadEvent(self._container.handle, ref)
+                if accept is not None and not accept():
+                    continue
+                if lazy:
+                    # A view needs a structure of its own
+                    event = memoLogEventEx.from_buffer_copy(eventstruct).createMemoEvent(lazy=True)
+                else:
+                    event = eventstruct.createMemoEvent()
                 yield event
         except (KvmNoLogMsg, GeneratorExit):
             # GeneratorExit is raised when close() is called on this
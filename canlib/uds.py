@@ -0,0 +1,505 @@
+"""UDS (ISO 14229) diagnostic client
+
+A client for the Unified Diagnostic Services on top of an
+`~canlib.isotp.IsoTpConnection`, with the parts needed to flash an ECU
+quickly:
+
+ - Responses with negative response code responsePending (0x78) extend the
+   timeout from P2 to P2* until the real response arrives.
+ - `UdsClient.download` prepares the next TransferData block in a worker
+   thread while the current block is being transmitted and answered.
+ - A tester present keep-alive thread keeps a non-default session open,
+   skipping the message when other requests already did so.
+ - Request latencies are collected per service.
+
+Example of usage:
+
+    >>> from canlib import canlib, isotp, uds
+    >>> with isotp.IsoTpEngine(ch) as engine:
+    ...     client = uds.UdsClient(engine.connect(tx_id=0x7E0, rx_id=0x7E8))
+    ...     client.diagnostic_session_control(uds.Session.PROGRAMMING)
+    ...     client.security_access(1, compute_key)
+    ...     with client.tester_present_keepalive():
+    ...         client.download(0x8000, firmware)
+    ...     print(client.latency()[uds.Service.TRANSFER_DATA])
+
+.. versionadded:: 1.32
+
+"""
+
+import concurrent.futures
+import contextlib
+import threading
+import time
+from collections import namedtuple
+from enum import IntEnum
+
+from .canlib.exceptions import CanNoMsg
+from .exceptions import CanlibException
+
+_NEGATIVE_RESPONSE = 0x7F
+_RESPONSE_PENDING = 0x78
+_SUPPRESS_POSITIVE_RESPONSE = 0x80
+
+
+class Service(IntEnum):
+    """UDS service identifiers"""
+
+    DIAGNOSTIC_SESSION_CONTROL = 0x10
+    ECU_RESET = 0x11
+    SECURITY_ACCESS = 0x27
+    COMMUNICATION_CONTROL = 0x28
+    TESTER_PRESENT = 0x3E
+    CONTROL_DTC_SETTING = 0x85
+    READ_DATA_BY_IDENTIFIER = 0x22
+    WRITE_DATA_BY_IDENTIFIER = 0x2E
+    ROUTINE_CONTROL = 0x31
+    REQUEST_DOWNLOAD = 0x34
+    REQUEST_UPLOAD = 0x35
+    TRANSFER_DATA = 0x36
+    REQUEST_TRANSFER_EXIT = 0x37
+
+
+class Session(IntEnum):
+    """Diagnostic sessions used with `UdsClient.diagnostic_session_control`"""
+
+    DEFAULT = 0x01
+    PROGRAMMING = 0x02
+    EXTENDED = 0x03
+    SAFETY_SYSTEM = 0x04
+
+
+#: Names of common negative response codes
+NRC_NAMES = {
+    0x10: 'generalReject',
+    0x11: 'serviceNotSupported',
+    0x12: 'subFunctionNotSupported',
+    0x13: 'incorrectMessageLengthOrInvalidFormat',
+    0x14: 'responseTooLong',
+    0x21: 'busyRepeatRequest',
+    0x22: 'conditionsNotCorrect',
+    0x24: 'requestSequenceError',
+    0x31: 'requestOutOfRange',
+    0x33: 'securityAccessDenied',
+    0x35: 'invalidKey',
+    0x36: 'exceedNumberOfAttempts',
+    0x37: 'requiredTimeDelayNotExpired',
+    0x70: 'uploadDownloadNotAccepted',
+    0x71: 'transferDataSuspended',
+    0x72: 'generalProgrammingFailure',
+    0x73: 'wrongBlockSequenceCounter',
+    0x78: 'requestCorrectlyReceived-ResponsePending',
+    0x7E: 'subFunctionNotSupportedInActiveSession',
+    0x7F: 'serviceNotSupportedInActiveSession',
+}
+
+ServiceLatency = namedtuple('ServiceLatency', 'service count mean min max pending')
+ServiceLatency.__doc__ = """Latency of the requests of one service
+
+    Times are from the request being sent until the final response was
+    received, in seconds.
+
+    Attributes:
+        service (`Service` | `int`): The service
+        count (`int`): Number of requests with a response
+        mean (`float`): Mean latency
+        min (`float`): Shortest latency
+        max (`float`): Longest latency
+        pending (`int`): Number of responsePending responses received
+
+    .. versionadded:: 1.32
+
+"""
+
+
+class UdsError(CanlibException):
+    """Base class for UDS errors
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+class UdsTimeout(UdsError):
+    """Raised when the ECU did not respond in time
+
+    .. versionadded:: 1.32
+
+    """
+
+    pass
+
+
+class UdsNegativeResponse(UdsError):
+    """Raised when the ECU sent a negative response
+
+    Attributes:
+        service (`int`): The service of the request
+        code (`int`): The negative response code
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, service, code):
+        self.service = service
+        self.code = code
+        name = NRC_NAMES.get(code, 'unknown')
+        super().__init__(f"Negative response to service 0x{service:02x}: 0x{code:02x} ({name})")
+
+
+def _service(sid):
+    try:
+        return Service(sid)
+    except ValueError:
+        return sid
+
+
+class _Latency:
+    __slots__ = ('count', 'total', 'min', 'max', 'pending')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.pending = 0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+
+class UdsClient:
+    """UDS client using an ISO-TP connection
+
+    Requests are sent one at a time, as UDS requires. The client can be
+    used from several threads, e.g. the tester present thread, in which
+    case requests wait for each other.
+
+    Args:
+        connection (`~canlib.isotp.IsoTpConnection`): Connection to the ECU
+        p2_timeout (`int`): Time in milliseconds to wait for a response (P2)
+        p2_star_timeout (`int`): Time in milliseconds to wait for a response
+            after a responsePending response (P2*)
+
+    .. versionadded:: 1.32
+
+    """
+
+    def __init__(self, connection, p2_timeout=1000, p2_star_timeout=5000):
+        self.connection = connection
+        self.p2_timeout = p2_timeout
+        self.p2_star_timeout = p2_star_timeout
+        self.session = Session.DEFAULT
+        self.security_level = None
+        self._lock = threading.Lock()
+        self._last_request = 0.0
+        self._latency = {}
+        self._keepalive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_tester_present()
+
+    def request(self, data, timeout=None, suppress_response=False):
+        """Send a request and return the positive response
+
+        Args:
+            data (`bytes`): The request, starting with the service identifier
+            timeout (`int`): Override `p2_timeout` for this request
+            suppress_response (`bool`): Do not wait for a response, for
+                requests with the suppressPosRspMsgIndicationBit set
+
+        Returns:
+            `bytes`: The positive response, starting with the response
+            service identifier, or `None` when `suppress_response` is used
+
+        Raises:
+            `UdsNegativeResponse`: The ECU sent a negative response
+            `UdsTimeout`: The ECU did not respond in time
+
+        """
+        data = bytes(data)
+        sid = data[0]
+        with self._lock:
+            start = time.perf_counter()
+            self._last_request = start
+            self.connection.send(data)
+            if suppress_response:
+                return None
+            response = self._wait_for_response(sid, start, timeout)
+        return response
+
+    def _wait_for_response(self, sid, start, timeout):
+        latency = self._latency.get(sid)
+        if latency is None:
+            latency = self._latency[sid] = _Latency()
+        timeout = self.p2_timeout if timeout is None else timeout
+        deadline = start + timeout / 1000
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                response = self.connection.recv(timeout=max(0, remaining * 1000))
+            except CanNoMsg:
+                raise UdsTimeout(f"No response to service 0x{sid:02x}")
+            if response[0] == sid + 0x40:
+                latency.add(time.perf_counter() - start)
+                return bytes(response)
+            if response[0] == _NEGATIVE_RESPONSE and len(response) >= 3 and response[1] == sid:
+                code = response[2]
+                if code == _RESPONSE_PENDING:
+                    latency.pending += 1
+                    deadline = time.perf_counter() + self.p2_star_timeout / 1000
+                    continue
+                latency.add(time.perf_counter() - start)
+                raise UdsNegativeResponse(sid, code)
+            # Late response to an earlier request that timed out, ignore
+
+    def latency(self):
+        """Return the request latencies, per service
+
+        Returns:
+            `dict` mapping `Service` to `ServiceLatency`
+
+        """
+        result = {}
+        for sid, latency in sorted(self._latency.items()):
+            service = _service(sid)
+            if latency.count:
+                result[service] = ServiceLatency(
+                    service, latency.count, latency.total / latency.count, latency.min,
+                    latency.max, latency.pending,
+                )
+            else:
+                result[service] = ServiceLatency(service, 0, 0.0, 0.0, 0.0, latency.pending)
+        return result
+
+    def diagnostic_session_control(self, session):
+        """Change diagnostic session
+
+        Returns:
+            `bytes`: The session parameter record of the response
+
+        """
+        response = self.request(bytes((Service.DIAGNOSTIC_SESSION_CONTROL, session)))
+        self.session = _session(session)
+        self.security_level = None
+        return response[2:]
+
+    def ecu_reset(self, reset_type=0x01):
+        """Reset the ECU, the session returns to the default session"""
+        response = self.request(bytes((Service.ECU_RESET, reset_type)))
+        self.session = Session.DEFAULT
+        self.security_level = None
+        return response[2:]
+
+    def security_access(self, level, compute_key):
+        """Unlock the ECU
+
+        Requests a seed using the odd `level`, and sends the key returned by
+        ``compute_key(level, seed)`` using ``level + 1``. Nothing is sent if
+        the ECU returns an all zero seed, meaning it is already unlocked.
+
+        Args:
+            level (`int`): The requestSeed sub-function, an odd number
+            compute_key: Function returning the key (`bytes`) for a seed
+
+        """
+        if level % 2 == 0:
+            raise ValueError("The security access level must be odd")
+        response = self.request(bytes((Service.SECURITY_ACCESS, level)))
+        seed = response[2:]
+        if any(seed):
+            key = bytes(compute_key(level, seed))
+            self.request(bytes((Service.SECURITY_ACCESS, level + 1)) + key)
+        self.security_level = level
+
+    def tester_present(self, suppress_response=True):
+        """Send a tester present request"""
+        sub_function = _SUPPRESS_POSITIVE_RESPONSE if suppress_response else 0
+        self.request(
+            bytes((Service.TESTER_PRESENT, sub_function)), suppress_response=suppress_response
+        )
+
+    def start_tester_present(self, interval=2.0):
+        """Start sending tester present requests from a background thread
+
+        A request is only sent when no other request has been sent during
+        the last `interval` seconds.
+
+        """
+        if self._keepalive is not None:
+            return
+        stopping = threading.Event()
+        thread = threading.Thread(
+            target=self._keep_alive, args=(interval, stopping), daemon=True
+        )
+        self._keepalive = (thread, stopping)
+        thread.start()
+
+    def stop_tester_present(self):
+        """Stop sending tester present requests"""
+        if self._keepalive is None:
+            return
+        thread, stopping = self._keepalive
+        stopping.set()
+        thread.join()
+        self._keepalive = None
+
+    @contextlib.contextmanager
+    def tester_present_keepalive(self, interval=2.0):
+        """Context manager sending tester present requests while active"""
+        self.start_tester_present(interval)
+        try:
+            yield self
+        finally:
+            self.stop_tester_present()
+
+    def _keep_alive(self, interval, stopping):
+        while True:
+            idle = time.perf_counter() - self._last_request
+            if stopping.wait(max(0.0, interval - idle)):
+                return
+            if time.perf_counter() - self._last_request >= interval:
+                self.tester_present()
+
+    def read_data_by_identifier(self, did):
+        """Read a data identifier, returning the data record"""
+        response = self.request(bytes((Service.READ_DATA_BY_IDENTIFIER,)) + did.to_bytes(2, 'big'))
+        return response[3:]
+
+    def write_data_by_identifier(self, did, data):
+        """Write a data identifier"""
+        self.request(
+            bytes((Service.WRITE_DATA_BY_IDENTIFIER,)) + did.to_bytes(2, 'big') + bytes(data)
+        )
+
+    def routine_control(self, control_type, routine_id, data=b'', timeout=None):
+        """Start, stop or get the results of a routine
+
+        Returns:
+            `bytes`: The routine status record of the response
+
+        """
+        response = self.request(
+            bytes((Service.ROUTINE_CONTROL, control_type))
+            + routine_id.to_bytes(2, 'big')
+            + bytes(data),
+            timeout=timeout,
+        )
+        return response[4:]
+
+    def request_download(self, address, size, address_size=4, size_size=4, data_format=0):
+        """Request a download to the ECU
+
+        Returns:
+            `int`: The maximum length of a TransferData request, including
+            the service identifier and block sequence counter
+
+        """
+        request = (
+            bytes((Service.REQUEST_DOWNLOAD, data_format, (size_size << 4) | address_size))
+            + address.to_bytes(address_size, 'big')
+            + size.to_bytes(size_size, 'big')
+        )
+        response = self.request(request)
+        length_size = response[1] >> 4
+        return int.from_bytes(response[2:2 + length_size], 'big')
+
+    def transfer_data(self, counter, data, timeout=None):
+        """Send one TransferData block
+
+        Returns:
+            `bytes`: The transfer response parameter record
+
+        """
+        response = self.request(
+            bytes((Service.TRANSFER_DATA, counter & 0xFF)) + bytes(data), timeout=timeout
+        )
+        _check_counter(response, counter)
+        return response[2:]
+
+    def request_transfer_exit(self, data=b''):
+        """End a transfer"""
+        return self.request(bytes((Service.REQUEST_TRANSFER_EXIT,)) + bytes(data))[1:]
+
+    def download(
+        self, address, data, data_format=0, block_length=None, transform=None, progress=None,
+        address_size=4, size_size=4,
+    ):
+        """Download data to the ECU
+
+        Runs RequestDownload, TransferData for each block and
+        RequestTransferExit. The next TransferData request is prepared in a
+        worker thread, using `transform` if given, while the current block is
+        sent and the ECU processes it, so that e.g. compression or
+        encryption of the blocks does not add to the flashing time.
+
+        Args:
+            address (`int`): Memory address
+            data (`bytes`): The data to download
+            data_format (`int`): dataFormatIdentifier of RequestDownload,
+                e.g. the compression and encryption methods
+            block_length (`int`): Maximum TransferData request length, the
+                smaller of this and the length returned by the ECU is used
+            transform: Function applied to each block of data before it is
+                sent, e.g. compression
+            progress: Function called with the number of bytes sent so far
+                after each block
+            address_size, size_size (`int`): Size in bytes of the address and
+                size fields of RequestDownload
+
+        Returns:
+            `int`: Number of blocks sent
+
+        """
+        data = memoryview(bytes(data))
+        max_length = self.request_download(
+            address, len(data), address_size, size_size, data_format
+        )
+        if block_length is not None:
+            max_length = min(max_length, block_length)
+        payload = max_length - 2
+        if payload <= 0:
+            raise UdsError(f"The ECU accepts no TransferData payload (length {max_length})")
+
+        def prepare(counter, offset):
+            block = data[offset:offset + payload]
+            if transform is not None:
+                block = transform(bytes(block))
+            return bytes((Service.TRANSFER_DATA, counter & 0xFF)) + bytes(block)
+
+        offsets = range(0, len(data), payload)
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            future = pool.submit(prepare, 1, 0) if offsets else None
+            for index, offset in enumerate(offsets):
+                request = future.result()
+                counter = index + 1
+                if index + 1 < len(offsets):
+                    future = pool.submit(prepare, counter + 1, offsets[index + 1])
+                _check_counter(self.request(request), counter)
+                if progress is not None:
+                    progress(min(offset + payload, len(data)))
+        self.request_transfer_exit()
+        return len(offsets)
+
+
+def _check_counter(response, counter):
+    if len(response) < 2 or response[1] != counter & 0xFF:
+        raise UdsError(
+            f"TransferData response does not match block sequence counter {counter & 0xFF}"
+        )
+
+
+def _session(session):
+    try:
+        return Session(session)
+    except ValueError:
+        return session
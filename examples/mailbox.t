@@ -0,0 +1,187 @@
+// t side of the canlib.canlib.Mailbox protocol
+//
+// Messages from the host are written as sequence numbered chunks into the
+// slots of the MbxDown envvar, after which the host sends the key event 'M'.
+// Each complete message is passed to mbxOnMessage(), which must be defined by
+// the program including this file:
+//
+//   void mbxOnMessage(const char msg[], int length)
+//   {
+//     // e.g. echo the message back to the host
+//     mbxSend(msg, length);
+//   }
+//
+//   #include "mailbox.t"
+//
+//   on start
+//   {
+//     mbxInit();
+//   }
+//
+// The host may write up to MBX_WINDOW chunks before waiting for them to be
+// consumed, and learns which chunks have been consumed from MbxDownAck.
+// Messages to the host are written to MbxUp with mbxSend() in the same way,
+// credits are returned by the host through MbxUpAck.
+//
+// MBX_SLOT_SIZE must match the slot_size argument of Mailbox in Python, and
+// MBX_MAX_MESSAGE its max_message argument. Longer messages are dropped and
+// counted in mbxDropped, Mailbox.send refuses to send them.
+
+variables
+{
+  const int MBX_SIZE = ENVVAR_MAX_SIZE;   // Size of MbxDown and MbxUp
+  const int MBX_SLOT_SIZE = 512;
+  const int MBX_HEADER_SIZE = 8;          // seq (4), length (2), flags, reserved
+  const int MBX_PAYLOAD_SIZE = MBX_SLOT_SIZE - MBX_HEADER_SIZE;
+  const int MBX_WINDOW = MBX_SIZE / MBX_SLOT_SIZE;
+  const int MBX_MAX_MESSAGE = 8192;
+  const int MBX_FIRST = 0x01;
+  const int MBX_LAST = 0x02;
+
+  int  mbxDownSeq;           // Next chunk expected from the host
+  int  mbxUpSeq;             // Next chunk to write to the host
+  int  mbxMessageLength;     // -1 when not inside a message
+  int  mbxDropped;           // Messages longer than MBX_MAX_MESSAGE
+  char mbxMessage[MBX_MAX_MESSAGE];
+  char mbxDown[MBX_SIZE];
+  char mbxUp[MBX_SIZE];
+}
+
+envvar
+{
+  char MbxDown[MBX_SIZE];
+  int  MbxDownAck;
+  char MbxUp[MBX_SIZE];
+  int  MbxUpHead;
+  int  MbxUpAck;
+}
+
+
+int mbxGetU32(const char buf[], int index)
+{
+  return (buf[index] & 0xff) | ((buf[index + 1] & 0xff) << 8) |
+         ((buf[index + 2] & 0xff) << 16) | ((buf[index + 3] & 0xff) << 24);
+}
+
+
+void mbxPutU32(char buf[], int index, int value)
+{
+  buf[index] = value & 0xff;
+  buf[index + 1] = (value >> 8) & 0xff;
+  buf[index + 2] = (value >> 16) & 0xff;
+  buf[index + 3] = (value >> 24) & 0xff;
+}
+
+
+// Reset the protocol, call from "on start" before the host connects
+void mbxInit(void)
+{
+  mbxDownSeq = 1;
+  mbxUpSeq = 1;
+  mbxMessageLength = -1;
+  mbxDropped = 0;
+  envvarSetValue(MbxDownAck, mbxDownSeq);
+  envvarSetValue(MbxUpAck, mbxUpSeq);
+  envvarSetValue(MbxUpHead, mbxUpSeq);
+}
+
+
+// Consume all chunks written by the host, and return the credits
+void mbxPoll(void)
+{
+  int start;
+  int length;
+  int flags;
+  int consumed = 0;
+
+  envvarGetValue(MbxDown, mbxDown);
+  while (1) {
+    start = (mbxDownSeq % MBX_WINDOW) * MBX_SLOT_SIZE;
+    if (mbxGetU32(mbxDown, start) != mbxDownSeq) {
+      break;
+    }
+    length = (mbxDown[start + 4] & 0xff) | ((mbxDown[start + 5] & 0xff) << 8);
+    flags = mbxDown[start + 6] & 0xff;
+    if (flags & MBX_FIRST) {
+      mbxMessageLength = 0;
+    }
+    if (mbxMessageLength >= 0) {
+      if (mbxMessageLength + length > MBX_MAX_MESSAGE) {
+        mbxDropped++;
+        mbxMessageLength = -1;
+      } else if (length > 0) {
+        mbxMessage[mbxMessageLength, length] = mbxDown[start + MBX_HEADER_SIZE, length];
+        mbxMessageLength += length;
+      }
+    }
+    mbxDownSeq++;
+    consumed++;
+    if ((flags & MBX_LAST) && (mbxMessageLength >= 0)) {
+      mbxOnMessage(mbxMessage, mbxMessageLength);
+      mbxMessageLength = -1;
+    }
+  }
+  if (consumed > 0) {
+    envvarSetValue(MbxDownAck, mbxDownSeq);
+  }
+}
+
+
+// Send a message to the host
+//
+// Returns length, or -1 if the host has not consumed enough chunks for the
+// whole message to fit. Nothing is written in that case, so try again later.
+// Messages longer than MBX_WINDOW * MBX_PAYLOAD_SIZE bytes never fit.
+int mbxSend(const char data[], int length)
+{
+  int ack;
+  int chunks;
+  int i;
+  int n;
+  int flags;
+  int start;
+  int offset = 0;
+
+  chunks = (length + MBX_PAYLOAD_SIZE - 1) / MBX_PAYLOAD_SIZE;
+  if (chunks == 0) {
+    chunks = 1;
+  }
+  envvarGetValue(MbxUpAck, &ack);
+  if (mbxUpSeq + chunks - ack > MBX_WINDOW) {
+    return -1;
+  }
+  for (i = 0; i < chunks; i++) {
+    n = length - offset;
+    if (n > MBX_PAYLOAD_SIZE) {
+      n = MBX_PAYLOAD_SIZE;
+    }
+    flags = 0;
+    if (i == 0) {
+      flags |= MBX_FIRST;
+    }
+    if (i == chunks - 1) {
+      flags |= MBX_LAST;
+    }
+    start = (mbxUpSeq % MBX_WINDOW) * MBX_SLOT_SIZE;
+    mbxPutU32(mbxUp, start, mbxUpSeq);
+    mbxUp[start + 4] = n & 0xff;
+    mbxUp[start + 5] = (n >> 8) & 0xff;
+    mbxUp[start + 6] = flags;
+    mbxUp[start + 7] = 0;
+    if (n > 0) {
+      mbxUp[start + MBX_HEADER_SIZE, n] = data[offset, n];
+    }
+    offset += n;
+    mbxUpSeq++;
+  }
+  // The data must be in place before the host sees the new head
+  envvarSetValue(MbxUp, mbxUp);
+  envvarSetValue(MbxUpHead, mbxUpSeq);
+  return length;
+}
+
+
+on key 'M'
+{
+  mbxPoll();
+}
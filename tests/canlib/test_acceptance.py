@@ -0,0 +1,124 @@
+import random
+import time
+
+import pytest
+
+from canlib import Frame, canlib
+from canlib.canlib import acceptance
+
+EXT = canlib.MessageFlag.EXT
+
+
+def passes(cover, id_):
+    return (id_ ^ cover.code) & cover.mask == 0
+
+
+@pytest.mark.parametrize(
+    "ids, ranges, expected",
+    [
+        ([0x100], [], (0x100, 0x7FF, 1)),
+        ([0x100, 0x101], [], (0x100, 0x7FE, 2)),
+        ([0x100, 0x102, 0x103], [], (0x100, 0x7FC, 4)),
+        ([], [(0x200, 0x20F)], (0x200, 0x7F0, 16)),
+        ([0x000, 0x7FF], [], (0x000, 0x000, 2048)),
+        ([], [], (0x000, 0x7FF, 1)),
+    ],
+)
+def test_code_mask_cover(ids, ranges, expected):
+    cover = canlib.code_mask_cover(ids, ranges)
+    assert cover == expected
+    for id_ in ids:
+        assert passes(cover, id_)
+    for first, last in ranges:
+        assert all(passes(cover, id_) for id_ in range(first, last + 1))
+
+
+def test_cover_is_tightest():
+    rng = random.Random(1939)
+    for _ in range(100):
+        ids = rng.sample(range(0x800), rng.randint(1, 5))
+        cover = canlib.code_mask_cover(ids)
+        passed = [id_ for id_ in range(0x800) if passes(cover, id_)]
+        assert len(passed) == cover.passed
+        assert set(ids) <= set(passed)
+        # Clearing any bit of the mask is required by some id
+        for bit in range(11):
+            if cover.mask & (1 << bit):
+                assert all((id_ ^ cover.code) & (1 << bit) == 0 for id_ in ids)
+
+
+def test_accepts():
+    accept = canlib.AcceptanceFilter(
+        standard=[0x100, range(0x200, 0x210), (0x300, 0x301)],
+        extended=[0x18FEF100, (0x18FF0000, 0x18FFFFFF), range(0x100, 0x200, 0x10)],
+    )
+    assert accept.accepts(0x100)
+    assert accept.accepts(0x20F)
+    assert accept.accepts(0x301)
+    assert not accept.accepts(0x210)
+    assert not accept.accepts(0x18FEF100)
+    assert accept.accepts(0x18FEF100, extended=True)
+    assert accept.accepts(0x18FF1234, extended=True)
+    assert accept.accepts(0x130, extended=True)
+    assert not accept.accepts(0x131, extended=True)
+    assert not accept.accepts(0x18FEF101, extended=True)
+    assert accept.accepts(0x100, extended=True)
+    assert not accept.exact
+
+    cover = accept.extended_cover
+    assert passes(cover, 0x18FEF100) and passes(cover, 0x18FFFFFF) and passes(cover, 0x100)
+
+    with pytest.raises(ValueError):
+        canlib.AcceptanceFilter(standard=[0x800])
+    with pytest.raises(ValueError):
+        canlib.AcceptanceFilter(extended=[(10, 5)])
+
+
+def test_exact():
+    assert canlib.AcceptanceFilter(standard=range(0x100, 0x200), extended=[0x1234]).exact
+    assert not canlib.AcceptanceFilter(standard=[0x100, 0x103], extended=[0x1234]).exact
+
+
+def test_filter():
+    accept = canlib.AcceptanceFilter(standard=[0x100], extended=[(0x18FF0000, 0x18FFFFFF)])
+    frames = [
+        Frame(0x100, b'\x01'),
+        Frame(0x101, b'\x02'),
+        Frame(0x100, b'\x03', flags=EXT),
+        Frame(0x18FF1000, b'\x04', flags=EXT),
+        Frame(0, b'', flags=canlib.MessageFlag.ERROR_FRAME),
+    ]
+    expected = [frames[0], frames[3], frames[4]]
+    assert accept.filter(frames) == expected
+    assert [f for f in frames if accept(f)] == expected
+    # Without extended ranges, the set lookup is used
+    accept = canlib.AcceptanceFilter(standard=[0x100], extended=[0x18FF1000])
+    assert accept.filter(frames) == expected
+
+
+def test_apply():
+    class Recorder:
+        def __init__(self):
+            self.calls = []
+
+        def canSetAcceptanceFilter(self, code, mask, is_extended=False):
+            self.calls.append((code, mask, is_extended))
+
+    channel = Recorder()
+    canlib.AcceptanceFilter(standard=[0x100, 0x101], extended=[0x1234]).apply(channel)
+    assert channel.calls == [(0x100, 0x7FE, False), (0x1234, acceptance.EXT_ID_MASK, True)]
+
+
+@pytest.mark.slow
+def test_acceptance_benchmark():
+    rng = random.Random(0)
+    accept = canlib.AcceptanceFilter(
+        standard=rng.sample(range(0x800), 100), extended=rng.sample(range(0x20000000), 1000)
+    )
+    frames = [Frame(rng.randrange(0x800), b'') for _ in range(50000)]
+    frames += [Frame(rng.randrange(0x20000000), b'', flags=EXT) for _ in range(50000)]
+    start = time.perf_counter()
+    accepted = accept.filter(frames)
+    elapsed = time.perf_counter() - start
+    print(f"{len(frames) / elapsed:.0f} frames/s, {len(accepted)} accepted")
+    assert accepted == [f for f in frames if accept(f)]
@@ -1,7 +1,7 @@
 import pytest
 from kvprobe import features
 
-from canlib import canlib
+from canlib import Frame, canlib
 
 
 def test_Bitrate(channel_no):
@@ -27,3 +27,29 @@ def test_BitrateFD(channel_no):
     # assert ch.getBusParams() == expected_arb
     assert ch.getBusParamsFd() == expected_data
     ch.close()
+
+
+def test_detect_bitrate(channel_no_pair):
+    tx_channel, rx_channel = channel_no_pair
+    with canlib.openChannel(
+        tx_channel, flags=canlib.Open.ACCEPT_VIRTUAL, bitrate=canlib.Bitrate.BITRATE_250K
+    ) as ch:
+        ch.busOn()
+        ch.allocate_periodic_objbuf(2000, Frame(id_=0x123, data=b'12345678')).enable()
+        result = canlib.detect_bitrate(rx_channel, flags=canlib.Open.ACCEPT_VIRTUAL)
+        ch.busOff()
+    assert result.channel == rx_channel
+    assert result.bitrate == canlib.Bitrate.BITRATE_250K
+    assert result.data_bitrate is None
+    assert result.scores[-1].frames >= 5
+    assert sum(score.seconds for score in result.scores) < 1
+
+
+def test_detect_bitrate_quiet_bus(channel_no):
+    candidates = [canlib.Bitrate.BITRATE_500K, canlib.Bitrate.BITRATE_1M]
+    [result] = canlib.detect_bitrates(
+        [channel_no], candidates, flags=canlib.Open.ACCEPT_VIRTUAL, dwell=0.05
+    )
+    assert result.bitrate is None
+    assert [score.bitrate for score in result.scores] == candidates
+    assert all(score.frames == 0 for score in result.scores)
@@ -717,3 +717,81 @@ sjw     :       13
 nosamp  :        1
 syncMode:        0
 """
+
+
+def _limits(prop_max=0):
+    limits_min = SimpleNamespace(tq=0, phase1=1, phase2=1, sjw=1, prescaler=1, prop=0)
+    limits_max = SimpleNamespace(
+        tq=0, phase1=512 if prop_max == 0 else 32, phase2=32, sjw=16, prescaler=8192, prop=prop_max
+    )
+    return canlib.busparams.BusParamTqLimits(limits_min, limits_max, limits_min, limits_max)
+
+
+@pytest.mark.parametrize("prop_max", [0, 64])
+@pytest.mark.parametrize("bitrate", [10_000, 125_000, 500_000, 1_000_000])
+def test_search_busparamstq(bitrate, prop_max):
+    clk_freq = 80_000_000
+    limits = _limits(prop_max)
+    candidates = canlib.busparams.search_busparamstq(
+        clk_freq=clk_freq,
+        limits=limits,
+        target_bitrate=bitrate,
+        target_sample_point=87.5,
+        max_results=5,
+    )
+    assert len(candidates) == 5
+    best = candidates[0]
+    assert best.bitrate_error == 0
+    assert best.nominal.bitrate(clk_freq) == bitrate
+    assert best.nominal.sample_point() == 87.5
+    assert best.tolerance == canlib.busparams.calc_tolerance(best.nominal)
+    for candidate in candidates:
+        limits.validate(candidate.nominal)
+    ranks = [(c.bitrate_error, c.sample_point_error, -c.margin) for c in candidates]
+    assert ranks == sorted(ranks)
+
+
+def test_search_busparamstq_fd():
+    clk_freq = 80_000_000
+    limits = _limits()
+    candidates = canlib.busparams.search_busparamstq(
+        clk_freq=clk_freq,
+        limits=limits,
+        target_bitrate=500_000,
+        target_sample_point=80,
+        data_bitrate=2_000_000,
+        data_sample_point=70,
+    )
+    best = candidates[0]
+    limits.validate(best.nominal, best.data)
+    assert best.nominal.bitrate(clk_freq) == 500_000
+    assert best.data.bitrate(clk_freq) == 2_000_000
+    assert best.data.sample_point() == 70
+    assert best.tolerance == canlib.busparams.calc_tolerance(best.nominal, best.data)
+    assert best.margin == min(best.tolerance)
+
+
+def test_search_busparamstq_memoized():
+    kwargs = dict(clk_freq=80_000_000, limits=_limits(), target_bitrate=250_000, target_sample_point=75)
+    first = canlib.busparams.search_busparamstq(**kwargs)
+    second = canlib.busparams.search_busparamstq(**kwargs)
+    assert [c.nominal for c in first] == [c.nominal for c in second]
+    # Each call returns new BusParamsTq objects that may be modified
+    assert first[0].nominal is not second[0].nominal
+
+
+def test_search_busparamstq_no_match():
+    limits = _limits()
+    limits.arbitration_max.prescaler = 1
+    assert canlib.busparams.search_busparamstq(80_000_000, limits, 10_000, 80) == []
+
+
+def test_iter_busparamstq():
+    clk_freq = 80_000_000
+    limits = _limits(prop_max=64)
+    params = list(canlib.busparams.iter_busparamstq(clk_freq, limits, 1_000_000, max_bitrate_error=0))
+    assert params
+    for param in params:
+        limits.validate(param)
+        assert param.bitrate(clk_freq) == 1_000_000
+    assert len({str(param) for param in params}) == len(params)
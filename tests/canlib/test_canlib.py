@@ -225,6 +225,46 @@ def test_channeldata_attribute(channel_no, channeldata_attribute):
             raise
 
 
+def test_channeldata_static_cache(monkeypatch):
+    reads = []
+
+    def raw(self, item, ctype=None):
+        reads.append(item)
+        if item == canlib.ChannelDataItem.CARD_SERIAL_NO:
+            return 1234
+        return 0x20
+
+    monkeypatch.setattr(canlib.ChannelData, 'raw', raw)
+    channel_number = 1000  # Not used by any real device
+    channeldata = canlib.ChannelData(channel_number)
+    assert channeldata.card_serial_no == 1234
+    assert canlib.ChannelData(channel_number).card_serial_no == 1234
+    assert reads == [canlib.ChannelDataItem.CARD_SERIAL_NO]
+
+    # Dynamic attributes are always read
+    channeldata.channel_flags
+    channeldata.channel_flags
+    assert reads.count(canlib.ChannelDataItem.CHANNEL_FLAGS) == 2
+
+    # Unless caching is turned off
+    canlib.ChannelData(channel_number, cache=False).card_serial_no
+    assert reads.count(canlib.ChannelDataItem.CARD_SERIAL_NO) == 2
+
+    canlib.enumerate_hardware()
+    channeldata.card_serial_no
+    assert reads.count(canlib.ChannelDataItem.CARD_SERIAL_NO) == 3
+
+
+def test_channeldata_snapshot(channel_no):
+    channeldata = canlib.ChannelData(channel_no)
+    snapshot = channeldata.snapshot()
+    assert snapshot['card_upc_no'] == channeldata.card_upc_no
+    assert snapshot['card_serial_no'] == channeldata.card_serial_no
+    assert snapshot['channel_flags'] == channeldata.channel_flags
+    assert snapshot['channel_name'] == channeldata.channel_name
+    assert snapshot['custom_name'] == channeldata.custom_name
+
+
 def test_handle_data(chA):
     WINONLY = (
         'bus_type',
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from canlib import Frame, canlib
+from loopback import LoopbackChannel
+
+EXT = canlib.MessageFlag.EXT
+
+
+def test_routing():
+    dispatcher = canlib.Dispatcher()
+    calls = []
+    exact = dispatcher.subscribe(0x123, callback=calls.append)
+    ranged = dispatcher.subscribe([range(0x200, 0x210), 0x300])
+    extended = dispatcher.subscribe((0x18FF0000, 0x18FFFFFF), extended=True)
+    odd = dispatcher.subscribe(predicate=lambda frame: frame.data[:1] == b'\x01')
+    frames = [
+        Frame(0x123, b'\x00'),
+        Frame(0x205, b'\x01'),
+        Frame(0x300, b'\x00'),
+        Frame(0x210, b'\x00'),
+        Frame(0x123, b'\x00', flags=EXT),
+        Frame(0x18FF1234, b'\x01', flags=EXT),
+    ]
+    dispatcher.dispatch(frames)
+    assert calls == [frames[0]]
+    assert [ranged.get(), ranged.get()] == [frames[1], frames[2]]
+    assert extended.get() == frames[5]
+    assert [odd.get(), odd.get()] == [frames[1], frames[5]]
+    for subscription in (ranged, extended, odd):
+        with pytest.raises(canlib.CanNoMsg):
+            subscription.get()
+    assert exact.stats.delivered == 1
+    assert ranged.stats.frames == 2
+    assert dispatcher.stats == (6, 1, 6)
+
+    # Routes are rebuilt when subscriptions change
+    exact.close()
+    both = dispatcher.subscribe(0x123, predicate=lambda frame: frame.dlc == 2)
+    dispatcher.dispatch([Frame(0x123, b'\x00'), Frame(0x123, b'\x00\x00')])
+    assert len(calls) == 1
+    assert both.get().dlc == 2
+    assert both.stats.frames == 1
+    assert dispatcher.subscriptions == [ranged, extended, odd, both]
+
+    with pytest.raises(ValueError):
+        dispatcher.subscribe(0x800)
+    with pytest.raises(ValueError):
+        dispatcher.subscribe(0x100, threaded=True)
+
+
+def test_drops():
+    dispatcher = canlib.Dispatcher()
+    subscription = dispatcher.subscribe(0x100, maxlen=3)
+    dispatcher.dispatch([Frame(0x100, bytes([i])) for i in range(5)])
+    stats = subscription.stats
+    assert stats.dropped == 2
+    assert stats.pending == 3
+    assert subscription.get().data == b'\x02'
+
+
+def test_channel():
+    ch_node, ch_app = LoopbackChannel.pair()
+    with canlib.Dispatcher(ch_app) as dispatcher:
+        queued = dispatcher.subscribe(0x100)
+        received = []
+        done = threading.Event()
+
+        def slow(frame):
+            time.sleep(0.001)
+            received.append(frame.data[0])
+            if len(received) == 50:
+                done.set()
+
+        threaded = dispatcher.subscribe(0x200, callback=slow, threaded=True)
+        for i in range(50):
+            ch_node.write_raw(0x100, bytes([i]))
+            ch_node.write_raw(0x200, bytes([i]))
+        assert [queued.get(timeout=1000).data[0] for i in range(50)] == list(range(50))
+        assert done.wait(5)
+    # Frames are handled in order per subscription
+    assert received == list(range(50))
+    stats = threaded.stats
+    assert stats.delivered == 50
+    assert stats.max_lag > 0
+
+
+def test_callback_error():
+    ch_node, ch_app = LoopbackChannel.pair()
+    dispatcher = canlib.Dispatcher(ch_app)
+
+    def fail(frame):
+        raise RuntimeError("handler failed")
+
+    dispatcher.subscribe(0x100, callback=fail, threaded=True)
+    dispatcher.start()
+    ch_node.write_raw(0x100, b'')
+    time.sleep(0.1)
+    with pytest.raises(RuntimeError):
+        dispatcher.stop()
+
+
+@pytest.mark.slow
+def test_dispatcher_benchmark():
+    dispatcher = canlib.Dispatcher()
+    sink = []
+    for id_ in range(0, 0x800, 8):
+        dispatcher.subscribe(id_, callback=sink.append)
+    dispatcher.subscribe(range(0x400, 0x500))
+    dispatcher.subscribe(predicate=lambda frame: frame.id == 0x7FF)
+    frames = [Frame(i & 0x7FF, b'\x00') for i in range(100000)]
+    start = time.perf_counter()
+    for i in range(0, len(frames), 256):
+        dispatcher.dispatch(frames[i:i + 256])
+    elapsed = time.perf_counter() - start
+    print(f"{len(frames) / elapsed:.0f} frames/s, {len(dispatcher.subscriptions)} subscriptions")
+    assert len(sink) == len(frames) // 8
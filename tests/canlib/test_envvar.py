@@ -12,10 +12,11 @@
 
 import math
 import struct
+import time
 
 import pytest
 
-from canlib import Frame
+from canlib import Frame, canlib
 
 INT_VALUES = [15, 0, -255, 256, -1, 2147483647, -2147483648]
 FLOAT_VALUES = [
@@ -93,3 +94,297 @@ def test_read_FloatVal(envvar_t, pycan_ch, value):
 
     # Check expected value
     assert value == envvar_t.envvar.FloatVal
+
+
+class _FakeEnvvarChannel:
+    """Channel with envvars IntVal, FloatVal and DataVal, counting transfers"""
+
+    def __init__(self):
+        self.types = {
+            'IntVal': canlib.EnvVarType.INT,
+            'FloatVal': canlib.EnvVarType.FLOAT,
+            'DataVal': canlib.EnvVarType.STRING,
+        }
+        self.values = [0, 0.0, bytearray(64)]
+        self.calls = []
+
+    def scriptEnvvarOpen(self, name):
+        self.calls.append(('open', name))
+        handle = list(self.types).index(name)
+        size = 64 if name == 'DataVal' else 4
+        return handle, self.types[name], size
+
+    def scriptEnvvarGetInt(self, handle):
+        self.calls.append(('get', handle))
+        return self.values[handle]
+
+    scriptEnvvarGetFloat = scriptEnvvarGetInt
+
+    def scriptEnvvarSetInt(self, handle, value):
+        self.calls.append(('set', handle))
+        self.values[handle] = value
+
+    scriptEnvvarSetFloat = scriptEnvvarSetInt
+
+    def script_envvar_get_data(self, handle, len, start=0):
+        self.calls.append(('get_data', start, len))
+        return bytes(self.values[handle][start:start + len])
+
+    def script_envvar_set_data(self, handle, value, len, start=0):
+        self.calls.append(('set_data', start, len))
+        self.values[handle][start:start + len] = value
+
+
+def test_envvar_opened_once():
+    channel = _FakeEnvvarChannel()
+    envvar = canlib.EnvVar(channel)
+    envvar.IntVal = 7
+    assert envvar.IntVal == 7
+    assert envvar.IntVal == 7
+    assert channel.calls == [('open', 'IntVal'), ('set', 0), ('get', 0), ('get', 0)]
+    with pytest.raises(ValueError):
+        envvar.DataVal = b'too short'
+
+
+def test_read_write_envvars():
+    channel = _FakeEnvvarChannel()
+    envvar = canlib.EnvVar(channel)
+    data = b'abc'.ljust(64, b'\0')
+    canlib.write_envvars(envvar, {'IntVal': 3, 'FloatVal': 1.5, 'DataVal': data})
+    values = canlib.read_envvars(envvar, ['DataVal', 'IntVal', 'FloatVal'])
+    assert values == {'DataVal': data, 'IntVal': 3, 'FloatVal': 1.5}
+    assert list(values) == ['DataVal', 'IntVal', 'FloatVal']
+
+
+def test_envvar_mirror():
+    channel = _FakeEnvvarChannel()
+    envvar = canlib.EnvVar(channel)
+    mirror = canlib.EnvVarMirror(envvar, ['IntVal', 'FloatVal', 'DataVal'])
+    assert len(mirror) == 3
+    assert mirror['IntVal'] == 0
+    assert mirror['DataVal'] == bytes(64)
+    assert mirror.dirty == []
+
+    channel.calls = []
+    mirror['IntVal'] += 5
+    mirror['DataVal'][3:6] = b'old'
+    mirror['DataVal'][5:8] = b'xyz'
+    mirror['DataVal'][20] = ord('!')
+    assert channel.calls == []
+    assert mirror.dirty == ['IntVal', 'DataVal']
+    assert mirror['DataVal'].dirty_ranges() == [(3, 8), (20, 21)]
+    with pytest.raises(ValueError):
+        mirror['DataVal'][0:2] = b'abc'
+
+    # Data is written in full by default, BLB-1104
+    assert mirror.push() == ['IntVal', 'DataVal']
+    assert channel.calls == [('set', 0), ('set_data', 0, 64)]
+    assert channel.values[0] == 5
+    assert bytes(channel.values[2][:8]) == b'\0\0\0olxyz'
+    assert mirror.dirty == []
+    assert mirror.push() == []
+
+
+def test_envvar_mirror_partial_writes():
+    channel = _FakeEnvvarChannel()
+    envvar = canlib.EnvVar(channel)
+    mirror = canlib.EnvVarMirror(envvar, ['DataVal'], partial_writes=True)
+    mirror['DataVal'][3:6] = b'old'
+    mirror['DataVal'][60:] = b'end!'
+    channel.calls = []
+    mirror.push()
+    assert channel.calls == [('set_data', 3, 3), ('set_data', 60, 4)]
+    assert bytes(channel.values[2][60:]) == b'end!'
+
+    # Local changes are lost when pulling
+    mirror['DataVal'][0] = ord('x')
+    channel.values[2][1:2] = b'y'
+    mirror.pull()
+    assert mirror['DataVal'][:2] == b'\0y'
+    assert mirror.dirty == []
+
+
+class _SimulatedScript:
+    """Channel with the envvars of examples/mailbox.t and a t program peer
+
+    The peer follows mailbox.t: it consumes chunks on the key event and
+    echoes each message back, sending whatever did not fit when the host
+    returns credits.
+
+    """
+
+    SIZE = 4096
+    SLOT_SIZE = 512
+    HEADER = struct.Struct('<IHBB')
+
+    def __init__(self, consume=True):
+        self.consume = consume
+        self.types = {}
+        self.values = {}
+        for name, type_ in [
+            ('MbxDown', canlib.EnvVarType.STRING),
+            ('MbxDownAck', canlib.EnvVarType.INT),
+            ('MbxUp', canlib.EnvVarType.STRING),
+            ('MbxUpHead', canlib.EnvVarType.INT),
+            ('MbxUpAck', canlib.EnvVarType.INT),
+        ]:
+            self.types[name] = type_
+            self.values[name] = bytearray(self.SIZE) if type_ == canlib.EnvVarType.STRING else 1
+        self.names = list(self.types)
+        self.envvar = canlib.EnvVar(self)
+        self.window = self.SIZE // self.SLOT_SIZE
+        self.down_seq = self.up_seq = 1
+        self.parts = None
+        self.outbox = []
+
+    def scriptEnvvarOpen(self, name):
+        type_ = self.types[name]
+        size = self.SIZE if type_ == canlib.EnvVarType.STRING else 4
+        return self.names.index(name), type_, size
+
+    def scriptEnvvarGetInt(self, handle):
+        return self.values[self.names[handle]]
+
+    def scriptEnvvarSetInt(self, handle, value):
+        name = self.names[handle]
+        self.values[name] = value
+        if name == 'MbxUpAck':
+            self._send_outbox()
+
+    def script_envvar_get_data(self, handle, len, start=0):
+        return bytes(self.values[self.names[handle]][start:start + len])
+
+    def script_envvar_set_data(self, handle, value, len, start=0):
+        self.values[self.names[handle]][start:start + len] = value
+
+    def scriptSendEvent(self, slotNo=0, eventType=1, eventNo=None, data=0):
+        assert eventNo == ord('M')
+        if self.consume:
+            self._poll()
+
+    def _poll(self):
+        down = self.values['MbxDown']
+        while True:
+            start = (self.down_seq % self.window) * self.SLOT_SIZE
+            seq, length, flags, _ = self.HEADER.unpack_from(down, start)
+            if seq != self.down_seq:
+                break
+            if flags & 0x01:
+                self.parts = []
+            start += self.HEADER.size
+            self.parts.append(bytes(down[start:start + length]))
+            self.down_seq += 1
+            if flags & 0x02:
+                self.outbox.append(b''.join(self.parts))
+        self.values['MbxDownAck'] = self.down_seq
+        self._send_outbox()
+
+    def _send_outbox(self):
+        payload_size = self.SLOT_SIZE - self.HEADER.size
+        while self.outbox:
+            msg = self.outbox[0]
+            chunks = max(1, -(-len(msg) // payload_size))
+            if self.up_seq + chunks - self.values['MbxUpAck'] > self.window:
+                return
+            up = self.values['MbxUp']
+            for i in range(chunks):
+                part = msg[i * payload_size:(i + 1) * payload_size]
+                flags = (0x01 if i == 0 else 0) | (0x02 if i == chunks - 1 else 0)
+                start = (self.up_seq % self.window) * self.SLOT_SIZE
+                self.HEADER.pack_into(up, start, self.up_seq, len(part), flags, 0)
+                up[start + self.HEADER.size:start + self.HEADER.size + len(part)] = part
+                self.up_seq += 1
+            self.values['MbxUpHead'] = self.up_seq
+            del self.outbox[0]
+
+
+def test_mailbox_echo():
+    script = _SimulatedScript()
+    mailbox = canlib.Mailbox(script, poll_interval=0)
+    assert mailbox.window == 8
+    messages = [b'', b'x', bytes(range(256)) * 2, b'y' * 505, bytes(3000), b'last']
+    received = []
+    for message in messages:
+        mailbox.send(message)
+        # Receive while sending, the echoes use the same credits
+        while True:
+            try:
+                received.append(mailbox.recv())
+            except canlib.CanNoMsg:
+                break
+    mailbox.flush()
+    while len(received) < len(messages):
+        received.append(mailbox.recv(timeout=100))
+    assert received == messages
+    assert mailbox.in_flight == 0
+
+    stats = mailbox.stats
+    assert stats.messages_sent == stats.messages_received == len(messages)
+    assert stats.chunks_sent == 1 + 1 + 2 + 2 + 6 + 1
+    with pytest.raises(canlib.CanNoMsg):
+        mailbox.recv()
+
+
+def test_mailbox_credits():
+    script = _SimulatedScript(consume=False)
+    mailbox = canlib.Mailbox(script, poll_interval=0)
+    # A full window is written in one transfer without waiting
+    mailbox.send(bytes(504 * 8))
+    assert mailbox.in_flight == 8
+    assert mailbox.stats.transfers == 1
+    with pytest.raises(canlib.CanTimeout):
+        mailbox.send(b'more', timeout=10)
+    with pytest.raises(canlib.CanTimeout):
+        mailbox.flush(timeout=10)
+
+    # The rest is written once the t program consumes chunks
+    script.consume = True
+    script._poll()
+    mailbox.flush()
+    assert script.down_seq == 10
+    assert mailbox.recv() == bytes(504 * 8)
+    assert mailbox.recv(timeout=100) == b'more'
+
+
+def test_mailbox_max_message():
+    script = _SimulatedScript()
+    mailbox = canlib.Mailbox(script, poll_interval=0)
+    assert mailbox.max_message == canlib.MAILBOX_MAX_MESSAGE == 8192
+    with pytest.raises(ValueError):
+        mailbox.send(bytes(8193))
+    assert mailbox.stats.messages_sent == 0
+    mailbox.send(bytes(8192))
+    mailbox.flush()
+    assert script.outbox == [bytes(8192)]
+
+
+def test_mailbox_protocol_error():
+    script = _SimulatedScript()
+    mailbox = canlib.Mailbox(script, poll_interval=0)
+    # The t program restarts and writes chunks the host did not expect
+    script.up_seq = 5
+    script.outbox.append(b'hello')
+    script._send_outbox()
+    with pytest.raises(canlib.MailboxProtocolError):
+        mailbox.recv()
+
+
+@pytest.mark.slow
+def test_mailbox_benchmark():
+    script = _SimulatedScript()
+    mailbox = canlib.Mailbox(script, poll_interval=0)
+    # The largest message that the t program can echo in one window
+    message = bytes(range(256)) * 15
+    count = 256
+    start = time.perf_counter()
+    for _ in range(count):
+        mailbox.send(message)
+        mailbox.recv(timeout=100)
+    mailbox.flush()
+    elapsed = time.perf_counter() - start
+    stats = mailbox.stats
+    print(
+        f"{2 * count * len(message) / elapsed / 1024:.0f} KiB/s both ways, "
+        f"{stats.chunks_sent / stats.transfers:.1f} chunks per transfer"
+    )
+    assert stats.messages_received == count
@@ -1,3 +1,7 @@
+import collections
+import time
+import types
+
 import pytest
 from conftest import winonly
 from kvprobe import features
@@ -196,3 +200,65 @@ def test_config_issubset(iopin_no):
             assert not config.issubset(config_spec)
             config_spec = [iopin.AddonModule(module_type=iopin.ModuleType.INTERNAL)]
             assert config.issubset(config_spec)
+
+
+def _fake_io_pins(monkeypatch):
+    reads = collections.Counter()
+
+    def get_digital(handle, pin, ref):
+        # Pin 1 toggles every 10 reads, independent of timing, pin 0 is always high
+        ref._obj.value = reads[pin] // 10 % 2 if pin == 1 else 1
+        reads[pin] += 1
+
+    def get_analog(handle, pin, ref):
+        ref._obj.value = 2.5
+
+    monkeypatch.setattr(
+        iopin,
+        'dll',
+        types.SimpleNamespace(kvIoPinGetDigital=get_digital, kvIoPinGetAnalog=get_analog),
+    )
+    channel = types.SimpleNamespace(handle=0, readTimer=lambda: 0, reads=reads)
+    pins = [iopin.DigitalIn(channel, 0), iopin.DigitalIn(channel, 1), iopin.AnalogIn(channel, 2)]
+    return channel, pins
+
+
+def test_io_sampler(monkeypatch):
+    channel, pins = _fake_io_pins(monkeypatch)
+    with iopin.IoSampler(channel, pins, rate=1000, capacity=100) as sampler:
+        time.sleep(0.05)
+        first = sampler.samples()
+        time.sleep(0.2)
+    second = sampler.samples()
+
+    assert set(first.values) == {0, 1, 2}
+    # The buffer only holds 100 samples
+    assert len(second.timestamps) == 100
+    assert second.overwritten > 0
+    assert (
+        len(first.timestamps) + len(second.timestamps) + second.overwritten
+        == sampler.stats.samples
+    )
+    assert all(value == 2.5 for value in second.values[2])
+    timestamps = second.timestamps
+    assert all(b > a for a, b in zip(timestamps, timestamps[1:]))
+    assert len(sampler.samples().timestamps) == 0
+
+
+def test_io_sampler_change_only(monkeypatch):
+    channel, pins = _fake_io_pins(monkeypatch)
+    seen = []
+    with iopin.IoSampler(channel, pins, rate=1000, change_only=True, on_change=seen.append) as sampler:
+        deadline = time.perf_counter() + 10
+        while sampler.stats.samples < 50 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    transitions = sampler.transitions()
+
+    assert transitions == seen
+    assert set(sampler.samples().values) == {2}
+    assert [transition.pin for transition in transitions[:2]] == [0, 1]
+    assert [t.value for t in transitions if t.pin == 0] == [1]
+    # The first sample, then a transition every 10 samples
+    values = [t.value for t in transitions if t.pin == 1]
+    assert len(values) == 1 + (channel.reads[1] - 1) // 10 >= 5
+    assert values == [i % 2 for i in range(len(values))]
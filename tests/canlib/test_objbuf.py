@@ -20,6 +20,134 @@ def test_message_filter():
     assert msg_filter(id_0)
     assert not msg_filter(id_1)
 
+
+class FakeObjBufChannel:
+    """Channel with a limited number of simulated object buffers."""
+
+    class Buffer:
+        def __init__(self, ch, kind, frame):
+            self.ch = ch
+            self.kind = kind
+            self.frame = frame
+            self.enabled = False
+
+        def enable(self):
+            self.enabled = True
+
+        def set_frame(self, frame):
+            if frame.id in self.ch.rejected:
+                raise RuntimeError("canObjBufWrite failed")
+            self.frame = frame
+
+        def set_filter(self, filter):
+            self.filter = filter
+
+        def set_rtr_only(self, value):
+            self.rtr_only = value
+
+        def free(self):
+            self.ch.allocated.remove(self)
+
+    def __init__(self, periodic=MAX_NUM_PERIODIC_BUFFERS, response=MAX_NUM_RESPONSE_BUFFERS):
+        self.limits = {'periodic': periodic, 'response': response}
+        self.allocated = []
+        # Identifiers of frames the buffers fail to be set up with
+        self.rejected = set()
+
+    def _allocate(self, kind, frame):
+        if sum(b.kind == kind for b in self.allocated) == self.limits[kind]:
+            raise canlib.CanOutOfMemory()
+        buffer = self.Buffer(self, kind, frame)
+        self.allocated.append(buffer)
+        return buffer
+
+    def allocate_periodic_objbuf(self, period_us, frame):
+        return self._allocate('periodic', frame)
+
+    def allocate_response_objbuf(self, filter, frame, rtr_only=False):
+        return self._allocate('response', frame)
+
+    def free_objbuf(self):
+        self.allocated = []
+
+
+def test_pool_periodic():
+    """The periodic messages with the shortest period get the buffers."""
+    ch = FakeObjBufChannel(periodic=3)
+    pool = objbuf.Pool(ch)
+    assert pool.capacity == (3, MAX_NUM_RESPONSE_BUFFERS)
+    assert ch.allocated == []
+    slow = [pool.add_periodic(Frame(id_=i, data=[i]), period_us=100_000) for i in range(3)]
+    assert all(m.hardware for m in slow)
+    fast = pool.add_periodic(Frame(id_=10, data=[]), period_us=10_000)
+    jittery = pool.add_periodic(Frame(id_=11, data=[]), period_us=1_000_000, max_jitter_us=50)
+    assert fast.hardware and jittery.hardware
+    assert pool.refused == slow[1:]
+    assert all(b.enabled for b in ch.allocated)
+
+    # Removing a message gives its buffer to the next one waiting
+    pool.remove(fast)
+    assert pool.refused == slow[2:]
+    assert len(ch.allocated) == 3
+
+    jittery.set_frame(Frame(id_=11, data=[1]))
+    assert jittery.buffer.frame.data == bytearray([1])
+    pool.close()
+    assert ch.allocated == []
+    assert pool.messages == []
+
+
+def test_pool_setup_failure():
+    """A buffer that can not be set up is freed, and the message is not kept."""
+    ch = FakeObjBufChannel(periodic=2, response=2)
+    pool = objbuf.Pool(ch)
+    first = pool.add_periodic(Frame(id_=1, data=[]), period_us=10_000)
+    ch.rejected.add(2)
+    with pytest.raises(RuntimeError):
+        pool.add_periodic(Frame(id_=2, data=[]), period_us=1_000)
+    assert len(ch.allocated) == 1
+    assert pool.messages == [first] and first.hardware
+    msg_filter = objbuf.MessageFilter(code=100, mask=0x7FF)
+    with pytest.raises(RuntimeError):
+        pool.add_responses([(msg_filter, Frame(id_=3, data=[])), (msg_filter, Frame(id_=2, data=[]))])
+    assert pool.messages == [first]
+
+    # The pool still works
+    response = pool.add_response(msg_filter, Frame(id_=4, data=[]))
+    second = pool.add_periodic(Frame(id_=5, data=[]), period_us=10_000)
+    assert response.hardware and second.hardware
+    pool.remove(first)
+    assert pool.messages == [second, response]
+    assert len(ch.allocated) == 2
+
+
+def test_pool_responses_and_scheduler():
+    """Responses are allocated in order, refused periodic messages are scheduled."""
+    ch = FakeObjBufChannel(periodic=1, response=2)
+    scheduler = canlib.TxScheduler(ch)
+    pool = objbuf.Pool(ch, scheduler=scheduler)
+    msg_filter = objbuf.MessageFilter(code=100, mask=0x7FF)
+    responses = pool.add_responses([(msg_filter, Frame(id_=200 + i, data=[])) for i in range(3)])
+    assert [m.hardware for m in responses] == [True, True, False]
+    slow = pool.add_periodic(Frame(id_=1, data=[]), period_us=100_000)
+    assert slow.hardware and slow.software is None
+    fast = pool.add_periodic(Frame(id_=2, data=[]), period_us=10_000)
+    assert fast.hardware
+    assert not slow.hardware
+    assert [m.frame.id for m in scheduler.messages] == [1]
+    assert slow.software.period_us == 100_000
+    pool.remove(fast)
+    assert slow.hardware and scheduler.messages == []
+    assert pool.refused == [responses[2]]
+
+    # Devices without object buffers send everything from the scheduler
+    pool = objbuf.Pool(FakeObjBufChannel(0, 0), scheduler=scheduler)
+    message = pool.add_periodic(Frame(id_=3, data=[]), period_us=10_000)
+    assert not message.hardware and message.software in scheduler.messages
+    pool.close()
+    assert scheduler.messages == []
+
+
 @pytest.fixture(scope="module")
 def chA_no(kvprobe):
     """Return an object buffer capable channel with atleast one listener."""
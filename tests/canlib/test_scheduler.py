@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from canlib import Frame, canlib
+from canlib.canlib.exceptions import CanOverflowError
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.written = []
+
+    def write_raw(self, id_, msg, flag=0, dlc=None):
+        self.written.append((time.perf_counter(), id_, bytes(msg)))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def ids_written(channel, id_):
+    return [msg for _, i, msg in channel.written if i == id_]
+
+
+def test_periods():
+    channel = RecordingChannel()
+    with canlib.TxScheduler(channel) as scheduler:
+        fast = scheduler.add(Frame(0x100, b'\x01'), period_us=10000)
+        slow = scheduler.add(Frame(0x200, b'\x02'), period_us=50000, offset_us=5000)
+        wait_for(lambda: fast.stats.sent >= 20 and slow.stats.sent >= 2)
+    fast_times = [t for t, id_, _ in channel.written if id_ == 0x100]
+    # Deadlines are kept from the start, so frames are never sent more often
+    # than the period, however late some of them are
+    mean = (fast_times[-1] - fast_times[0]) / (len(fast_times) - 1)
+    assert mean >= 0.009
+    assert fast.stats.sent == len(fast_times)
+    assert slow.stats.sent == len(ids_written(channel, 0x200))
+    assert slow.stats.max_jitter_us >= slow.stats.mean_jitter_us
+    assert scheduler.stats.frames == len(channel.written)
+
+
+def test_update_and_stop():
+    channel = RecordingChannel()
+    scheduler = canlib.TxScheduler(channel)
+    message = scheduler.add(Frame(0x100, b'\x01'), period_us=5000)
+    stopped = scheduler.add(Frame(0x200, b'\x02'), period_us=5000, start=False)
+    assert message.running and not stopped.running
+    with scheduler:
+        wait_for(lambda: message.stats.sent >= 1)
+        message.set_data(b'\x02\x03')
+        wait_for(lambda: ids_written(channel, 0x100)[-1] == b'\x02\x03')
+        message.stop()
+        stopped.start()
+        wait_for(lambda: stopped.stats.sent >= 1)
+        scheduler.remove(stopped)
+    # Stopped before counting, since a tick may already have collected the
+    # frames due when the message was stopped or removed
+    count = len(channel.written)
+    with scheduler:
+        time.sleep(0.02)
+    assert len(channel.written) == count
+    assert ids_written(channel, 0x100)[0] == b'\x01'
+    assert message.frame == Frame(0x100, b'\x02\x03')
+    assert not message.running
+    assert scheduler.messages == [message]
+
+    with pytest.raises(ValueError):
+        message.set_period(0)
+
+
+def test_missed_periods():
+    class SlowChannel(RecordingChannel):
+        def write_raw(self, id_, msg, flag=0, dlc=None):
+            super().write_raw(id_, msg, flag, dlc)
+            time.sleep(0.025)
+
+    scheduler = canlib.TxScheduler(SlowChannel())
+    message = scheduler.add(Frame(0x100, b''), period_us=10000)
+    with scheduler:
+        time.sleep(0.1)
+    stats = message.stats
+    assert stats.missed >= 4
+    # Late frames are sent once, not in a burst
+    assert stats.sent <= 5
+
+
+def test_overflow():
+    class FullChannel(RecordingChannel):
+        """Transmit buffer full for every other frame"""
+
+        calls = 0
+
+        def write_raw(self, id_, msg, flag=0, dlc=None):
+            self.calls += 1
+            if self.calls % 2 == 0:
+                raise CanOverflowError()
+            super().write_raw(id_, msg, flag, dlc)
+
+    channel = FullChannel()
+    scheduler = canlib.TxScheduler(channel)
+    message = scheduler.add(Frame(0x100, b''), period_us=5000)
+    with scheduler:
+        time.sleep(0.1)
+        # The scheduler keeps running
+        assert scheduler._thread.is_alive()
+    stats = message.stats
+    assert stats.sent == len(channel.written)
+    assert stats.missed >= channel.calls // 2
+    assert scheduler.stats.overflows == channel.calls // 2
+    assert scheduler.stats.frames == stats.sent
+
+
+def test_write_error():
+    class FailingChannel:
+        def write_raw(self, id_, msg, flag=0, dlc=None):
+            raise RuntimeError("bus off")
+
+    scheduler = canlib.TxScheduler(FailingChannel())
+    scheduler.add(Frame(0x100, b''), period_us=1000)
+    scheduler.start()
+    time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        scheduler.stop()
+
+
+@pytest.mark.slow
+def test_scheduler_benchmark():
+    """400 messages with periods from 10 ms to 1 s, as in a rest-bus simulation"""
+
+    class CountingChannel:
+        written = 0
+
+        def write_raw(self, id_, msg, flag=0, dlc=None):
+            self.written += 1
+
+    channel = CountingChannel()
+    scheduler = canlib.TxScheduler(channel)
+    periods = [10000, 20000, 50000, 100000, 200000, 500000, 1000000]
+    messages = [
+        scheduler.add(Frame(i, bytes(8)), period_us=periods[i % len(periods)],
+                      offset_us=(i * 97) % 10000)
+        for i in range(400)
+    ]
+    with scheduler:
+        time.sleep(2)
+    jitter = [m.stats for m in messages]
+    mean = sum(s.mean_jitter_us for s in jitter) / len(jitter)
+    worst = max(s.max_jitter_us for s in jitter)
+    missed = sum(s.missed for s in jitter)
+    print(f"{channel.written / 2:.0f} frames/s, mean jitter {mean:.0f} us, "
+          f"max jitter {worst:.0f} us, {missed} missed periods")
+    assert sum(s.sent for s in jitter) == channel.written
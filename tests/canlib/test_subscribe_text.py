@@ -1,10 +1,13 @@
+import asyncio
 import os
 import pytest
+import threading
 import time
 
 from tscript_wrap import ScriptRunner
 
 from canlib import canlib
+from canlib.canlib import ScriptText
 
 BITRATE = canlib.canBITRATE_1M
 CHANNEL_FLAGS = 0
@@ -17,3 +20,87 @@ def test_subscribe(script_no, datadir):
     with ScriptRunner(script_no, script_fp=tscript_path, slot=0) as envvar_t:
         time.sleep(5)
         envvar_t.print_output()
+
+
+class _FakeTextChannel:
+    def __init__(self):
+        self.texts = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def print(self, slot, text, flags=0):
+        with self.lock:
+            self.texts.append(ScriptText(text, slot, len(self.texts), canlib.Stat(flags)))
+
+    def scriptRequestText(self, slot, request=canlib.ScriptRequest.SUBSCRIBE):
+        self.requests.append((slot, request))
+
+    def scriptGetText(self):
+        with self.lock:
+            if not self.texts:
+                raise canlib.CanNoMsg()
+            return self.texts.pop(0)
+
+
+def test_text_stream():
+    ch = _FakeTextChannel()
+    ch.print(0, 'first\n')
+    ch.print(1, 'two\nlines\n')
+    with canlib.ScriptTextStream(ch, slots=[0, 1], poll_interval=0.001) as stream:
+        assert ch.requests == [(0, canlib.ScriptRequest.SUBSCRIBE), (1, canlib.ScriptRequest.SUBSCRIBE)]
+        ch.print(0, 'lost some', flags=canlib.Stat.SW_OVERRUN)
+        lines = [stream.read(timeout=1000) for _ in range(4)]
+        with pytest.raises(canlib.CanNoMsg):
+            stream.read(timeout=10)
+        ch.print(1, 'last')
+    assert ch.requests[2:] == [(0, canlib.ScriptRequest.UNSUBSCRIBE), (1, canlib.ScriptRequest.UNSUBSCRIBE)]
+    # Text printed before stopping is still read
+    lines.extend(stream)
+    assert [(line.slot, line.text) for line in lines] == [
+        (0, 'first'), (1, 'two'), (1, 'lines'), (0, 'lost some'), (1, 'last')
+    ]
+    assert lines[1].time == lines[2].time
+    assert stream.stats.lines == 5
+    assert stream.stats.overruns == 1
+    assert stream.stats.dropped == 0
+
+
+def test_text_stream_bounded():
+    ch = _FakeTextChannel()
+    for i in range(10):
+        ch.print(0, str(i))
+    stream = canlib.ScriptTextStream(ch, maxlen=4, burst=3)
+    stream.start()
+    stream.stop()
+    assert [line.text for line in stream] == ['6', '7', '8', '9']
+    assert stream.stats.dropped == 6
+    assert ch.requests[0] == (canlib.ScriptRequest.ALL_SLOTS, canlib.ScriptRequest.SUBSCRIBE)
+
+
+def test_text_stream_callback():
+    ch = _FakeTextChannel()
+    seen = []
+    with canlib.ScriptTextStream(ch, callback=seen.append, poll_interval=0.001) as stream:
+        ch.print(2, 'hello')
+        time.sleep(0.05)
+    assert [(line.slot, line.text) for line in seen] == [(2, 'hello')]
+    with pytest.raises(canlib.CanNoMsg):
+        stream.read()
+
+
+def test_text_stream_async():
+    ch = _FakeTextChannel()
+
+    async def collect(stream):
+        lines = []
+        async for line in stream:
+            lines.append(line.text)
+            if len(lines) == 3:
+                break
+        return lines
+
+    with canlib.ScriptTextStream(ch, poll_interval=0.001) as stream:
+        timer = threading.Timer(0.05, lambda: [ch.print(0, text) for text in 'abc'])
+        timer.start()
+        assert asyncio.get_event_loop().run_until_complete(collect(stream)) == ['a', 'b', 'c']
+        timer.join()
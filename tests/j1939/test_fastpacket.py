@@ -0,0 +1,96 @@
+import random
+import time
+
+import pytest
+
+from canlib import Frame, canlib, j1939
+
+EXT = canlib.MessageFlag.EXT
+GNSS_POSITION = 129029
+
+
+def fast_packet_frames(data, seq=0, pgn=GNSS_POSITION, sa=0x23):
+    """Split data into fast-packet frames"""
+    can_id = j1939.encode_id(pgn, sa, p=3)
+    frames = [Frame(can_id, bytes((seq << 5, len(data))) + data[:6], flags=EXT)]
+    for counter, offset in enumerate(range(6, len(data), 7), start=1):
+        chunk = data[offset:offset + 7]
+        frames.append(Frame(can_id, bytes(((seq << 5) | counter,)) + chunk, flags=EXT))
+    return frames
+
+
+@pytest.mark.parametrize('length', [0, 5, 6, 7, 13, 14, 43, 223])
+def test_reassembly(length):
+    assembler = j1939.FastPacketAssembler()
+    data = bytes(range(length))
+    frames = fast_packet_frames(data, seq=5)
+    results = [assembler.process(frame) for frame in frames]
+    assert results[:-1] == [None] * (len(frames) - 1)
+    message = results[-1]
+    assert message.data == data
+    assert message.id == frames[0].id
+    assert message.flags == EXT
+    assert assembler.stats.messages == 1
+    assert assembler.sessions == 0
+
+    other = Frame(j1939.encode_id(0xFEE3, 0x00), bytes(8), flags=EXT)
+    assert assembler.process(other) is other
+
+
+def test_interleaved_and_out_of_order():
+    assembler = j1939.FastPacketAssembler()
+    messages = {
+        (sa, seq): bytes(random.randrange(256) for _ in range(43))
+        for sa in (0x10, 0x11) for seq in (1, 2)
+    }
+    frames = [
+        fast_packet_frames(data, seq=seq, sa=sa) for (sa, seq), data in messages.items()
+    ]
+    # Swap the last two frames of the first message
+    frames[0][-1], frames[0][-2] = frames[0][-2], frames[0][-1]
+    received = {}
+    for batch in zip(*frames):
+        for frame in batch:
+            message = assembler.process(frame)
+            if message is not None:
+                received[message.id & 0xFF, bytes(message.data)] = True
+    assert set(received) == {(sa, data) for (sa, _), data in messages.items()}
+    assert assembler.stats.messages == 4
+    assert assembler.stats.out_of_order == 1
+
+
+def test_lost_frames():
+    assembler = j1939.FastPacketAssembler()
+    data = bytes(range(30))
+    frames = fast_packet_frames(data, seq=3)
+    for frame in frames[:2] + frames[3:]:
+        assert assembler.process(frame) is None
+    assert assembler.sessions == 1
+    # The next message using the same sequence id replaces the incomplete one
+    for frame in frames:
+        message = assembler.process(frame)
+    assert message.data == data
+    stats = assembler.stats
+    assert (stats.messages, stats.incomplete, stats.orphans) == (1, 1, 0)
+
+    # First frame lost, and a repeated frame
+    assert assembler.process(frames[1]) is None
+    for frame in frames[:2]:
+        assembler.process(frame)
+    assembler.process(frames[1])
+    assert assembler.stats.orphans == 2
+
+
+@pytest.mark.slow
+def test_fastpacket_benchmark():
+    assembler = j1939.FastPacketAssembler()
+    frames = []
+    for i in range(2000):
+        frames.extend(fast_packet_frames(bytes(43), seq=i % 8, sa=i % 50))
+    start = time.perf_counter()
+    process = assembler.process
+    for frame in frames:
+        process(frame)
+    elapsed = time.perf_counter() - start
+    print(f"{len(frames) / elapsed:.0f} frames/s")
+    assert assembler.stats.messages == 2000
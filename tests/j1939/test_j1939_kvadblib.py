@@ -6,6 +6,7 @@ import source_frames_v5_1 as source_frames
 from canlib import j1939
 from canlib import kvadblib
 from canlib import canlib
+from canlib import Frame
 
 DBC_FILE_NEW_FORMAT = pathlib.Path(__file__).parent.absolute() / "j1939_new_format_sample.dbc"
 DBC_FILE_OLD_FORMAT = pathlib.Path(__file__).parent.absolute() / "j1939_old_format_sample.dbc"
@@ -139,3 +140,19 @@ def test_can_old_dbc(info_frame):
         else:
             with pytest.raises(kvadblib.KvdNoMessage):
                 dbc.get_message_by_id(can_id, flags)
+
+
+def test_j1939_interpret_fast_packet():
+    frame = next(f for info, f in source_frames.all_frames if info[0] == 'JLCM pgn=0x9900')
+    assembler = j1939.FastPacketAssembler(pgns=[0x9900])
+    data = bytes(frame.data)
+    frames = [
+        Frame(frame.id, bytes((0x40, len(data))) + data[:6], flags=frame.flags),
+        Frame(frame.id, bytes((0x41,)) + data[6:], flags=frame.flags),
+    ]
+    with kvadblib.Dbc(str(DBC_FILE_NEW_FORMAT)) as dbc:
+        expected = dbc.interpret(frame, j1939=True)
+        assert dbc.interpret(frames[0], j1939=True, fast_packet=assembler) is None
+        bmsg = dbc.interpret(frames[1], j1939=True, fast_packet=assembler)
+        assert bmsg._message.name == 'JLCM'
+        assert [s.raw for s in bmsg] == [s.raw for s in expected]
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+import source_frames_v5_1 as source_frames
+
+from canlib import j1939
+
+IDS = [0x18FEE300, 0x0CEA00F9, 0x1CECFF00, 0x0C99FEFE, 0x0EEF0102, 0x1BF0FE10, 0x3FFFFFF]
+
+
+@pytest.mark.parametrize('can_id', IDS)
+def test_decode_id(can_id):
+    pdu = j1939.decode_id(can_id)
+    model = j1939.pdu_from_can_id(can_id)
+    assert (pdu.p, pdu.edp, pdu.dp, pdu.pf, pdu.ps, pdu.sa) == (
+        model.p, model.edp, model.dp, model.pf, model.ps, model.sa
+    )
+    # The pgn of the models leaves out the data page bits
+    assert pdu.pgn & 0xFFFF == model.pgn
+    assert pdu.pgn >> 16 == (pdu.edp << 1) | pdu.dp
+    assert pdu.da == (pdu.ps if pdu.pf < 240 else 0xFF)
+    assert j1939.encode_id(pdu.pgn, pdu.sa, pdu.da, pdu.p) == can_id
+    assert j1939.can_id_from_pdu(model) == can_id
+
+
+def test_pdu1_boundary():
+    # PDU format 239 (proprietary A) is PDU1, 240 is PDU2
+    assert j1939.decode_id(0x18EF0102) == (6, 0, 0, 0xEF, 0x01, 0x02, 0xEF00, 0x01)
+    assert j1939.decode_id(0x18F00102) == (6, 0, 0, 0xF0, 0x01, 0x02, 0xF001, 0xFF)
+    assert isinstance(j1939.pdu_from_can_id(0x18EF0102), j1939.Pdu1)
+
+
+def test_decode_ids():
+    ids = [frame.id for _, frame in source_frames.all_frames]
+    columns = j1939.decode_ids(ids)
+    for i, can_id in enumerate(ids):
+        pdu = j1939.decode_id(can_id)
+        assert (columns.p[i], columns.pgn[i], columns.sa[i], columns.da[i], columns.pf[i]) == (
+            pdu.p, pdu.pgn, pdu.sa, pdu.da, pdu.pf
+        )
+
+
+def test_decode_ids_numpy():
+    np = pytest.importorskip('numpy')
+    ids = np.array(IDS, dtype=np.uint32)
+    columns = j1939.decode_ids(ids)
+    expected = j1939.decode_ids(IDS)
+    for name in j1939.PduColumns._fields:
+        assert list(getattr(columns, name)) == list(getattr(expected, name))
+
+
+@pytest.mark.slow
+def test_pdu_benchmark():
+    ids = [j1939.encode_id(0xF000 + i % 300, i % 250) for i in range(100000)]
+    start = time.perf_counter()
+    pgns = [j1939.decode_id(can_id).pgn for can_id in ids]
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = j1939.decode_ids(ids)
+    columns = time.perf_counter() - start
+    start = time.perf_counter()
+    for can_id in ids[:10000]:
+        j1939.pdu_from_can_id(can_id)
+    models = (time.perf_counter() - start) * 10
+    print(
+        f"decode_id: {len(ids) / fast:.0f} ids/s, decode_ids: {len(ids) / columns:.0f} ids/s, "
+        f"pdu_from_can_id: {len(ids) / models:.0f} ids/s"
+    )
+    assert list(decoded.pgn) == pgns
+    # Conservative, the bit operations are typically well over ten times faster
+    assert fast < models
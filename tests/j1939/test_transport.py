@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from canlib import Frame, canlib, j1939
+from canlib.j1939 import transport
+from loopback import LoopbackChannel
+
+EXT = canlib.MessageFlag.EXT
+
+
+@pytest.fixture
+def nodes():
+    ch_ecu, ch_tool, ch_monitor = LoopbackChannel.bus(3)
+    with j1939.TpEngine(ch_ecu, addresses=[0x00]) as ecu, j1939.TpEngine(
+        ch_tool, addresses=[0xF9], cts_packets=4
+    ) as tool, j1939.TpEngine(ch_monitor, monitor=True) as monitor:
+        yield ecu, tool, monitor
+
+
+def test_bam(nodes):
+    ecu, tool, monitor = nodes
+    data = bytes(range(20))
+    start = time.perf_counter()
+    ecu.send(0xFECA, data)
+    # Three data frames, 50 ms apart
+    assert time.perf_counter() - start >= 0.15
+    for node in (tool, monitor):
+        message = node.recv(timeout=1000)
+        assert message == (0xFECA, 0x00, 0xFF, data)
+    written = ecu.channel.written
+    assert written[0] == (0x1CECFF00, b'\x20\x14\x00\x03\xff\xca\xfe\x00')
+    assert written[-1] == (0x1CEBFF00, b'\x03\x0e\x0f\x10\x11\x12\x13\xff')
+
+    with pytest.raises(ValueError):
+        ecu.send(0xFECA, data, destination=0xF9)
+    with pytest.raises(ValueError):
+        j1939.TpEngine(None, bam_interval=0.01)
+
+
+def test_cmdt(nodes):
+    ecu, tool, monitor = nodes
+    data = bytes(i & 0xFF for i in range(1785))
+    ecu.send(0xDA00, data, destination=0xF9)
+    assert tool.recv(timeout=1000) == (0xDA00, 0x00, 0xF9, data)
+    assert monitor.recv(timeout=1000) == (0xDA00, 0x00, 0xF9, data)
+    cts = [d for i, d in tool.channel.written if d[0] == transport.CM_CTS]
+    # 255 packets, asked for 4 at a time
+    assert len(cts) == 64
+    assert cts[1] == b'\x11\x04\x05\xff\xff\x00\xda\x00'
+    assert tool.channel.written[-1] == (0x1CEC00F9, b'\x13\xf9\x06\xff\xff\x00\xda\x00')
+
+    # Short messages are single frames
+    tool.send(0xEA00, b'\x00\xee\x00', destination=0x00)
+    assert tool.channel.written[-1] == (0x1CEA00F9, b'\x00\xee\x00')
+
+
+def test_concurrent_sessions():
+    channels = LoopbackChannel.bus(3)
+    engines = [j1939.TpEngine(ch, addresses=[sa]) for ch, sa in zip(channels, (0x00, 0x01, 0xF9))]
+    for engine in engines:
+        engine.start()
+    try:
+        messages = {0x00: bytes([1]) * 100, 0x01: bytes([2]) * 200}
+        threads = [
+            threading.Thread(target=engine.send, args=(0xDA00, messages[engine.source], 0xF9))
+            for engine in engines[:2]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        tool = engines[2]
+        received = {m.source: m.data for m in (tool.recv(1000), tool.recv(1000))}
+    finally:
+        for engine in engines:
+            engine.stop()
+    assert received == messages
+
+
+def test_abort_and_timeout(nodes):
+    ecu, tool, monitor = nodes
+    tool.max_size = 100
+    with pytest.raises(j1939.TpAbort) as excinfo:
+        ecu.send(0xDA00, bytes(101), destination=0xF9)
+    assert excinfo.value.reason == transport.ABORT_TOO_LARGE
+    assert ecu.stats.aborts_received == 1
+
+    ecu.t3 = 0.05
+    with pytest.raises(j1939.TpTimeout):
+        ecu.send(0xDA00, bytes(20), destination=0x42)
+    assert ecu.channel.written[-1][1][:2] == b'\xff\x03'
+
+    # The sender stops after the RTS
+    tool.t2 = 0.05
+    ecu.channel.write_raw(0x1CECF900, b'\x10\x14\x00\x03\xff\x00\xda\x00', EXT)
+    time.sleep(0.01)
+    assert tool.sessions == 1
+    time.sleep(0.1)
+    assert tool.sessions == 0
+    assert tool.stats.timeouts == 1
+    assert tool.channel.written[-1] == (0x1CEC00F9, b'\xff\x03\xff\xff\xff\x00\xda\x00')
+
+
+def test_bad_sequence():
+    engine = j1939.TpEngine(None)
+    engine.process(Frame(0x1CECFF00, b'\x20\x14\x00\x03\xff\xca\xfe\x00', flags=EXT))
+    engine.process(Frame(0x1CEBFF00, b'\x01' + bytes(7), flags=EXT))
+    engine.process(Frame(0x1CEBFF00, b'\x03' + bytes(7), flags=EXT))
+    assert engine.sessions == 0
+    assert engine.stats.rx_errors == 1
+    with pytest.raises(canlib.CanNoMsg):
+        engine.recv()
+
+
+@pytest.mark.slow
+def test_transport_benchmark():
+    """Interleaved BAM sessions from 250 nodes, fed straight to the engine"""
+    engine = j1939.TpEngine(None, callback=lambda message: None)
+    sources = range(250)
+    size = 1785
+    packets = 255
+    announce = [
+        Frame(0x1CECFF00 | sa, bytes((0x20, size & 0xFF, size >> 8, packets, 0xFF, 0xCA, 0xFE, 0)),
+              flags=EXT)
+        for sa in sources
+    ]
+    data = [
+        [Frame(0x1CEBFF00 | sa, bytes((seq,)) + bytes(7), flags=EXT) for sa in sources]
+        for seq in range(1, packets + 1)
+    ]
+    process = engine.process
+    start = time.perf_counter()
+    for frame in announce:
+        process(frame, start)
+    for frames in data:
+        for frame in frames:
+            process(frame, start)
+    elapsed = time.perf_counter() - start
+    frames = len(sources) * (packets + 1)
+    print(f"{frames / elapsed:.0f} frames/s, {len(sources)} concurrent sessions")
+    assert engine.stats.messages_received == len(sources)
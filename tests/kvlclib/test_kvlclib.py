@@ -1,6 +1,8 @@
 import os.path
 
-from canlib import kvlclib
+import pytest
+
+from canlib import kvlclib, kvmlib
 
 tmp_dir = "tmp"
 
@@ -136,3 +138,81 @@ def test_writer_formats():
                     print(f'\t{property!r} = {fmt.getPropertyDefault(property)}')
             else:
                 print(f'\t{property!r} is not supported')
+
+
+def test_convertAll(datadir):
+    fmt = kvlclib.WriterFormat(kvlclib.FileFormat.PLAIN_ASC)
+    converter = kvlclib.Converter(create_outfile_name("convert_all_loop", fmt), fmt)
+    setup_infile(datadir, converter)
+    setup_properties(converter)
+    num_events = 0
+    while True:
+        try:
+            converter.convertEvent()
+            num_events += 1
+        except kvlclib.KvlcEndOfFile:
+            break
+
+    converter = kvlclib.Converter(create_outfile_name("convert_all", fmt), fmt)
+    setup_infile(datadir, converter)
+    setup_properties(converter)
+    assert converter.convertAll() == num_events
+    of = converter.getOutputFilename()
+    converter.flush()
+    assert int(os.path.getsize(of)) > 0
+
+
+def test_convert_files(datadir, tmpdir):
+    inf = os.path.join(datadir, "logfile001.kme50")
+    properties = {kvlclib.Property.OVERWRITE: 1}
+    jobs = [
+        (inf, kvlclib.FileFormat.KME50, str(tmpdir.join(f"batch{i}.txt")),
+         kvlclib.FileFormat.PLAIN_ASC, properties)
+        for i in range(3)
+    ]
+    jobs.append(
+        kvlclib.ConversionJob(
+            input=os.path.join(datadir, "no_such_file.kme50"),
+            input_format=kvlclib.FileFormat.KME50,
+            output=str(tmpdir.join("missing.txt")),
+            writer_format=kvlclib.FileFormat.PLAIN_ASC,
+            properties=properties,
+        )
+    )
+
+    results = kvlclib.convert_files(jobs, processes=2)
+    assert [result.job for result in results] == [kvlclib.ConversionJob(*job) for job in jobs]
+    for result in results[:-1]:
+        assert result.error is None
+        assert result.events > 0
+        assert result.events == results[0].events
+        assert not result.truncated
+        assert not result.overrun
+        assert result.dlc_mismatch == {}
+        assert os.path.getsize(result.output) > 0
+    assert results[-1].error is not None
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_conversion_pipeline(datadir, tmpdir, threaded):
+    inf = os.path.join(datadir, "logfile001.kme50")
+    with kvmlib.openKme(inf) as kme:
+        num_events = len(list(kme))
+
+    converters = []
+    for file_format in (kvlclib.FileFormat.PLAIN_ASC, kvlclib.FileFormat.CSV):
+        fmt = kvlclib.WriterFormat(file_format)
+        converter = kvlclib.Converter(str(tmpdir.join("pipeline." + fmt.extension)), fmt)
+        converter.setProperty(kvlclib.Property.OVERWRITE, 1)
+        converters.append(converter)
+
+    with kvlclib.ConversionPipeline(converters, threaded=threaded, batch_size=100) as pipeline:
+        with kvmlib.openKme(inf) as kme1, kvmlib.openKme(inf) as kme2:
+            pipeline.run(kme1, kme2)
+
+    for summary in pipeline.summary():
+        assert summary.events == 2 * num_events
+        assert summary.batches >= 2 * num_events // 100
+        of = summary.converter.getOutputFilename()
+        summary.converter.flush()
+        assert int(os.path.getsize(of)) > 0
@@ -1,13 +1,15 @@
 import datetime
 import filecmp
 import os.path
+import time
 from pathlib import Path
 
 import pytest
-from conftest import kvdeprecated
+from conftest import kvdeprecated, linuxonly
 from kvprobe import features
 
 import canlib.kvmlib as kvmlib
+from canlib import Frame, canlib
 from canlib.frame import dlc_to_bytes
 
 # untested functions:
@@ -311,3 +313,252 @@ def test_event_equility():
 
     c = kvmlib.MessageEvent(id=5, channel=1, dlc=9)
     assert a == c
+
+
+def test_event_slots():
+    events = [
+        kvmlib.MessageEvent(id=5, channel=1, dlc=2, flags=2, data=b'\x01\x02', timestamp=10),
+        kvmlib.RTCEvent(calendartime=datetime.datetime(2024, 1, 2, 3, 4, 5), timestamp=20),
+        kvmlib.TriggerEvent(type=2, timestamp=(1 << 40) + 30, pretrigger=1, posttrigger=2, trigno=1),
+        kvmlib.VersionEvent(1, 2, 3, 4, 5, 6, 7, 8),
+    ]
+    for event in events:
+        assert not hasattr(event, '__dict__')
+        view = kvmlib.memoLogEventEx(event._asMrtEvent()).createMemoEvent(lazy=True)
+        assert not hasattr(view, '__dict__')
+        assert isinstance(view, type(event))
+        assert view == event
+        assert view.ignored == event.ignored
+        assert str(view) == str(event)
+
+
+def test_lazy_view_writes_through():
+    event = kvmlib.MessageEvent(id=5, channel=1, dlc=2, flags=2, data=b'\x01\x02', timestamp=10)
+    mle = kvmlib.memoLogEventEx(event._asMrtEvent())
+    view = mle.createMemoEvent(lazy=True)
+    view.channel = 3
+    view.data = b'\x03\x04'
+    assert mle.event.msg.channel == 3
+    assert mle.createMemoEvent().data == b'\x03\x04'
+
+
+@pytest.mark.parametrize('filename', sorted(Path(__file__).parent.parent.glob('data/**/*.kme50')))
+def test_kme_lazy_events(filename):
+    with kvmlib.openKme(str(filename)) as kme:
+        eager = list(kme.events())
+    with kvmlib.openKme(str(filename)) as kme:
+        lazy = list(kme.events(lazy=True))
+    assert eager == lazy
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('filename', sorted(Path(__file__).parent.parent.glob('data/**/*.kme50')))
+def test_kme_lazy_events_benchmark(filename):
+    import tracemalloc
+
+    results = {}
+    for lazy in (False, True):
+        tracemalloc.start()
+        start = time.perf_counter()
+        with kvmlib.openKme(str(filename)) as kme:
+            events = list(kme.events(lazy=lazy))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{filename.name} lazy={lazy}: {len(events)} events, "
+            f"{len(events) / elapsed:.0f} events/s, peak {peak / 1024:.0f} KiB"
+        )
+        # Touching a single field is what most filtering loops do
+        start = time.perf_counter()
+        num_ids = len({event.id for event in events if isinstance(event, kvmlib.MessageEvent)})
+        print(f"  id access: {time.perf_counter() - start:.4f} s ({num_ids} ids)")
+        results[lazy] = (len(events), num_ids)
+    # The lazy views hold the same events as the eager path
+    assert results[True] == results[False]
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_kme_write_events(datadir, tmpdir, lazy):
+    src_name = Path(datadir) / "short-burst" / "logfile003.kme50"
+    dest_name = str(tmpdir.join("test_kme_write_events.kme50"))
+
+    with kvmlib.openKme(str(src_name)) as src:
+        with kvmlib.createKme(dest_name) as dest:
+            num_written = dest.write_events(src.events(lazy=lazy))
+
+    assert num_written > 0
+    assert filecmp.cmp(src_name, dest_name, shallow=False)
+
+
+def test_kme_write_frames(tmpdir):
+    dest_name = str(tmpdir.join("test_kme_write_frames.kme50"))
+    frames = [
+        Frame(id_=i, data=[i & 0xFF] * 8, flags=canlib.MessageFlag.STD, timestamp=i * 1000)
+        for i in range(100)
+    ]
+
+    with kvmlib.createKme(dest_name) as dest:
+        assert dest.write_events(frames, channel=1) == len(frames)
+        assert dest.write_events(tuple(f) for f in frames) == len(frames)
+
+    with kvmlib.openKme(dest_name) as src:
+        events = list(src)
+    assert [e.asframe() for e in events] == frames + frames
+    assert [e.channel for e in events] == [1] * len(frames) + [0] * len(frames)
+
+
+@pytest.mark.slow
+def test_kme_write_events_throughput(tmpdir):
+    target_fps = 100000
+    dest_name = str(tmpdir.join("test_kme_write_events_throughput.kme50"))
+    frames = [
+        Frame(id_=i & 0x7FF, data=bytes(8), flags=canlib.MessageFlag.STD, timestamp=i * 1000)
+        for i in range(200000)
+    ]
+
+    with kvmlib.createKme(dest_name) as dest:
+        start = time.perf_counter()
+        dest.write_events(frames)
+        elapsed = time.perf_counter() - start
+
+    fps = len(frames) / elapsed
+    print(f"write_events: {fps:.0f} frames/s")
+    assert fps > target_fps
+
+
+def test_merge_kme(datadir, tmpdir):
+    src_name = Path(datadir) / "short-burst" / "logfile003.kme50"
+    with kvmlib.openKme(str(src_name)) as kme:
+        events = list(kme)
+    messages = [e for e in events if isinstance(e, kvmlib.MessageEvent)]
+
+    merged = list(kvmlib.merge_kme([src_name, src_name], channel_offsets=[0, 4]))
+    assert len(merged) == 2 * len(events)
+    timestamps = [e.timeStamp for _, e in merged if e.timeStamp is not None]
+    assert timestamps == sorted(timestamps)
+    for source in (0, 1):
+        source_messages = [
+            e for s, e in merged if s == source and isinstance(e, kvmlib.MessageEvent)
+        ]
+        assert [e.id for e in source_messages] == [e.id for e in messages]
+        assert [e.channel for e in source_messages] == [e.channel + 4 * source for e in messages]
+
+    dest_name = str(tmpdir.join("test_merge_kme.kme50"))
+    num_written = kvmlib.merge_kme([src_name, src_name], output=dest_name, lazy=True)
+    assert num_written == 2 * len(events)
+    with kvmlib.openKme(dest_name) as kme:
+        assert len(list(kme)) == num_written
+
+
+@linuxonly
+def test_merge_kme_align_rtc_dst(tmpdir, monkeypatch):
+    # Europe left summer time at 01:00 UTC on 2023-10-29, so these two RTC
+    # times, one hour apart, are both 02:30 in local time
+    monkeypatch.setenv('TZ', 'Europe/Stockholm')
+    time.tzset()
+    try:
+        names = []
+        for index, calendar_time in enumerate([1698539400, 1698543000]):
+            rtc = kvmlib.memoLogEventEx()
+            rtc.event.rtc.evType = kvmlib.memoLogEventEx.MEMOLOG_TYPE_CLOCK
+            rtc.event.rtc.calendarTime = calendar_time
+            rtc.event.rtc.timeStamp = 0
+            name = str(tmpdir.join(f"test_merge_kme_dst{index}.kme50"))
+            with kvmlib.createKme(name) as kme:
+                kme.write_event(rtc.createMemoEvent(lazy=True))
+                kme.write_event(kvmlib.MessageEvent(id=index, channel=0, dlc=0, timestamp=1000))
+            names.append(name)
+        merged = list(kvmlib.merge_kme(names))
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    messages = {e.id: e for _, e in merged if isinstance(e, kvmlib.MessageEvent)}
+    assert messages[1].timeStamp - messages[0].timeStamp == 3600 * 1000000000
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_kme_filtered_events(datadir, lazy):
+    src_name = str(Path(datadir) / "short-burst" / "logfile003.kme50")
+    with kvmlib.openKme(src_name) as kme:
+        events = list(kme)
+    messages = [e for e in events if isinstance(e, kvmlib.MessageEvent)]
+    ids = sorted({e.id for e in messages})[::2]
+    start = messages[len(messages) // 4].timeStamp
+    end = messages[len(messages) // 2].timeStamp
+
+    with kvmlib.openKme(src_name) as kme:
+        filtered = list(kme.events(lazy=lazy, ids=ids, types=[kvmlib.MessageEvent]))
+    assert filtered == [e for e in messages if e.id in ids]
+
+    with kvmlib.openKme(src_name) as kme:
+        filtered = list(kme.events(lazy=lazy, ids=range(0, 0x100), channel_mask=0b1))
+    assert filtered == [
+        e
+        for e in events
+        if not isinstance(e, kvmlib.MessageEvent) or (e.id < 0x100 and e.channel == 0)
+    ]
+
+    with kvmlib.openKme(src_name) as kme:
+        filtered = list(kme.events(lazy=lazy, types=[kvmlib.MessageEvent], start=start, end=end))
+    assert filtered == [e for e in messages if start <= e.timeStamp < end]
+
+
+def test_kme_filter_single_values(datadir):
+    src_name = str(Path(datadir) / "short-burst" / "logfile003.kme50")
+    with kvmlib.openKme(src_name) as kme:
+        messages = list(kme.events(types=[kvmlib.MessageEvent]))
+    id_ = messages[0].id
+
+    with kvmlib.openKme(src_name) as kme:
+        assert list(kme.events(types=kvmlib.MessageEvent)) == messages
+    with kvmlib.openKme(src_name) as kme:
+        # The first positional argument is ids, as for Kme.events
+        single = list(kme.events([id_], None, kvmlib.MessageEvent))
+    with kvmlib.openKme(src_name) as kme:
+        assert list(kme.events(id_, types=kvmlib.MessageEvent)) == single
+    assert single == [e for e in messages if e.id == id_]
+    with kvmlib.openKme(src_name) as kme:
+        with pytest.raises(TypeError):
+            kme.events([id_], None, None, None, None, True)
+
+
+def test_kme_filter_iterators(datadir):
+    src_name = str(Path(datadir) / "short-burst" / "logfile003.kme50")
+    with kvmlib.openKme(src_name) as kme:
+        messages = list(kme.events(types=[kvmlib.MessageEvent]))
+    ids = sorted({e.id for e in messages})[::2]
+
+    with kvmlib.openKme(src_name) as kme:
+        filtered = list(
+            kme.events(ids=(id_ for id_ in ids), types=(t for t in [kvmlib.MessageEvent]))
+        )
+    assert filtered
+    assert filtered == [e for e in messages if e.id in ids]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('filename', sorted(Path(__file__).parent.parent.glob('data/**/*.kme50')))
+def test_kme_filtered_events_benchmark(filename):
+    with kvmlib.openKme(str(filename)) as kme:
+        ids = {e.id for e in kme.events(types=[kvmlib.MessageEvent])}
+    # Keep roughly one id in twenty, like a typical consumer
+    keep = set(sorted(ids)[::20])
+
+    start = time.perf_counter()
+    with kvmlib.openKme(str(filename)) as kme:
+        unfiltered = [e for e in kme if isinstance(e, kvmlib.MessageEvent) and e.id in keep]
+    unfiltered_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with kvmlib.openKme(str(filename)) as kme:
+        filtered = list(kme.events(ids=keep, types=[kvmlib.MessageEvent]))
+    filtered_time = time.perf_counter() - start
+
+    print(
+        f"{filename.name}: unfiltered {unfiltered_time:.4f} s, filtered {filtered_time:.4f} s "
+        f"({len(filtered)} events)"
+    )
+    assert filtered
+    assert filtered == unfiltered
@@ -0,0 +1,37 @@
+import queue
+
+from canlib import Frame, canlib
+
+
+class LoopbackChannel:
+    """Simulated channel, frames written are read by all other channels on the bus"""
+
+    def __init__(self):
+        self.frames = queue.Queue()
+        self.peers = []
+        self.written = []
+
+    @classmethod
+    def pair(cls):
+        return cls.bus(2)
+
+    @classmethod
+    def bus(cls, count):
+        channels = [cls() for _ in range(count)]
+        for channel in channels:
+            channel.peers = [peer for peer in channels if peer is not channel]
+        return channels
+
+    def write_raw(self, id_, msg, flag=0, dlc=None):
+        self.written.append((id_, bytes(msg)))
+        for peer in self.peers:
+            peer.frames.put(Frame(id_=id_, data=msg, flags=flag))
+
+    def writeSync(self, timeout):
+        pass
+
+    def read(self, timeout=0):
+        try:
+            return self.frames.get(timeout=timeout / 1000)
+        except queue.Empty:
+            raise canlib.CanNoMsg()
@@ -1,7 +1,8 @@
 import pytest
 from kvprobe import features
 
-from canlib.device import Device, connected_devices
+from canlib import canlib
+from canlib.device import Device, DeviceRegistry, connected_devices
 from canlib.ean import EAN
 
 
@@ -83,3 +84,25 @@ def test_unconnected():
 def test_remote(local_r_no):
     dev = Device.find(channel_number=local_r_no)
     print(dev.remote())
+
+
+def test_registry(channel_no):
+    registry = DeviceRegistry()
+    dev = Device.find(channel_number=channel_no)
+    assert dev in registry
+    assert registry.find(channel_number=channel_no) == dev
+    assert registry.find(ean=dev.ean, serial=dev.serial) == dev
+    assert registry.find(ean=dev.ean, serial=dev.serial).last_channel_number == dev.channel_number()
+    assert channel_no in registry.channel_numbers(dev)
+    assert list(registry) == list(connected_devices())
+
+
+def test_registry_refresh(channel_no):
+    registry = DeviceRegistry()
+    events = []
+    registry.subscribe(events.append)
+    canlib.enumerate_hardware()
+    # The registry refreshes itself after the hardware has been enumerated
+    assert registry.find(channel_number=channel_no) == Device.find(channel_number=channel_no)
+    assert events == []
+    assert registry.refresh(force=True) == []
@@ -0,0 +1,96 @@
+import datetime
+import gzip
+import io
+import os.path
+
+import pytest
+
+from canlib import Frame, export, kvmlib
+from canlib.canlib import MessageFlag
+
+
+@pytest.fixture
+def short_burst_events(datadir):
+    with kvmlib.openKme(os.path.join(datadir, "short-burst", "logfile003.kme50")) as kme:
+        return list(kme)
+
+
+def test_asc_same_as_kvlclib(datadir, short_burst_events):
+    buf = io.BytesIO()
+    with export.AscWriter(buf, start_time=datetime.datetime(2018, 6, 15, 10, 22, 35)) as asc:
+        asc.write(short_burst_events)
+    with open(os.path.join(datadir, "short-burst", "logfile003.asc"), 'rb') as f:
+        assert buf.getvalue() == f.read()
+
+
+def test_csv_same_as_kvlclib(datadir, short_burst_events):
+    buf = io.BytesIO()
+    with export.CsvWriter(buf, chunk_size=7) as csv:
+        csv.write(short_burst_events)
+    with open(os.path.join(datadir, "short-burst", "logfile003.csv"), 'rb') as f:
+        assert buf.getvalue() == f.read()
+
+
+def test_asc_frame_lines():
+    frames = [
+        Frame(id_=0x6A8, data=b'\x77\xfa', flags=MessageFlag.STD, timestamp=5177),
+        Frame(id_=0x18FEF100, data=b'\x01', flags=MessageFlag.EXT | MessageFlag.TXACK, timestamp=10000),
+        Frame(id_=0x12, data=b'', dlc=4, flags=MessageFlag.RTR, timestamp=12345),
+        Frame(id_=0, data=b'', flags=MessageFlag.ERROR_FRAME, timestamp=20000),
+    ]
+    buf = io.BytesIO()
+    with export.AscWriter(buf, newline='\n') as asc:
+        asc.write(frames, channel=1)
+    lines = buf.getvalue().decode('ascii').split('\n')
+    assert lines[2] == "// CAN channel: 2"
+    assert lines[5:9] == [
+        "      5.177000000 2  6A8          Rx   d   2 77 FA                   ",
+        "     10.000000000 2  18FEF100x    Tx   d   1 01                      ",
+        "     12.345000000 2  12           Rx   r   4",
+        "     20.000000000 2  ErrorFrame",
+    ]
+    assert lines[9] == "End Triggerblock"
+
+
+def test_asc_fd_frames():
+    with export.AscWriter(io.BytesIO()) as asc:
+        asc.write([Frame(id_=1, data=[1, 2])])
+        with pytest.raises(ValueError):
+            asc.write([Frame(id_=2, data=bytes(12), flags=MessageFlag.FDF)])
+
+
+def test_write_columns():
+    frames = [Frame(id_=i, data=[i] * (i % 9), timestamp=i * 10) for i in range(100)]
+    rows = io.BytesIO()
+    with export.CsvWriter(rows) as csv:
+        csv.write(frames, channel=1)
+    columns = io.BytesIO()
+    with export.CsvWriter(columns) as csv:
+        csv.write_columns(
+            ids=[f.id for f in frames],
+            data=[f.data for f in frames],
+            timestamps=[f.timestamp for f in frames],
+            channels=1,
+        )
+    assert rows.getvalue() == columns.getvalue()
+
+
+def test_compression(tmpdir):
+    frames = [Frame(id_=i, data=[i & 0xFF] * 8, timestamp=i) for i in range(1000)]
+    filename = str(tmpdir.join("frames.csv.gz"))
+    with export.CsvWriter(filename) as csv:
+        csv.write(frames)
+    with gzip.open(filename, 'rb') as f:
+        text = f.read()
+    lines = text.split(b'\r\n')
+    assert lines[0] == b"0.00000,1,0,0,8,0,0,0,0,0,0,0,0,1"
+    assert lines[256].startswith(b"0.25600,1,256,0,8,0,0,0,0,0,0,0,0,")
+    assert len(lines) == len(frames) + 1
+    assert os.path.getsize(filename) < len(text) / 2
+
+
+def test_signal_csv():
+    buf = io.BytesIO()
+    with export.SignalCsvWriter(buf, ['EngineSpeed', 'Load'], newline='\n') as csv:
+        csv.write([0.5, 1.0], {'EngineSpeed': [800, 900.5]})
+    assert buf.getvalue() == b"Time,EngineSpeed,Load\n0.5,800,\n1.0,900.5,\n"
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from canlib import canlib, isotp
+from loopback import LoopbackChannel
+
+
+@pytest.fixture
+def engines():
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a) as tester, isotp.IsoTpEngine(ch_b) as ecu:
+        yield tester, ecu
+
+
+@pytest.mark.parametrize('length', [0, 1, 7, 8, 62, 63, 4095, 4096, 20000])
+def test_classic(engines, length):
+    tester, ecu = engines
+    a = tester.connect(tx_id=0x7E0, rx_id=0x7E8)
+    b = ecu.connect(tx_id=0x7E8, rx_id=0x7E0, block_size=8)
+    data = bytes(i & 0xFF for i in range(length))
+    if length == 0:
+        with pytest.raises(ValueError):
+            a.send(data)
+        with pytest.raises(canlib.CanNoMsg):
+            b.recv(timeout=0)
+        return
+    a.send(data)
+    assert b.recv(timeout=1000) == data
+    b.send(data[::-1])
+    assert a.recv(timeout=1000) == data[::-1]
+    assert all(len(payload) == 8 for _, payload in tester.channel.written)
+    assert a.stats.bytes_sent == b.stats.bytes_received == length
+
+
+@pytest.mark.parametrize('length', [7, 8, 62, 63, 5000])
+def test_fd(length):
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a, fd=True) as tester, isotp.IsoTpEngine(ch_b, fd=True) as ecu:
+        a = tester.connect(tx_id=0x18DA00F1, rx_id=0x18DAF100, extended=True)
+        b = ecu.connect(tx_id=0x18DAF100, rx_id=0x18DA00F1, extended=True)
+        data = bytes(range(256)) * (length // 256) + bytes(range(length % 256))
+        a.send(data)
+        assert b.recv(timeout=1000) == data
+    lengths = {len(payload) for _, payload in ch_a.written}
+    assert lengths <= {8, 12, 16, 20, 24, 32, 48, 64}
+    if length > 62:
+        # First frame and all consecutive frames but the last are full size
+        assert len(ch_a.written[0][1]) == 64
+
+
+def test_frames():
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a) as tester, isotp.IsoTpEngine(ch_b, padding=None) as ecu:
+        a = tester.connect(tx_id=0x7E0, rx_id=0x7E8)
+        b = ecu.connect(tx_id=0x7E8, rx_id=0x7E0, block_size=2, st_min=0xF1)
+        a.send(b'0123456789ABCDEFGHIJKLMNOPQ')
+        assert b.recv(timeout=1000) == b'0123456789ABCDEFGHIJKLMNOPQ'
+    assert ch_a.written == [
+        (0x7E0, b'\x10\x1b012345'),
+        (0x7E0, b'\x216789ABC'),
+        (0x7E0, b'\x22DEFGHIJ'),
+        (0x7E0, b'\x23KLMNOPQ'),
+    ]
+    # Unpadded flow control frames, one after the first frame and one after
+    # the first block of two consecutive frames
+    assert ch_b.written == [(0x7E8, b'\x30\x02\xf1'), (0x7E8, b'\x30\x02\xf1')]
+
+
+def test_st_min():
+    assert isotp.st_min_to_seconds(0x05) == 0.005
+    assert isotp.st_min_to_seconds(0xF3) == pytest.approx(0.0003)
+    assert isotp.st_min_to_seconds(0xFA) == 0.127
+    assert isotp.seconds_to_st_min(0.0003) == 0xF3
+    assert isotp.seconds_to_st_min(0.0011) == 0x02
+    assert isotp.seconds_to_st_min(10) == 0x7F
+
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a) as tester, isotp.IsoTpEngine(ch_b) as ecu:
+        a = tester.connect(tx_id=0x7E0, rx_id=0x7E8)
+        b = ecu.connect(tx_id=0x7E8, rx_id=0x7E0, st_min=2)
+        start = time.perf_counter()
+        a.send(bytes(6 + 7 * 10))
+        assert time.perf_counter() - start >= 0.018
+        assert len(b.recv(timeout=1000)) == 76
+
+
+def test_concurrent_connections(engines):
+    tester, ecu = engines
+    pairs = []
+    for i in range(4):
+        a = tester.connect(tx_id=0x700 + i, rx_id=0x780 + i)
+        b = ecu.connect(tx_id=0x780 + i, rx_id=0x700 + i, block_size=4)
+        pairs.append((a, b, bytes([i]) * (1000 + i)))
+    with pytest.raises(ValueError):
+        tester.connect(tx_id=0x7FF, rx_id=0x780)
+
+    threads = [threading.Thread(target=a.send, args=(data,)) for a, _, data in pairs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for _, b, data in pairs:
+        assert b.recv(timeout=1000) == data
+    assert tester.connection(0x702, 0x782) is pairs[2][0]
+
+
+def test_errors(engines):
+    tester, ecu = engines
+    a = tester.connect(tx_id=0x7E0, rx_id=0x7E8)
+    b = ecu.connect(tx_id=0x7E8, rx_id=0x7E0, max_length=100)
+    with pytest.raises(isotp.IsoTpError):
+        a.send(bytes(101))
+    assert b.stats.rx_errors == 1
+
+    no_peer = tester.connect(tx_id=0x123, rx_id=0x456, timeout=20)
+    with pytest.raises(isotp.IsoTpTimeout):
+        no_peer.send(bytes(100))
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('fd', [False, True])
+def test_isotp_benchmark(fd):
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a, fd=fd) as tester, isotp.IsoTpEngine(ch_b, fd=fd) as ecu:
+        a = tester.connect(tx_id=0x7E0, rx_id=0x7E8)
+        b = ecu.connect(tx_id=0x7E8, rx_id=0x7E0)
+        data = bytes(4095)
+        count = 50
+        start = time.perf_counter()
+        for _ in range(count):
+            a.send(data)
+            b.recv(timeout=1000)
+        elapsed = time.perf_counter() - start
+    stats = a.stats
+    print(
+        f"fd={fd}: {stats.bytes_sent / elapsed / 1024:.0f} KiB/s, "
+        f"{stats.frames_sent / elapsed:.0f} frames/s"
+    )
+    assert stats.messages_sent == count
@@ -0,0 +1,184 @@
+import threading
+import time
+import zlib
+
+import pytest
+
+from canlib import canlib, isotp, uds
+from loopback import LoopbackChannel
+
+
+class _SimulatedEcu:
+    """Scripted ECU answering requests on an ISO-TP connection
+
+    Handlers are looked up by service identifier and return a list of
+    responses, optionally preceded by delays (`float`) to simulate
+    processing time.
+
+    """
+
+    def __init__(self, connection, pending=0):
+        self.connection = connection
+        self.pending = pending
+        self.requests = []
+        self.memory = bytearray()
+        self.unlocked = False
+        self._seed = b'\x12\x34'
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                request = bytes(self.connection.recv(timeout=10))
+            except canlib.CanNoMsg:
+                continue
+            self.requests.append(request)
+            for item in self._handle(request):
+                if isinstance(item, float):
+                    time.sleep(item)
+                else:
+                    self.connection.send(item)
+
+    def _handle(self, request):
+        sid = request[0]
+        if sid == uds.Service.TESTER_PRESENT:
+            return [] if request[1] & 0x80 else [b'\x7e\x00']
+        if sid == uds.Service.DIAGNOSTIC_SESSION_CONTROL:
+            return [bytes((0x50, request[1], 0x00, 0x32, 0x01, 0xF4))]
+        if sid == uds.Service.SECURITY_ACCESS:
+            if request[1] % 2:
+                return [b'\x67' + request[1:2] + self._seed]
+            if request[2:] == bytes(b ^ 0xFF for b in self._seed):
+                self.unlocked = True
+                return [b'\x67' + request[1:2]]
+            return [b'\x7f\x27\x35']
+        if not self.unlocked:
+            return [bytes((0x7F, sid, 0x33))]
+        if sid == uds.Service.REQUEST_DOWNLOAD:
+            self.memory = bytearray()
+            return [b'\x74\x20\x01\x02']
+        if sid == uds.Service.TRANSFER_DATA:
+            self.memory += request[2:]
+            pending = [b'\x7f\x36\x78', 0.001] * self.pending
+            return pending + [bytes((0x76, request[1]))]
+        if sid == uds.Service.REQUEST_TRANSFER_EXIT:
+            return [b'\x77']
+        return [bytes((0x7F, sid, 0x11))]
+
+
+@pytest.fixture
+def ecu():
+    ch_a, ch_b = LoopbackChannel.pair()
+    with isotp.IsoTpEngine(ch_a) as tester, isotp.IsoTpEngine(ch_b) as ecu_side:
+        client = uds.UdsClient(tester.connect(tx_id=0x7E0, rx_id=0x7E8), p2_timeout=200)
+        ecu = _SimulatedEcu(ecu_side.connect(tx_id=0x7E8, rx_id=0x7E0))
+        ecu.client = client
+        yield ecu
+        client.stop_tester_present()
+        ecu.stop()
+
+
+def _compute_key(level, seed):
+    return bytes(b ^ 0xFF for b in seed)
+
+
+def test_session_and_security(ecu):
+    client = ecu.client
+    assert client.diagnostic_session_control(uds.Session.PROGRAMMING) == b'\x00\x32\x01\xf4'
+    assert client.session == uds.Session.PROGRAMMING
+
+    with pytest.raises(uds.UdsNegativeResponse) as excinfo:
+        client.security_access(1, lambda level, seed: b'\x00\x00')
+    assert excinfo.value.service == uds.Service.SECURITY_ACCESS
+    assert excinfo.value.code == 0x35
+    assert 'invalidKey' in str(excinfo.value)
+    assert client.security_level is None
+
+    client.security_access(1, _compute_key)
+    assert client.security_level == 1
+    assert ecu.requests[-1] == b'\x27\x02\xed\xcb'
+    with pytest.raises(ValueError):
+        client.security_access(2, _compute_key)
+
+
+def test_negative_and_timeout(ecu):
+    client = ecu.client
+    with pytest.raises(uds.UdsNegativeResponse) as excinfo:
+        client.read_data_by_identifier(0xF190)
+    assert excinfo.value.code == 0x33
+    with pytest.raises(uds.UdsTimeout):
+        client.request(b'\x3e\x80', timeout=20)
+
+
+def test_download(ecu):
+    client = ecu.client
+    client.security_access(1, _compute_key)
+    data = bytes(i * 7 & 0xFF for i in range(5000))
+    sent = []
+    blocks = client.download(0x8000, data, block_length=100, progress=sent.append)
+    # The ECU accepts 0x102 bytes, the smaller block length is used
+    assert blocks == 52
+    assert sent[-1] == 5000
+    assert ecu.memory == data
+    counters = [r[1] for r in ecu.requests if r[0] == uds.Service.TRANSFER_DATA]
+    assert counters == list(range(1, 53))
+
+    compressed = []
+
+    def compress(block):
+        compressed.append(block)
+        return zlib.compress(block)
+
+    client.download(0x8000, data, data_format=0x10, transform=compress)
+    assert b''.join(compressed) == data
+    assert ecu.memory == b''.join(zlib.compress(block) for block in compressed)
+
+
+def test_response_pending(ecu):
+    client = ecu.client
+    client.security_access(1, _compute_key)
+    ecu.pending = 3
+    client.download(0, bytes(500))
+    latency = client.latency()[uds.Service.TRANSFER_DATA]
+    assert latency.count == 2
+    assert latency.pending == 6
+    assert latency.min >= 0.003
+    assert latency.min <= latency.mean <= latency.max
+
+
+def test_tester_present(ecu):
+    client = ecu.client
+    with client.tester_present_keepalive(interval=0.02):
+        time.sleep(0.11)
+        assert ecu.requests.count(b'\x3e\x80') >= 3
+        # Other requests keep the session alive as well
+        count = len(ecu.requests)
+        for _ in range(10):
+            client.diagnostic_session_control(uds.Session.EXTENDED)
+            time.sleep(0.01)
+        assert ecu.requests[count:].count(b'\x3e\x80') <= 1
+    count = len(ecu.requests)
+    time.sleep(0.05)
+    assert len(ecu.requests) == count
+
+
+@pytest.mark.slow
+def test_uds_benchmark(ecu):
+    client = ecu.client
+    client.security_access(1, _compute_key)
+    data = bytes(256 * 1024)
+    start = time.perf_counter()
+    client.download(0, data)
+    elapsed = time.perf_counter() - start
+    latency = client.latency()[uds.Service.TRANSFER_DATA]
+    print(
+        f"{len(data) / elapsed / 1024:.0f} KiB/s, "
+        f"TransferData mean {latency.mean * 1000:.2f} ms, max {latency.max * 1000:.2f} ms"
+    )
+    assert ecu.memory == data